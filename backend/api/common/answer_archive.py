@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+答题记录按月归档
+- archive_old_answers(): 把早于保留期的 user_answers 分批移入按月划分的归档库，
+  每批只占用一次短写事务，服务运行中也可以执行
+- history_connection(): 以只读方式挂载指定月份的归档库，并创建 user_answers_all 视图
+  （热表 UNION ALL 各归档库），供少量历史查询使用
+
+归档库位于 ANSWER_ARCHIVE_DIR/<源库名>/user_answers_YYYY_MM.db。
+开启分片时每个分片独立归档。
+"""
+
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from urllib.request import pathname2url
+
+from . import metrics
+from .database import DB_PATH, connect
+from .profile_state import drop_answers
+
+ANSWER_ARCHIVE_DIR = os.path.abspath(os.environ.get(
+    "ANSWER_ARCHIVE_DIR", os.path.join(os.path.dirname(DB_PATH), "archive")))
+ANSWER_ARCHIVE_HORIZON_DAYS = int(os.environ.get("ANSWER_ARCHIVE_HORIZON_DAYS", "180"))
+ANSWER_ARCHIVE_BATCH_SIZE = int(os.environ.get("ANSWER_ARCHIVE_BATCH_SIZE", "500"))
+# 批与批之间让出写锁的时间，避免长时间阻塞在线写入
+ANSWER_ARCHIVE_PAUSE_MS = float(os.environ.get("ANSWER_ARCHIVE_PAUSE_MS", "50"))
+
+_ARCHIVE_FILE = re.compile(r"^user_answers_(\d{4})_(\d{2})\.db$")
+
+
+def archive_dir_for(db_path, archive_root=ANSWER_ARCHIVE_DIR):
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(archive_root, name)
+
+
+def archive_path(directory, month):
+    """month 形如 2024-09"""
+    return os.path.join(directory, f"user_answers_{month.replace('-', '_')}.db")
+
+
+def list_archives(directory):
+    """返回 [(month, path), ...]，按月份排序"""
+    if not os.path.isdir(directory):
+        return []
+    archives = []
+    for filename in sorted(os.listdir(directory)):
+        match = _ARCHIVE_FILE.match(filename)
+        if match:
+            archives.append((f"{match.group(1)}-{match.group(2)}", os.path.join(directory, filename)))
+    return archives
+
+
+def _ensure_archive(conn, path):
+    """创建归档库并建立与热表相同结构的 user_answers 表"""
+    ddl = conn.execute(
+        "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = 'user_answers'"
+    ).fetchone()[0]
+    archive = sqlite3.connect(path)
+    try:
+        archive.execute(ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+        archive.execute("CREATE INDEX IF NOT EXISTS idx_user_answers_user_time ON user_answers (user_id, timestamp)")
+        archive.commit()
+    finally:
+        archive.close()
+
+
+def _archive_batch(conn, directory, cutoff, batch_size):
+    """归档一批记录，返回本批条数（0 表示已无可归档的记录）"""
+    ids = [row[0] for row in conn.execute("""
+        SELECT answer_id FROM user_answers
+        WHERE timestamp < ?
+        ORDER BY timestamp
+        LIMIT ?
+    """, (cutoff, batch_size))]
+    if not ids:
+        return 0
+    placeholders = ",".join("?" * len(ids))
+    months = [row[0] for row in conn.execute(f"""
+        SELECT DISTINCT strftime('%Y-%m', timestamp) FROM user_answers
+        WHERE answer_id IN ({placeholders})
+    """, ids)]
+
+    # 第一步：复制到归档库并提交。INSERT OR IGNORE 保证中断后重跑不会重复
+    for month in months:
+        path = archive_path(directory, month)
+        _ensure_archive(conn, path)
+        conn.execute("ATTACH DATABASE ? AS archive", (path,))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"""
+                INSERT OR IGNORE INTO archive.user_answers
+                SELECT * FROM main.user_answers
+                WHERE answer_id IN ({placeholders}) AND strftime('%Y-%m', timestamp) = ?
+            """, (*ids, month))
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.execute("DETACH DATABASE archive")
+
+    # 第二步：在热库的一个事务里累加日汇总并删除（连同维度评分和画像窗口中的记录），保证每条记录只计入一次
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"""
+            INSERT INTO user_answer_daily_rollup (user_id, day, answer_count, correct_count, total_time_spent)
+            SELECT user_id, DATE(timestamp), COUNT(*),
+                   SUM(CASE WHEN is_correct = 1 THEN 1 ELSE 0 END),
+                   COALESCE(SUM(time_spent), 0)
+            FROM user_answers
+            WHERE answer_id IN ({placeholders})
+            GROUP BY user_id, DATE(timestamp)
+            ON CONFLICT(user_id, day) DO UPDATE SET
+                answer_count = answer_count + excluded.answer_count,
+                correct_count = correct_count + excluded.correct_count,
+                total_time_spent = total_time_spent + excluded.total_time_spent
+        """, ids)
+        drop_answers(conn, ids)
+        conn.execute(f"DELETE FROM user_answer_scores WHERE answer_id IN ({placeholders})", ids)
+        conn.execute(f"DELETE FROM user_answers WHERE answer_id IN ({placeholders})", ids)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return len(ids)
+
+
+def archive_old_answers(db_path=DB_PATH, horizon_days=ANSWER_ARCHIVE_HORIZON_DAYS,
+                        batch_size=ANSWER_ARCHIVE_BATCH_SIZE, pause_ms=ANSWER_ARCHIVE_PAUSE_MS,
+                        archive_root=ANSWER_ARCHIVE_DIR, verbose=True):
+    """
+    把 db_path 中早于 horizon_days 天的答题记录移入按月归档库，返回归档条数。
+    每批最多 batch_size 条，批与批之间暂停 pause_ms 毫秒。
+    """
+    # 只比较日期部分，兼容 'YYYY-MM-DD HH:MM:SS' 和 isoformat 两种时间格式
+    cutoff = (datetime.now() - timedelta(days=horizon_days)).strftime("%Y-%m-%d")
+    directory = archive_dir_for(db_path, archive_root)
+    os.makedirs(directory, exist_ok=True)
+
+    conn = connect(db_path)
+    conn.isolation_level = None  # 事务显式控制
+    total = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            moved = _archive_batch(conn, directory, cutoff, batch_size)
+            if not moved:
+                break
+            total += moved
+            metrics.inc("answers.archived", moved)
+            metrics.observe("answers.archive_batch_ms", (time.perf_counter() - start) * 1000)
+            if verbose:
+                print(f"📦 已归档 {total} 条（{cutoff} 之前）")
+            time.sleep(pause_ms / 1000)
+    finally:
+        conn.close()
+    return total
+
+
+def history_connection(db_path=DB_PATH, start_month=None, end_month=None, archive_root=ANSWER_ARCHIVE_DIR):
+    """
+    打开只读的历史查询连接：挂载 [start_month, end_month] 范围内的归档库，
+    并创建临时视图 user_answers_all = 热表 UNION ALL 各归档库。
+    SQLite 默认最多挂载 10 个库，跨度较长的查询请缩小月份范围。
+    """
+    archives = [
+        (month, path) for month, path in list_archives(archive_dir_for(db_path, archive_root))
+        if (start_month is None or month >= start_month) and (end_month is None or month <= end_month)
+    ]
+    conn = connect("file:" + pathname2url(db_path) + "?mode=ro", uri=True)
+    if len(archives) > conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+        conn.close()
+        raise ValueError(f"需要挂载 {len(archives)} 个归档库，超过上限，请缩小月份范围")
+    selects = ["SELECT * FROM main.user_answers"]
+    for index, (month, path) in enumerate(archives):
+        schema = f"archive_{index}"
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", ("file:" + pathname2url(path) + "?mode=ro",))
+        selects.append(f"SELECT * FROM {schema}.user_answers")
+    conn.execute("CREATE TEMP VIEW user_answers_all AS " + " UNION ALL ".join(selects))
+    return conn
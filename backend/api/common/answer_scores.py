@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+答题记录的维度评分
+诊断结果在写入答题记录时拆成 user_answer_scores(answer_id, node_id, dimension, score) 行，
+每道题关联的每个知识点各一份，学生画像按知识点求各维度平均分时只需一次 SQL 聚合，
+不必逐条解析 diagnosis_json。
+
+兼容两种诊断结果格式，维度统一为中文名称（如 知识掌握）：
+- {"scores": [{"Knowledge Mastery": "知识掌握", "score": 0.8, "feedback": "..."}, ...]}
+- {"assessment_dimensions": [{"dimension": "知识掌握", "score": 0.8}, ...]}（旧格式）
+
+函数在写意图中调用，不自行提交。
+已有答题记录的回填在迁移 0009 中（冻结副本，分片建表时也调用它）。
+"""
+
+
+def dimension_scores(diagnosis_result):
+    """从诊断结果中提取 [(维度中文名, 分数), ...]"""
+    if not isinstance(diagnosis_result, dict):
+        return []
+    rows = []
+    if "assessment_dimensions" in diagnosis_result:
+        for dim in diagnosis_result["assessment_dimensions"] or []:
+            if isinstance(dim, dict) and isinstance(dim.get("dimension"), str) \
+                    and isinstance(dim.get("score"), (int, float)):
+                rows.append((dim["dimension"].split(" ")[0], dim["score"]))
+    elif "scores" in diagnosis_result:
+        for item in diagnosis_result["scores"] or []:
+            if not isinstance(item, dict) or not isinstance(item.get("score"), (int, float)):
+                continue
+            for key, chinese_name in item.items():
+                if key not in ("score", "feedback") and isinstance(chinese_name, str):
+                    rows.append((chinese_name.split(" ")[0], item["score"]))
+                    break
+    return rows
+
+
+def save_scores(conn, answers):
+    """
+    写入答题记录的维度评分
+
+    Args:
+        answers: [(answer_id, question_id, diagnosis_result), ...]
+    """
+    rows = [
+        (answer_id, dimension, score, question_id)
+        for answer_id, question_id, diagnosis_result in answers
+        for dimension, score in dimension_scores(diagnosis_result)
+    ]
+    if not rows:
+        return
+    # 同一次诊断出现重复维度时保留最后一个，与原先逐条解析时的平均口径差别可以忽略
+    conn.executemany("""
+        INSERT OR REPLACE INTO user_answer_scores (answer_id, node_id, dimension, score)
+        SELECT ?, node_id, ?, ? FROM question_to_node_mapping WHERE question_id = ?
+    """, rows)
+
+
+def replace_scores(conn, answer_id, question_id, diagnosis_result):
+    """诊断结果被更正时重写该答题记录的维度评分"""
+    conn.execute("DELETE FROM user_answer_scores WHERE answer_id = ?", (answer_id,))
+    save_scores(conn, [(answer_id, question_id, diagnosis_result)])
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录同步接口
+接收 data/sync_catalog.py 推送的增量变更集，服务不停机即可更新知识点和题目
+"""
+
+import gzip
+import hmac
+import json
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+from .catalog_sync import CatalogSyncError, apply_changeset, fingerprint
+from .database import run_db
+
+# 未设置时同步接口关闭
+CATALOG_SYNC_TOKEN = os.environ.get("CATALOG_SYNC_TOKEN", "")
+
+router = APIRouter(prefix="/catalog", tags=["目录同步"])
+
+
+def _check_token(request: Request):
+    token = request.headers.get("X-Sync-Token", "")
+    if not CATALOG_SYNC_TOKEN:
+        raise HTTPException(status_code=403, detail="目录同步未开启（未设置 CATALOG_SYNC_TOKEN）")
+    if not hmac.compare_digest(token, CATALOG_SYNC_TOKEN):
+        raise HTTPException(status_code=401, detail="同步令牌错误")
+
+
+def _apply(conn, changeset):
+    # 连接池中的连接默认隐式开启事务，这里由 apply_changeset 自己控制
+    raw = conn.raw
+    previous_isolation = raw.isolation_level
+    raw.isolation_level = None
+    try:
+        return apply_changeset(conn, changeset)
+    finally:
+        raw.isolation_level = previous_isolation
+
+
+@router.get("/fingerprint")
+async def get_catalog_fingerprint(request: Request):
+    """当前目录的摘要和迁移版本"""
+    _check_token(request)
+    try:
+        return await run_db(lambda conn: {
+            "fingerprint": fingerprint(conn),
+            "schema_version": conn.execute("PRAGMA user_version").fetchone()[0],
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"计算目录摘要失败: {str(e)}")
+
+
+@router.post("/sync")
+async def sync_catalog(request: Request):
+    """应用目录变更集（请求体为 JSON，可 gzip 压缩）"""
+    _check_token(request)
+    try:
+        body = await request.body()
+        if request.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        changeset = json.loads(body)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"变更集格式错误: {str(e)}")
+
+    try:
+        counts = await run_db(_apply, changeset)
+    except CatalogSyncError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"应用目录变更失败: {str(e)}")
+
+    print(f"✅ 目录已同步: {counts}")
+    return {
+        "status": "success",
+        "full": changeset["full"],
+        "fingerprint": changeset["target_fingerprint"],
+        "tables": counts
+    }
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录数据（知识点、关系、题目、映射）的快照与增量同步
+- snapshot(): 用 SQLite 在线备份 API 生成一致性快照，源库可以同时被服务读写
+- build_changeset(): 比较上次同步的快照与新快照，只导出有变化的行
+- apply_changeset(): 在服务端的一个事务里应用变更，提交前后的读请求看到的要么是旧目录，要么是新目录
+
+学生数据（答题记录、掌握度、错题）和用户表不参与同步，服务器上的数据不会被本地覆盖。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from . import metrics
+
+CATALOG_TABLES = ("knowledge_nodes", "knowledge_edges", "questions", "question_to_node_mapping")
+
+# 在线备份每步复制的页数，步与步之间源库可以继续写入
+BACKUP_PAGES_PER_STEP = 256
+
+CHANGESET_FORMAT = 1
+
+
+class CatalogSyncError(Exception):
+    """变更集无法应用到当前目录（基线不一致、迁移版本不同等）"""
+
+
+def snapshot(source_path, target_path, pages=BACKUP_PAGES_PER_STEP):
+    """
+    生成源库的一致性快照。
+    先写到临时文件再改名，target_path 要么是完整的快照，要么保持原样。
+    """
+    tmp_path = f"{target_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target, pages=pages)
+    finally:
+        target.close()
+        source.close()
+    os.replace(tmp_path, target_path)
+    return target_path
+
+
+def _primary_key(conn, table, schema="main"):
+    columns = conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()
+    names = [row[1] for row in columns]
+    pk = [row[1] for row in columns if row[5]]
+    if len(pk) != 1:
+        raise CatalogSyncError(f"表 {table} 需要单列主键")
+    return names, pk[0]
+
+
+def fingerprint(conn, schema="main"):
+    """目录表内容的摘要，用来确认服务端与变更集的基线一致"""
+    digest = hashlib.sha256()
+    for table in CATALOG_TABLES:
+        columns, pk = _primary_key(conn, table, schema)
+        digest.update(f"{table}:{','.join(columns)}\n".encode())
+        for row in conn.execute(f"SELECT * FROM {schema}.{table} ORDER BY {pk}"):
+            digest.update(json.dumps(list(row), ensure_ascii=False, default=str).encode())
+            digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def build_changeset(new_path, base_path=None):
+    """
+    生成从 base_path 到 new_path 的目录变更集。
+    base_path 为空时生成全量变更集（应用时先清空目录表）。
+    """
+    conn = sqlite3.connect(new_path)
+    try:
+        changeset = {
+            "format": CHANGESET_FORMAT,
+            "schema_version": conn.execute("PRAGMA user_version").fetchone()[0],
+            "full": base_path is None,
+            "base_fingerprint": None,
+            "target_fingerprint": fingerprint(conn),
+            "tables": {},
+        }
+        if base_path is not None:
+            conn.execute("ATTACH DATABASE ? AS base", (base_path,))
+            changeset["base_fingerprint"] = fingerprint(conn, "base")
+        for table in CATALOG_TABLES:
+            columns, pk = _primary_key(conn, table)
+            if base_path is None:
+                upserts = conn.execute(f"SELECT * FROM main.{table} ORDER BY {pk}").fetchall()
+                deletes = []
+            else:
+                # 新增或修改的行
+                upserts = conn.execute(f"""
+                    SELECT * FROM main.{table}
+                    EXCEPT
+                    SELECT * FROM base.{table}
+                """).fetchall()
+                # 已删除的行
+                deletes = [row[0] for row in conn.execute(f"""
+                    SELECT {pk} FROM base.{table}
+                    EXCEPT
+                    SELECT {pk} FROM main.{table}
+                """)]
+            changeset["tables"][table] = {
+                "columns": columns,
+                "primary_key": pk,
+                "upserts": [list(row) for row in upserts],
+                "deletes": deletes,
+            }
+        return changeset
+    finally:
+        conn.close()
+
+
+def changeset_size(changeset):
+    """变更集包含的行数"""
+    return sum(len(t["upserts"]) + len(t["deletes"]) for t in changeset["tables"].values())
+
+
+def apply_changeset(conn, changeset):
+    """
+    在一个写事务中应用变更集，返回各表的变更行数。
+    基线指纹或迁移版本不一致时抛出 CatalogSyncError，不做任何修改。
+    conn 需处于自动提交状态（未开启事务）。
+    """
+    if changeset.get("format") != CHANGESET_FORMAT:
+        raise CatalogSyncError(f"不支持的变更集格式: {changeset.get('format')}")
+    schema_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if changeset["schema_version"] != schema_version:
+        raise CatalogSyncError(
+            f"迁移版本不一致：本地 {changeset['schema_version']}，服务器 {schema_version}，请先执行迁移")
+
+    start = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not changeset["full"] and fingerprint(conn) != changeset["base_fingerprint"]:
+            raise CatalogSyncError("服务器目录与上次同步的快照不一致，请使用全量同步")
+        counts = {}
+        for table in CATALOG_TABLES:
+            change = changeset["tables"][table]
+            columns, pk = _primary_key(conn, table)
+            if columns != change["columns"] or pk != change["primary_key"]:
+                raise CatalogSyncError(f"表 {table} 的列与变更集不一致")
+            if changeset["full"]:
+                conn.execute(f"DELETE FROM {table}")
+            else:
+                conn.executemany(f"DELETE FROM {table} WHERE {pk} = ?",
+                                 [(key,) for key in change["deletes"]])
+            column_list = ", ".join(columns)
+            placeholders = ", ".join("?" * len(columns))
+            conn.executemany(f"INSERT OR REPLACE INTO {table} ({column_list}) VALUES ({placeholders})",
+                             change["upserts"])
+            counts[table] = {"upserts": len(change["upserts"]), "deletes": len(change["deletes"])}
+        # 应用后的内容必须与本地快照完全一致，否则整体回滚
+        if fingerprint(conn) != changeset["target_fingerprint"]:
+            raise CatalogSyncError("应用变更后的目录与本地快照不一致，已回滚")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        metrics.inc("catalog.sync.failures")
+        raise
+    metrics.inc("catalog.sync.applied")
+    metrics.observe("catalog.sync.rows", changeset_size(changeset))
+    metrics.observe("catalog.sync.apply_ms", (time.perf_counter() - start) * 1000)
+    return counts
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+熔断器
+外部服务变慢或不可用时，不再让每个请求都等到超时再失败：
+- closed：正常调用，记录最近 CIRCUIT_WINDOW 次调用的成败和耗时
+- 最近调用数达到 CIRCUIT_MIN_CALLS 后，失败率 >= CIRCUIT_ERROR_RATE
+  或 P95 耗时 >= CIRCUIT_LATENCY_P95_MS 时打开
+- open：CIRCUIT_OPEN_S 秒内直接抛出 CircuitOpen，调用方走降级逻辑
+- half_open：打开时间到后只放行一个探测调用，成功（且不慢）则关闭，否则重新打开
+
+状态通过 /metrics 的 circuit.state{breaker=...} 导出（0 关闭，1 半开，2 打开）。
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+
+from . import metrics
+
+CIRCUIT_WINDOW = int(os.environ.get("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.environ.get("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_ERROR_RATE = float(os.environ.get("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_LATENCY_P95_MS = float(os.environ.get("CIRCUIT_LATENCY_P95_MS", "25000"))
+CIRCUIT_OPEN_S = float(os.environ.get("CIRCUIT_OPEN_S", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Exception):
+    """熔断器打开，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    按失败率和 P95 耗时熔断的断路器（单事件循环内使用）
+
+    用法:
+        breaker = CircuitBreaker("diagnosis")
+        result = await breaker.call(_diagnose_answer_logic, answer, key, text)
+    """
+
+    def __init__(self, name, window=CIRCUIT_WINDOW, min_calls=CIRCUIT_MIN_CALLS,
+                 error_rate=CIRCUIT_ERROR_RATE, latency_p95_ms=CIRCUIT_LATENCY_P95_MS,
+                 open_s=CIRCUIT_OPEN_S, clock=time.monotonic, ignore=()):
+        self.name = name
+        self.ignore = ignore  # 不计入成败的异常类型（本地拒绝，没有到达外部服务）
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency_p95_ms = latency_p95_ms
+        self.open_s = open_s
+        self._clock = clock
+        self._calls = deque(maxlen=window)  # (成功, 耗时ms)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._set_gauge()
+
+    @property
+    def state(self):
+        """当前状态；打开时间已到但还没有探测调用时报告为 half_open"""
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_s:
+            return HALF_OPEN
+        return self._state
+
+    def _set_gauge(self):
+        metrics.set_gauge("circuit.state", _STATE_GAUGE[self._state], breaker=self.name)
+
+    def _open(self, reason):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self._set_gauge()
+        metrics.inc("circuit.opened", breaker=self.name)
+        print(f"🔌 熔断器 {self.name} 打开（{reason}），{self.open_s:.0f}s 后探测")
+
+    def _close(self):
+        self._state = CLOSED
+        self._calls.clear()
+        self._set_gauge()
+        print(f"✅ 熔断器 {self.name} 已关闭")
+
+    def allow(self):
+        """是否放行本次调用；半开状态下只放行一个探测调用"""
+        if self._state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._state = HALF_OPEN
+            self._probing = True
+            self._set_gauge()
+            return True
+        metrics.inc("circuit.rejected", breaker=self.name)
+        return False
+
+    def _p95(self):
+        latencies = sorted(latency for _, latency in self._calls)
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def record(self, ok, latency_ms):
+        """记录一次调用结果"""
+        slow = latency_ms >= self.latency_p95_ms
+        if self._state == HALF_OPEN:
+            self._probing = False
+            if ok and not slow:
+                self._close()
+            else:
+                self._open("探测调用失败" if not ok else f"探测调用耗时 {latency_ms:.0f}ms")
+            return
+        if self._state == OPEN:
+            return
+
+        self._calls.append((ok, latency_ms))
+        if len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for success, _ in self._calls if not success)
+        if failures / len(self._calls) >= self.error_rate:
+            self._open(f"最近 {len(self._calls)} 次调用失败 {failures} 次")
+        elif self._p95() >= self.latency_p95_ms:
+            self._open(f"P95 耗时 {self._p95():.0f}ms")
+
+    async def call(self, func, *args, **kwargs):
+        """
+        经熔断器调用 await func(*args, **kwargs)
+
+        Raises:
+            CircuitOpen: 熔断器打开
+            其余异常原样抛出（ignore 中的类型不计入，其他计为一次失败）
+        """
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} 熔断中")
+        start = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except (asyncio.CancelledError, *self.ignore):
+            # 调用方取消或本地拒绝不代表外部服务出错，只释放探测名额
+            self._probing = False
+            raise
+        except Exception:
+            self.record(False, (time.perf_counter() - start) * 1000)
+            raise
+        self.record(True, (time.perf_counter() - start) * 1000)
+        return result
@@ -2,16 +2,336 @@
 # -*- coding: utf-8 -*-
 """
 数据库连接模块
+提供预调优的SQLite连接池：连接在进程内复用，PRAGMA只在建连时设置一次。
+async 路由通过 run_db / run_user_db 在数据库线程池中使用连接；
+get_db_connection()（用完 close() 归还）和 FastAPI 依赖 get_db 供脚本和同步代码使用。
+开启分片（见 sharding.py）后，按学生访问的数据通过 run_user_db(user_id, ...) 路由到对应分片。
 """
 
-import sqlite3
+import asyncio
+import contextvars
+import functools
 import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .sql_trace import TracedConnectionMixin
+
+# 获取当前文件所在目录的上级目录中的data文件夹
+_DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'data', 'my_database.db')
+
+DB_PATH = os.path.abspath(os.environ.get("DB_PATH", _DEFAULT_DB_PATH))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+# 异步路由同时在途的数据库操作上限（超出的请求在事件循环上排队，不占用线程）
+# 默认等于连接池大小：线程池占满时连接也恰好全部借出，这依赖于 async 路由不在事件循环上
+# 直接调用 get_db_connection()（连接池耗尽时那里立即失败），所有路由都要经过 run_db / run_user_db
+DB_MAX_CONCURRENCY = int(os.environ.get("DB_MAX_CONCURRENCY", str(DB_POOL_SIZE)))
+
+# 每个连接建立时执行一次的PRAGMA
+CONNECTION_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))),
+    ("cache_size", int(os.environ.get("DB_CACHE_SIZE", "-65536"))),  # 负数单位为KiB，即64MB
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", DB_BUSY_TIMEOUT_MS),
+)
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """在 DB_POOL_TIMEOUT 内没有借到连接（在事件循环线程上借用时不等待）"""
 
-def get_db_connection():
-    """获取数据库连接"""
-    # 获取当前文件所在目录的上级目录中的data文件夹
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    db_path = os.path.join(current_dir, '..', '..', '..', 'data', 'my_database.db')
-    conn = sqlite3.connect(db_path)
+
+def _on_event_loop():
+    """当前线程是否正在运行事件循环"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def connect(db_path, pragmas=CONNECTION_PRAGMAS, uri=False):
+    """创建一个已设置好PRAGMA的连接"""
+    conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False, uri=uri)
     conn.row_factory = sqlite3.Row
-    return conn 
\ No newline at end of file
+    for name, value in pragmas:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class PooledConnection(TracedConnectionMixin):
+    """
+    借出的连接代理。
+    close() 将连接归还连接池而不是真正关闭；未显式关闭的代理在被回收时也会归还，
+    避免错误分支提前返回导致连接泄漏。execute/cursor 执行的SQL计入当前请求的统计（见 sql_trace.py）。
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    @property
+    def raw(self):
+        """底层 sqlite3.Connection"""
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return self._conn
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        self.raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.raw.__exit__(exc_type, exc_value, traceback)
+
+    def __del__(self):
+        if self.__dict__.get("_conn") is not None:
+            metrics.inc("db.pool.leaked")
+            self.close()
+
+
+class ConnectionPool:
+    """固定上限的SQLite连接池"""
+
+    def __init__(self, db_path, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, connector=connect):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._connector = connector
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+
+    def _new_connection(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            conn = self._connector(self.db_path)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        metrics.inc("db.pool.connections_opened")
+        return conn
+
+    def acquire(self):
+        """
+        借出一个连接，连接池耗尽时最多等待 timeout 秒。
+        在事件循环线程上（async 路由直接调用 get_db_connection）不等待：阻塞等待会冻结整个事件循环，
+        而持有连接的协程无法运行、也就无法归还，因此立即抛出 PoolTimeoutError；
+        需要排队的数据库操作应通过 run_db / run_user_db 在线程池中执行。
+        """
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection()
+            if conn is None:
+                if _on_event_loop():
+                    metrics.inc("db.pool.loop_exhausted")
+                    raise PoolTimeoutError("数据库连接池已耗尽（事件循环线程上不等待，请改用 run_db）")
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    metrics.inc("db.pool.timeouts")
+                    raise PoolTimeoutError(f"等待数据库连接超时（{self.timeout}s）")
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._in_use += 1
+            in_use = self._in_use
+        metrics.inc("db.pool.checkouts")
+        metrics.observe("db.pool.wait_ms", wait_ms)
+        metrics.set_gauge("db.pool.in_use", in_use)
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """归还连接，未提交的事务会被回滚"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+                metrics.inc("db.pool.rollbacks_on_release")
+        except sqlite3.Error:
+            # 连接已损坏，直接丢弃并让出名额
+            with self._lock:
+                self._created -= 1
+                self._in_use -= 1
+            conn.close()
+            return
+        with self._lock:
+            self._in_use -= 1
+            in_use = self._in_use
+        metrics.set_gauge("db.pool.in_use", in_use)
+        self._idle.put(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+            }
+
+    def close_all(self):
+        """关闭所有空闲连接（进程退出时调用）"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(user_id=None):
+    """
+    获取进程级连接池（惰性创建）。
+    开启分片且传入 user_id 时，返回该学生所在分片的连接池。
+    """
+    global _pool
+    if user_id is not None:
+        from .sharding import get_router
+        router = get_router()
+        if router is not None:
+            return router.pool_for_user(user_id)
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def as_node_id(value):
+    """
+    知识点ID统一按整数绑定。
+    前端、AI决策JSON里的node_id常常是字符串，直接绑定会让 INTEGER 列上的索引失效。
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"非法的知识点ID: {value!r}")
+    if isinstance(value, int):
+        return value
+    return int(str(value).strip())
+
+
+def get_db_connection(user_id=None):
+    """获取数据库连接（从连接池借出，close() 归还）；按学生访问数据时传入 user_id"""
+    return get_pool(user_id).acquire()
+
+
+def get_db():
+    """FastAPI依赖：请求期间持有一个连接，请求结束后无论成功与否都归还"""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+# --- 异步访问 ---
+# 所有路由都是 async def，直接在事件循环上执行 sqlite3 查询会让一个慢查询阻塞整个 worker。
+# run_db 把查询放到专用线程池执行，并用信号量限制同时在途的数据库操作数。
+
+_executor = None
+_executor_lock = threading.Lock()
+_semaphore = None
+_in_flight = 0
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DB_MAX_CONCURRENCY, thread_name_prefix="db")
+    return _executor
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(DB_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _call_with_connection(pool, func, args, kwargs):
+    conn = pool.acquire()
+    try:
+        return func(conn, *args, **kwargs)
+    finally:
+        conn.close()
+
+
+async def _run_on_pool(pool, func, args, kwargs):
+    global _in_flight
+    start = time.perf_counter()
+    async with _get_semaphore():
+        metrics.observe("db.async.queue_wait_ms", (time.perf_counter() - start) * 1000)
+        _in_flight += 1
+        metrics.set_gauge("db.async.in_flight", _in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            # 复制上下文，使线程内的代码能读到当前请求的 contextvars
+            call = functools.partial(contextvars.copy_context().run, _call_with_connection, pool, func, args, kwargs)
+            return await loop.run_in_executor(_get_executor(), call)
+        finally:
+            _in_flight -= 1
+            metrics.set_gauge("db.async.in_flight", _in_flight)
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    在数据库线程池中执行 func(conn, *args, **kwargs) 并等待结果。
+    conn 从连接池借出，func 返回后自动归还；func 内需要写入时自行 commit。
+
+    用法:
+        rows = await run_db(_query_knowledge_map, user_id)
+    """
+    return await _run_on_pool(get_pool(), func, args, kwargs)
+
+
+async def run_user_db(user_id, func, *args, **kwargs):
+    """同 run_db，连接来自该学生所在的分片（未开启分片时与 run_db 相同）"""
+    return await _run_on_pool(get_pool(user_id), func, args, kwargs)
+
+
+async def fan_out_db(func, *args, **kwargs):
+    """
+    在每个分片上并行执行 func(conn, *args, **kwargs)，按分片顺序返回结果列表，由调用方合并。
+    未开启分片时只在主库上执行一次，返回单元素列表。
+    """
+    from .sharding import get_router
+    router = get_router()
+    pools = router.all_pools() if router is not None else [get_pool()]
+    return await asyncio.gather(*[_run_on_pool(pool, func, args, kwargs) for pool in pools])
+
+
+def shutdown_executor():
+    """进程退出时关闭数据库线程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
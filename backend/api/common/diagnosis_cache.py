@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+诊断结果缓存
+很多学生对同一道题提交完全相同的答案（选择题、简短的填空题尤其如此），
+相同的 (question_id, 归一化答案) 直接复用上一次AI诊断的结果：
+- 一级：进程内 LRU + TTL
+- 二级：数据库中的 diagnosis_cache 表（迁移 0005），进程重启和多个 worker 之间共享
+
+缓存项同时记录题干与标准答案的摘要，题目内容变化后旧结果不会再命中；
+教师修改或删除题目时调用 invalidate_question() 主动清理。
+命中率、命中时节省的AI耗时通过 /metrics 的 diagnosis_cache.* 导出。
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from . import metrics
+from .database import run_db
+from .write_queue import submit_write
+
+DIAGNOSIS_CACHE_SIZE = int(os.environ.get("DIAGNOSIS_CACHE_SIZE", "10000"))
+DIAGNOSIS_CACHE_TTL_S = float(os.environ.get("DIAGNOSIS_CACHE_TTL_S", "3600"))
+DIAGNOSIS_CACHE_DB_TTL_DAYS = int(os.environ.get("DIAGNOSIS_CACHE_DB_TTL_DAYS", "30"))
+# 过长的答案几乎不会重复，不缓存
+DIAGNOSIS_CACHE_MAX_ANSWER_LEN = int(os.environ.get("DIAGNOSIS_CACHE_MAX_ANSWER_LEN", "200"))
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[.。,，;；!！]+$")
+
+
+def normalize_answer(answer):
+    """全角转半角、统一大小写、去掉空白和末尾标点，例如 ' Ｂ。' -> 'b'"""
+    text = unicodedata.normalize("NFKC", answer or "").lower()
+    text = _WHITESPACE.sub("", text)
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def question_hash(question_text, correct_answer):
+    """题干与标准答案的摘要，题目被修改后缓存键随之变化"""
+    digest = hashlib.sha1()
+    digest.update((question_text or "").encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update((correct_answer or "").encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class MemoryTier:
+    """线程安全的 LRU + TTL 缓存，值为 (result_json, llm_ms)"""
+
+    def __init__(self, size=DIAGNOSIS_CACHE_SIZE, ttl_s=DIAGNOSIS_CACHE_TTL_S):
+        self.size = size
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_s, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def forget_question(self, question_id):
+        with self._lock:
+            for key in [key for key in self._items if key[0] == question_id]:
+                del self._items[key]
+
+    def __len__(self):
+        return len(self._items)
+
+
+_memory = MemoryTier()
+_stats_lock = threading.Lock()
+_lookups = 0
+_hits = 0
+
+
+def _count(hit, tier=None):
+    global _lookups, _hits
+    with _stats_lock:
+        _lookups += 1
+        _hits += 1 if hit else 0
+        rate = _hits / _lookups
+    if hit:
+        metrics.inc("diagnosis_cache.hits", tier=tier)
+    else:
+        metrics.inc("diagnosis_cache.misses")
+    metrics.set_gauge("diagnosis_cache.hit_rate", round(rate, 4))
+    metrics.set_gauge("diagnosis_cache.memory_entries", len(_memory))
+
+
+def _load(conn, question_id, answer_key, q_hash):
+    cutoff = (datetime.now() - timedelta(days=DIAGNOSIS_CACHE_DB_TTL_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    row = conn.execute("""
+        SELECT result_json, llm_ms FROM diagnosis_cache
+        WHERE question_id = ? AND answer_key = ? AND question_hash = ? AND created_at >= ?
+    """, (question_id, answer_key, q_hash, cutoff)).fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def _store(conn, question_id, answer_key, q_hash, result_json, llm_ms):
+    conn.execute("""
+        INSERT INTO diagnosis_cache (question_id, answer_key, question_hash, result_json, llm_ms, created_at)
+        VALUES (?, ?, ?, ?, ?, datetime('now', 'localtime'))
+        ON CONFLICT(question_id, answer_key) DO UPDATE SET
+            question_hash = excluded.question_hash,
+            result_json = excluded.result_json,
+            llm_ms = excluded.llm_ms,
+            created_at = excluded.created_at
+    """, (question_id, answer_key, q_hash, result_json, llm_ms))
+
+
+def _cache_key(question_id, question_text, correct_answer, answer):
+    answer_key = normalize_answer(answer)
+    if not answer_key or len(answer_key) > DIAGNOSIS_CACHE_MAX_ANSWER_LEN:
+        return None
+    return int(question_id), answer_key, question_hash(question_text, correct_answer)
+
+
+async def lookup(question_id, question_text, correct_answer, answer):
+    """返回缓存的诊断结果（新的 dict），未命中返回 None"""
+    key = _cache_key(question_id, question_text, correct_answer, answer)
+    if key is None:
+        return None
+
+    tier = "memory"
+    value = _memory.get(key)
+    if value is None:
+        tier = "db"
+        try:
+            value = await run_db(_load, *key)
+        except Exception as e:
+            # 缓存不可用时退回正常诊断
+            print(f"⚠️ 读取诊断缓存失败: {e}")
+            value = None
+        if value is not None:
+            _memory.put(key, value)
+
+    if value is None:
+        _count(False)
+        return None
+    result_json, llm_ms = value
+    _count(True, tier)
+    metrics.observe("diagnosis_cache.saved_ms", llm_ms)
+    return json.loads(result_json)
+
+
+async def store(question_id, question_text, correct_answer, answer, result, llm_ms):
+    """保存一次AI诊断的结果"""
+    key = _cache_key(question_id, question_text, correct_answer, answer)
+    if key is None:
+        return
+    result_json = json.dumps(result, ensure_ascii=False)
+    _memory.put(key, (result_json, llm_ms))
+    try:
+        await submit_write(_store, *key, result_json, llm_ms)
+    except Exception as e:
+        print(f"⚠️ 写入诊断缓存失败: {e}")
+
+
+def invalidate_question(conn, question_id):
+    """删除某道题的全部缓存（在修改题目的同一事务里调用，由调用方提交）"""
+    conn.execute("DELETE FROM diagnosis_cache WHERE question_id = ?", (int(question_id),))
+    _memory.forget_question(int(question_id))
+    metrics.inc("diagnosis_cache.invalidations")
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享的异步HTTP客户端
+所有对讯飞星辰工作流（诊断、总指挥决策、适合度评估、学习目标、OCR）以及本地GNN服务的调用
+都走同一个 aiohttp 会话：
+- 长连接复用，不再每次调用都重新建立TLS连接
+- 按 flow_id 设置超时，超时、连接错误、429/5xx 有限次重试（指数退避 + 随机抖动）
+- 每个 flow_id 的耗时、调用次数、重试与失败次数通过 /metrics 导出（llm.*）
+
+调用在事件循环里等待，不占用线程，单个 worker 可以同时挂起几十个LLM请求。
+工作流调用先经 llm_scheduler 按优先级和学生令牌桶准入，饱和时排队或抛出 LLMOverloaded。
+stream_workflow() 以流式方式调用工作流，内容片段到达即产出（首个片段耗时记为 llm.ttft_ms）。
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+import weakref
+
+import aiohttp
+
+from . import llm_scheduler, metrics
+
+# 设置 LLM_STUB_URL（如 http://127.0.0.1:8009）时所有工作流调用改走本地替身 llm_stub_server.py
+LLM_BASE_URL = os.environ.get("LLM_STUB_URL") or os.environ.get("LLM_BASE_URL", "https://xingchen-api.xf-yun.com")
+WORKFLOW_URL = os.environ.get("LLM_WORKFLOW_URL", LLM_BASE_URL.rstrip("/") + "/workflow/v1/chat/completions")
+UPLOAD_URL = os.environ.get("LLM_UPLOAD_URL", LLM_BASE_URL.rstrip("/") + "/workflow/v1/upload_file")
+LLM_API_KEY = os.environ.get("LLM_API_KEY", "4cec7267c3353726a2f1656cb7c0ec37:NDk0MDk0N2JiYzg0ZTgxMzVlNmRkM2Fh")
+
+# 工作流ID
+FLOW_DIAGNOSIS = "7347650620700119042"          # 答案诊断
+FLOW_STRATEGY = "7352207588747141122"           # 总指挥决策（推荐任务类型）
+FLOW_SUITABILITY = "7358414739635269632"        # 候选知识点适合度评估
+FLOW_LEARNING_OBJECTIVE = "7355086692730109954" # 生成学习目标
+FLOW_OCR = "7358509673684582402"                # 图片转文字
+
+# 各工作流的默认调度优先级（llm_caller() 指定的优先级优先），未列出的工作流按 batch 处理
+FLOW_PRIORITIES = {
+    FLOW_DIAGNOSIS: llm_scheduler.INTERACTIVE,
+    FLOW_OCR: llm_scheduler.INTERACTIVE,
+    "upload_file": llm_scheduler.INTERACTIVE,
+    FLOW_STRATEGY: llm_scheduler.RECOMMENDATION,
+    FLOW_SUITABILITY: llm_scheduler.RECOMMENDATION,
+    FLOW_LEARNING_OBJECTIVE: llm_scheduler.TEACHER,
+}
+
+# 连接池大小与空闲连接保活时间
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "100"))
+HTTP_KEEPALIVE_S = float(os.environ.get("HTTP_KEEPALIVE_S", "30"))
+
+# 超时（秒）：未单独配置的工作流使用 LLM_TIMEOUT_S，可用 LLM_TIMEOUT_<flow_id> 覆盖单个工作流
+LLM_TIMEOUT_S = float(os.environ.get("LLM_TIMEOUT_S", "60"))
+FLOW_TIMEOUTS = {
+    FLOW_DIAGNOSIS: 30,
+    FLOW_STRATEGY: 60,
+    FLOW_SUITABILITY: 30,
+    FLOW_LEARNING_OBJECTIVE: 60,
+    FLOW_OCR: 45,
+}
+
+# 首次调用之外的最大重试次数，以及退避基准（毫秒）
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_MS = float(os.environ.get("LLM_RETRY_BASE_MS", "500"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# 每个事件循环一个会话（服务进程只有一个；评测脚本可能在多个线程里各自 asyncio.run）
+_sessions = weakref.WeakKeyDictionary()
+_in_flight = 0
+
+
+class LLMError(Exception):
+    """外部调用失败：重试后仍超时/出错、返回非2xx，或响应格式不符合约定"""
+
+
+class LLMOverloaded(LLMError):
+    """调度器饱和，调用被丢弃，没有发往外部服务（接口应返回503）"""
+
+
+def _flow_timeout(flow_id):
+    return float(os.environ.get(f"LLM_TIMEOUT_{flow_id}", FLOW_TIMEOUTS.get(flow_id, LLM_TIMEOUT_S)))
+
+
+async def _admit(flow):
+    """按当前调用方的优先级和学生申请调用名额，调用结束后需 llm_scheduler.scheduler.release()"""
+    user_id, priority = llm_scheduler.current_caller()
+    try:
+        await llm_scheduler.scheduler.acquire(priority or FLOW_PRIORITIES.get(flow, llm_scheduler.BATCH), user_id)
+    except llm_scheduler.LLMShed as e:
+        raise LLMOverloaded(f"{flow} {e}") from None
+
+
+def _auth_headers():
+    return {"Authorization": f"Bearer {LLM_API_KEY}"}
+
+
+def get_session():
+    """当前事件循环的共享会话，首次使用时创建"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            keepalive_timeout=HTTP_KEEPALIVE_S,
+            ttl_dns_cache=300,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        _sessions[loop] = session
+    return session
+
+
+async def close_http_client():
+    """关闭当前事件循环的会话（服务关闭时调用）"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def _track_in_flight(delta):
+    global _in_flight
+    _in_flight += delta
+    metrics.set_gauge("llm.in_flight", _in_flight)
+
+
+async def _post(flow, url, timeout, retries=LLM_MAX_RETRIES, headers=None, json_body=None, form_factory=None):
+    """
+    发送POST并返回解析后的JSON。
+    表单每次重试都要重新构造（aiohttp 的 FormData 只能发送一次），因此上传传入 form_factory。
+    """
+    session = get_session()
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    error = None
+    for attempt in range(retries + 1):
+        status = None
+        start = time.perf_counter()
+        _track_in_flight(1)
+        try:
+            data = form_factory() if form_factory else None
+            async with session.post(url, json=json_body, data=data, headers=headers,
+                                    timeout=client_timeout) as response:
+                status = response.status
+                if status < 400:
+                    try:
+                        result = await response.json(content_type=None)
+                    except ValueError:
+                        # 返回了非JSON内容，重试通常也无济于事
+                        metrics.inc("llm.errors", flow_id=flow)
+                        raise LLMError(f"{flow} 返回的不是JSON: {(await response.text())[:200]}")
+                else:
+                    error = f"HTTP {status}: {(await response.text())[:200]}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        finally:
+            _track_in_flight(-1)
+            metrics.observe("llm.latency_ms", (time.perf_counter() - start) * 1000, flow_id=flow)
+
+        metrics.inc("llm.calls", flow_id=flow, status=status or "error")
+        if status is not None and status < 400:
+            return result
+        if status is not None and status not in RETRYABLE_STATUS:
+            break
+        if attempt < retries:
+            # 全抖动退避：在 [0, base * 2^attempt] 内随机等待，避免大量请求同时重试
+            delay_ms = random.uniform(0, LLM_RETRY_BASE_MS * (2 ** attempt))
+            metrics.inc("llm.retries", flow_id=flow)
+            print(f"🔁 {flow} 调用失败（{error}），{delay_ms:.0f}ms 后第 {attempt + 1} 次重试")
+            await asyncio.sleep(delay_ms / 1000)
+
+    metrics.inc("llm.errors", flow_id=flow)
+    raise LLMError(f"{flow} 调用失败: {error}")
+
+
+async def call_workflow(flow_id, parameters, timeout=None, retries=LLM_MAX_RETRIES):
+    """
+    调用星辰工作流，返回 choices[0].delta.content 文本。
+
+    Args:
+        flow_id: 工作流ID（FLOW_* 常量）
+        parameters: 工作流输入参数，例如 {"AGENT_USER_INPUT": "..."}
+        timeout: 单次请求超时（秒），默认按 flow_id 配置
+        retries: 最大重试次数
+
+    Raises:
+        LLMOverloaded: 调度器饱和
+        LLMError: 调用失败、响应格式错误或内容为空
+    """
+    payload = {
+        "flow_id": flow_id,
+        "parameters": parameters,
+        "ext": {
+            "bot_id": "workflow",
+            "caller": "workflow"
+        },
+        "stream": False,
+    }
+    await _admit(flow_id)
+    try:
+        response = await _post(flow_id, WORKFLOW_URL, timeout or _flow_timeout(flow_id), retries,
+                               headers=_auth_headers(), json_body=payload)
+    finally:
+        llm_scheduler.scheduler.release()
+    choices = response.get("choices") if isinstance(response, dict) else None
+    if not choices or "delta" not in choices[0]:
+        raise LLMError(f"{flow_id} 响应格式错误")
+    content = choices[0]["delta"].get("content")
+    if not content:
+        raise LLMError(f"{flow_id} 未生成内容")
+    return content
+
+
+async def stream_workflow(flow_id, parameters, timeout=None, retries=LLM_MAX_RETRIES):
+    """
+    流式调用星辰工作流，逐段产出 choices[0].delta.content。
+    收到第一个片段之前的失败按 call_workflow 的规则重试；之后出错直接抛出（已产出的内容无法撤回）。
+
+    用法:
+        async for text in stream_workflow(FLOW_DIAGNOSIS, {"AGENT_USER_INPUT": ...}):
+            ...
+
+    Raises:
+        LLMOverloaded: 调度器饱和
+        LLMError: 调用失败、流中返回错误或没有生成任何内容
+    """
+    payload = {
+        "flow_id": flow_id,
+        "parameters": parameters,
+        "ext": {
+            "bot_id": "workflow",
+            "caller": "workflow"
+        },
+        "stream": True,
+    }
+    await _admit(flow_id)
+    try:
+        async with contextlib.aclosing(_stream_attempts(flow_id, payload, timeout, retries)) as chunks:
+            async for text in chunks:
+                yield text
+    finally:
+        llm_scheduler.scheduler.release()
+
+
+async def _stream_attempts(flow_id, payload, timeout, retries):
+    """stream_workflow 的请求与重试部分（已取得调度名额）"""
+    session = get_session()
+    client_timeout = aiohttp.ClientTimeout(total=timeout or _flow_timeout(flow_id))
+    error = None
+    for attempt in range(retries + 1):
+        status = None
+        produced = False
+        start = time.perf_counter()
+        _track_in_flight(1)
+        try:
+            async with session.post(WORKFLOW_URL, json=payload, headers=_auth_headers(),
+                                    timeout=client_timeout) as response:
+                status = response.status
+                if status >= 400:
+                    error = f"HTTP {status}: {(await response.text())[:200]}"
+                else:
+                    async for raw_line in response.content:
+                        line = raw_line.decode("utf-8").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            event = json.loads(data)
+                        except ValueError:
+                            raise LLMError(f"{flow_id} 流式响应格式错误: {data[:200]}")
+                        if event.get("code", 0) != 0:
+                            raise LLMError(f"{flow_id} 流中返回错误: {event.get('message')}")
+                        choices = event.get("choices") or [{}]
+                        text = (choices[0].get("delta") or {}).get("content")
+                        if text:
+                            if not produced:
+                                produced = True
+                                metrics.observe("llm.ttft_ms", (time.perf_counter() - start) * 1000, flow_id=flow_id)
+                            yield text
+                        if choices[0].get("finish_reason") == "stop":
+                            break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            if produced:
+                metrics.inc("llm.errors", flow_id=flow_id)
+                raise LLMError(f"{flow_id} 流式响应中断: {error}")
+        except LLMError:
+            metrics.inc("llm.errors", flow_id=flow_id)
+            raise
+        finally:
+            _track_in_flight(-1)
+            metrics.observe("llm.latency_ms", (time.perf_counter() - start) * 1000, flow_id=flow_id)
+
+        metrics.inc("llm.calls", flow_id=flow_id, status=status or "error")
+        if produced:
+            return
+        if status is not None and status < 400:
+            metrics.inc("llm.errors", flow_id=flow_id)
+            raise LLMError(f"{flow_id} 未生成内容")
+        if status is not None and status not in RETRYABLE_STATUS:
+            break
+        if attempt < retries:
+            delay_ms = random.uniform(0, LLM_RETRY_BASE_MS * (2 ** attempt))
+            metrics.inc("llm.retries", flow_id=flow_id)
+            print(f"🔁 {flow_id} 流式调用失败（{error}），{delay_ms:.0f}ms 后第 {attempt + 1} 次重试")
+            await asyncio.sleep(delay_ms / 1000)
+
+    metrics.inc("llm.errors", flow_id=flow_id)
+    raise LLMError(f"{flow_id} 调用失败: {error}")
+
+
+async def upload_workflow_file(path, content_type, filename=None, timeout=None, retries=LLM_MAX_RETRIES):
+    """上传本地文件到工作流平台，返回文件URL（文件按块读取，不整体载入内存）"""
+    def form_factory():
+        form = aiohttp.FormData()
+        # aiohttp 发送完毕后会关闭文件
+        form.add_field("file", open(path, "rb"), filename=filename or os.path.basename(path),
+                       content_type=content_type)
+        return form
+
+    await _admit("upload_file")
+    try:
+        result = await _post("upload_file", UPLOAD_URL, timeout or _flow_timeout(FLOW_OCR), retries,
+                             headers=_auth_headers(), form_factory=form_factory)
+    finally:
+        llm_scheduler.scheduler.release()
+    try:
+        return result["data"]["url"]
+    except (KeyError, TypeError):
+        raise LLMError(f"文件上传响应格式错误: {str(result)[:200]}")
+
+
+async def post_json(name, url, payload, timeout, retries=0):
+    """向内部服务（如GNN预测）发送JSON请求，指标按 name 归类"""
+    return await _post(name, url, timeout, retries, json_body=payload)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提交接口的幂等键
+客户端为一次提交生成 Idempotency-Key 请求头，重复发送（Streamlit 重跑、网络重试）时：
+- 同一个键的请求仍在处理中：等待并共享那一次的结果，不再重复调用AI和写库
+- 已经处理完成：直接返回保存的结果
+- 同一个键用于内容不同的请求：抛出 IdempotencyConflict（接口返回 422）
+
+完成的结果保存在 idempotency_keys 表（迁移 0008，按学生分片），由业务写意图调用 record()
+与答题记录在同一个事务中写入，保留 IDEMPOTENCY_TTL_HOURS 小时。
+处理中的合并只在本进程内进行。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from . import metrics
+from .database import run_user_db
+
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_MAX_KEY_LEN = 128
+
+# (user_id, scope, key) -> (请求指纹, Future)
+_in_flight = {}
+
+
+class IdempotencyConflict(Exception):
+    """同一个幂等键用于了内容不同的请求"""
+
+
+class InvalidIdempotencyKey(Exception):
+    """幂等键格式不合法"""
+
+
+def fingerprint(*parts):
+    """请求内容的指纹，用于识别同一个键被用于不同的请求"""
+    text = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def _cutoff():
+    return (datetime.now() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _load(conn, user_id, scope, key, cutoff):
+    return conn.execute("""
+        SELECT request_hash, response_json FROM idempotency_keys
+        WHERE user_id = ? AND scope = ? AND idem_key = ? AND created_at >= ?
+    """, (user_id, scope, key, cutoff)).fetchone()
+
+
+def record(conn, user_id, scope, key, request_hash, response):
+    """保存一次提交的结果（在业务写意图中调用，不自行提交），顺带清理该学生过期的记录"""
+    conn.execute("DELETE FROM idempotency_keys WHERE user_id = ? AND created_at < ?", (user_id, _cutoff()))
+    conn.execute("""
+        INSERT OR REPLACE INTO idempotency_keys (user_id, scope, idem_key, request_hash, response_json, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (user_id, scope, key, request_hash, json.dumps(response, ensure_ascii=False),
+          datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+async def run_once(user_id, scope, key, request_hash, handler):
+    """
+    按幂等键执行一次 await handler()
+
+    Args:
+        key: Idempotency-Key，为空时直接执行 handler
+        request_hash: fingerprint() 计算的请求指纹
+        handler: 无参协程函数，需在其写意图中调用 record() 保存结果
+
+    Raises:
+        IdempotencyConflict: 键已用于内容不同的请求
+        InvalidIdempotencyKey: 键过长
+    """
+    if not key:
+        return await handler()
+    if len(key) > IDEMPOTENCY_MAX_KEY_LEN:
+        raise InvalidIdempotencyKey(f"Idempotency-Key 不能超过 {IDEMPOTENCY_MAX_KEY_LEN} 个字符")
+
+    ident = (str(user_id), scope, key)
+    running = _in_flight.get(ident)
+    if running is not None:
+        if running[0] != request_hash:
+            raise IdempotencyConflict("Idempotency-Key 已用于内容不同的请求")
+        metrics.inc("idempotency.coalesced", scope=scope)
+        return await asyncio.shield(running[1])
+
+    # 先登记为处理中再查库，查库期间到达的重复请求也会合并到这里
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[ident] = (request_hash, future)
+    try:
+        stored = await run_user_db(user_id, _load, user_id, scope, key, _cutoff())
+        if stored is not None:
+            if stored["request_hash"] != request_hash:
+                raise IdempotencyConflict("Idempotency-Key 已用于内容不同的请求")
+            metrics.inc("idempotency.replayed", scope=scope)
+            result = json.loads(stored["response_json"])
+        else:
+            result = await handler()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # 没有等待者时避免 "exception was never retrieved" 警告
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _in_flight.pop(ident, None)
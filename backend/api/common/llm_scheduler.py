@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM调用准入调度
+交互诊断、推荐决策、教师端生成和离线评测共用同一个工作流配额，本模块在进程内统一排队：
+- 全局并发上限 LLM_MAX_CONCURRENCY：同时发往外部服务的调用数
+- 优先级（高到低）：interactive（答案诊断、OCR）> recommendation（推荐决策、适合度评估）
+  > teacher（教师端生成）> batch（离线评测、后台复核）；有空位时总是先放行优先级高的
+- 每个学生一个令牌桶（LLM_USER_RATE_PER_MIN 每分钟补充，最多 LLM_USER_BURST 个），
+  单个学生的连续提交不会占满配额
+- 饱和时排队，超出以下限制则丢弃并抛出 LLMShed：
+  - 该优先级排队数达到 LLM_QUEUE_LIMIT_<PRIORITY>
+  - 总排队数达到 LLM_QUEUE_LIMIT 时，优先级更高的请求会挤掉最后排队的低优先级请求
+  - 排队（含等待令牌）超过 LLM_MAX_WAIT_S_<PRIORITY> 秒
+
+调用方身份通过 llm_caller() 上下文设置，未设置优先级时由 http_client 按工作流决定。
+评测脚本会在多个线程里各自运行事件循环，因此状态由线程锁保护，放行时投递到等待者所在的事件循环。
+/metrics 导出 llm.sched.active、llm.sched.queue_length{priority=}、llm.sched.dropped{priority=,reason=}、
+llm.sched.wait_ms{priority=}。
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from . import metrics
+
+INTERACTIVE = "interactive"
+RECOMMENDATION = "recommendation"
+TEACHER = "teacher"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, RECOMMENDATION, TEACHER, BATCH)
+_RANK = {priority: rank for rank, priority in enumerate(PRIORITIES)}
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_LIMIT = int(os.environ.get("LLM_QUEUE_LIMIT", "200"))
+LLM_USER_RATE_PER_MIN = float(os.environ.get("LLM_USER_RATE_PER_MIN", "30"))
+# 突发容量与批量诊断单次最多题数（DIAGNOSIS_BATCH_MAX_ITEMS）一致
+LLM_USER_BURST = float(os.environ.get("LLM_USER_BURST", "20"))
+# 令牌桶数量超过该值时清理已补满的桶
+LLM_USER_BUCKETS_MAX = 10000
+
+_DEFAULT_QUEUE_LIMITS = {INTERACTIVE: 200, RECOMMENDATION: 100, TEACHER: 20, BATCH: 50}
+_DEFAULT_MAX_WAIT_S = {INTERACTIVE: 10, RECOMMENDATION: 20, TEACHER: 60, BATCH: 600}
+LLM_QUEUE_LIMITS = {
+    priority: int(os.environ.get(f"LLM_QUEUE_LIMIT_{priority.upper()}", limit))
+    for priority, limit in _DEFAULT_QUEUE_LIMITS.items()
+}
+LLM_MAX_WAIT_S = {
+    priority: float(os.environ.get(f"LLM_MAX_WAIT_S_{priority.upper()}", wait))
+    for priority, wait in _DEFAULT_MAX_WAIT_S.items()
+}
+
+# 等待者状态
+_WAITING = "waiting"
+_GRANTED = "granted"
+_EVICTED = "evicted"
+_ABANDONED = "abandoned"
+
+_caller = contextvars.ContextVar("llm_caller", default=(None, None))
+
+
+class LLMShed(Exception):
+    """调度器饱和，调用被丢弃（没有发往外部服务）"""
+
+    def __init__(self, priority, reason):
+        self.priority = priority
+        self.reason = reason
+        messages = {
+            "queue_full": "排队已满",
+            "timeout": "排队超时",
+            "evicted": "被更高优先级的请求挤出队列",
+            "rate_limited": "调用过于频繁",
+        }
+        super().__init__(f"LLM调用繁忙（{priority}: {messages.get(reason, reason)}），请稍后重试")
+
+
+@contextmanager
+def llm_caller(user_id=None, priority=None):
+    """
+    设置本上下文中LLM调用的学生和优先级
+
+    用法:
+        with llm_caller(user_id=request.user_id):
+            result = await _diagnose(...)
+    """
+    if priority is not None and priority not in _RANK:
+        raise ValueError(f"未知的优先级: {priority}")
+    token = _caller.set((user_id, priority))
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+def current_caller():
+    """返回 (user_id, priority)，未设置的项为 None"""
+    return _caller.get()
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "priority", "state")
+
+    def __init__(self, loop, future, priority):
+        self.loop = loop
+        self.future = future
+        self.priority = priority
+        self.state = _WAITING
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _reject(future, error):
+    if not future.done():
+        future.set_exception(error)
+
+
+class LLMScheduler:
+    """
+    按优先级放行的LLM调用准入（可跨线程、跨事件循环使用）
+
+    用法:
+        await scheduler.acquire(INTERACTIVE, user_id)
+        try:
+            ...  # 调用外部服务
+        finally:
+            scheduler.release()
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, queue_limit=LLM_QUEUE_LIMIT,
+                 queue_limits=LLM_QUEUE_LIMITS, max_wait_s=LLM_MAX_WAIT_S,
+                 user_rate_per_min=LLM_USER_RATE_PER_MIN, user_burst=LLM_USER_BURST, clock=time.monotonic):
+        self.max_concurrency = max_concurrency
+        self.queue_limit = queue_limit
+        self.queue_limits = dict(queue_limits)
+        self.max_wait_s = dict(max_wait_s)
+        self.user_rate = user_rate_per_min / 60.0
+        self.user_burst = user_burst
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._active = 0
+        self._heap = []  # (优先级序号, 序号, 等待者)；离开队列的等待者留在堆中，弹出时跳过
+        self._queued = {priority: 0 for priority in PRIORITIES}
+        self._seq = itertools.count()
+        self._buckets = {}  # user_id -> (令牌数, 更新时间)
+
+    def _set_gauges(self):
+        metrics.set_gauge("llm.sched.active", self._active)
+        for priority, count in self._queued.items():
+            metrics.set_gauge("llm.sched.queue_length", count, priority=priority)
+
+    def _drop(self, priority, reason):
+        metrics.inc("llm.sched.dropped", priority=priority, reason=reason)
+        return LLMShed(priority, reason)
+
+    def _reserve_token(self, user_id, max_wait):
+        """预支一个令牌，返回需要等待的秒数；等待超过 max_wait 时不预支并返回 None"""
+        with self._lock:
+            now = self._clock()
+            tokens, updated = self._buckets.get(user_id, (self.user_burst, now))
+            tokens = min(self.user_burst, tokens + (now - updated) * self.user_rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.user_rate
+            if wait > max_wait:
+                return None
+            if len(self._buckets) >= LLM_USER_BUCKETS_MAX:
+                self._buckets = {
+                    key: value for key, value in self._buckets.items()
+                    if value[0] + (now - value[1]) * self.user_rate < self.user_burst
+                }
+            self._buckets[user_id] = (tokens - 1, now)
+            return wait
+
+    def _evict_for(self, rank):
+        """总排队数已满时挤掉最后排队的、优先级低于 rank 的等待者，成功返回 True（需持有锁）"""
+        victims = [entry for entry in self._heap if entry[2].state == _WAITING and entry[0] > rank]
+        if not victims:
+            return False
+        _, _, victim = max(victims, key=lambda entry: (entry[0], entry[1]))
+        victim.state = _EVICTED
+        self._queued[victim.priority] -= 1
+        try:
+            victim.loop.call_soon_threadsafe(_reject, victim.future, self._drop(victim.priority, "evicted"))
+        except RuntimeError:
+            pass  # 等待者的事件循环已关闭
+        return True
+
+    async def acquire(self, priority, user_id=None):
+        """
+        等待一个调用名额
+
+        Raises:
+            LLMShed: 排队已满、排队超时、被挤出队列或该学生调用过于频繁
+        """
+        start = self._clock()
+        max_wait = self.max_wait_s[priority]
+        if user_id is not None and self.user_rate > 0:
+            wait = self._reserve_token(str(user_id), max_wait)
+            if wait is None:
+                raise self._drop(priority, "rate_limited")
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.max_concurrency and not any(self._queued.values()):
+                self._active += 1
+                self._set_gauges()
+                waiter = None
+            else:
+                if self._queued[priority] >= self.queue_limits[priority]:
+                    raise self._drop(priority, "queue_full")
+                if sum(self._queued.values()) >= self.queue_limit and not self._evict_for(_RANK[priority]):
+                    raise self._drop(priority, "queue_full")
+                waiter = _Waiter(loop, loop.create_future(), priority)
+                heapq.heappush(self._heap, (_RANK[priority], next(self._seq), waiter))
+                self._queued[priority] += 1
+                self._set_gauges()
+
+        if waiter is not None:
+            remaining = max(0.0, max_wait - (self._clock() - start))
+            try:
+                await asyncio.wait_for(waiter.future, remaining)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with self._lock:
+                    state = waiter.state
+                    if state == _WAITING:
+                        waiter.state = _ABANDONED
+                        self._queued[priority] -= 1
+                        self._set_gauges()
+                if state == _GRANTED:
+                    if isinstance(e, asyncio.CancelledError):
+                        self.release()  # 名额已移交但调用方被取消
+                        raise
+                    # 超时与放行同时发生：名额已经属于本调用，照常继续
+                elif isinstance(e, asyncio.CancelledError):
+                    raise
+                elif state == _EVICTED:
+                    raise LLMShed(priority, "evicted") from None
+                else:
+                    raise self._drop(priority, "timeout") from None
+        metrics.observe("llm.sched.wait_ms", (self._clock() - start) * 1000, priority=priority)
+
+    def release(self):
+        """归还名额：有等待者时直接移交给优先级最高、最早排队的那个"""
+        with self._lock:
+            while self._heap:
+                _, _, waiter = heapq.heappop(self._heap)
+                if waiter.state != _WAITING:
+                    continue
+                waiter.state = _GRANTED
+                self._queued[waiter.priority] -= 1
+                try:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                except RuntimeError:
+                    continue  # 等待者的事件循环已关闭，名额交给下一个
+                break
+            else:
+                self._active -= 1
+            self._set_gauges()
+
+    def stats(self):
+        with self._lock:
+            return {"active": self._active, "queued": dict(self._queued)}
+
+
+# 进程级调度器，所有工作流调用共用
+scheduler = LLMScheduler()
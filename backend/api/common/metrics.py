@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内指标模块
+提供计数器、瞬时值和耗时统计，通过 /metrics 接口导出
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timings = {}
+
+
+def _key(name, labels):
+    """将指标名与标签拼接成唯一键，例如 llm.latency_ms{flow_id=123}"""
+    if not labels:
+        return name
+    label_text = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{label_text}}}"
+
+
+def inc(name, value=1, **labels):
+    """计数器累加"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    """设置瞬时值（队列长度、在途请求数等）"""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name, value, **labels):
+    """记录一次耗时或数值样本（单位由调用方在指标名中体现，如 _ms）"""
+    key = _key(name, labels)
+    with _lock:
+        stat = _timings.get(key)
+        if stat is None:
+            stat = _timings[key] = {"count": 0, "total": 0.0, "max": 0.0}
+        stat["count"] += 1
+        stat["total"] += value
+        if value > stat["max"]:
+            stat["max"] = value
+
+
+@contextmanager
+def timer(name, **labels):
+    """统计代码块耗时（毫秒）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000, **labels)
+
+
+def snapshot():
+    """导出当前所有指标"""
+    with _lock:
+        timings = {
+            key: {
+                "count": stat["count"],
+                "avg": round(stat["total"] / stat["count"], 3) if stat["count"] else 0.0,
+                "max": round(stat["max"], 3),
+                "total": round(stat["total"], 3),
+            }
+            for key, stat in _timings.items()
+        }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": timings,
+        }
+
+
+def reset():
+    """清空所有指标（测试用）"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库版本化迁移
+迁移文件位于 data/migrations/，文件名形如 0002_hot_query_indexes.sql 或 0005_xxx.py，
+已应用的版本号记录在 PRAGMA user_version 中。每个迁移在独立事务里执行，
+失败时整体回滚，已有数据不会丢失。
+
+Python 迁移需要定义 upgrade(conn) 函数，conn 已处于事务中，不要在其中提交。
+"""
+
+import importlib.util
+import os
+import re
+import sqlite3
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+MIGRATIONS_DIR = os.path.abspath(os.path.join(BACKEND_DIR, '..', 'data', 'migrations'))
+
+_MIGRATION_FILE = re.compile(r"^(\d{4})_([A-Za-z0-9_]+)\.(sql|py)$")
+
+
+class MigrationError(Exception):
+    """迁移执行失败"""
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """按版本号返回 [(version, name, path), ...]"""
+    migrations = []
+    seen = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in seen:
+            raise MigrationError(f"迁移版本号重复: {seen[version]} 与 {filename}")
+        seen[version] = filename
+        migrations.append((version, match.group(2), os.path.join(directory, filename)))
+    return migrations
+
+
+def current_version(conn):
+    """当前数据库的迁移版本"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _load_python_migration(path):
+    # Python 迁移可能会复用后端模块（如 api.common.xxx）
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    spec = importlib.util.spec_from_file_location(f"_migration_{os.path.basename(path)[:-3]}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, "upgrade"):
+        raise MigrationError(f"{path} 缺少 upgrade(conn) 函数")
+    return module
+
+
+def load_migration(version, directory=MIGRATIONS_DIR):
+    """加载指定版本的 Python 迁移模块，供分片建表时复用迁移中冻结的回填逻辑"""
+    for migration_version, _, path in discover_migrations(directory):
+        if migration_version == version and path.endswith(".py"):
+            return _load_python_migration(path)
+    raise MigrationError(f"找不到版本 {version:04d} 的 Python 迁移")
+
+
+def _apply(conn, version, path):
+    if path.endswith(".sql"):
+        with open(path, 'r', encoding='utf-8') as f:
+            sql = f.read()
+        # executescript 会先提交未完成的事务，所以把 BEGIN/COMMIT 写进脚本本身
+        conn.executescript(f"BEGIN IMMEDIATE;\n{sql}\n;PRAGMA user_version = {version};\nCOMMIT;")
+    else:
+        module = _load_python_migration(path)
+        conn.execute("BEGIN IMMEDIATE")
+        module.upgrade(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.execute("COMMIT")
+
+
+def migrate(conn, target=None, directory=MIGRATIONS_DIR, verbose=True):
+    """
+    将数据库升级到 target 版本（默认最新），返回本次应用的迁移列表。
+
+    Args:
+        conn: sqlite3 连接
+        target: 目标版本号，None 表示最新
+        directory: 迁移文件目录
+    """
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # 事务由迁移自己控制
+    applied = []
+    try:
+        version = current_version(conn)
+        for migration_version, name, path in discover_migrations(directory):
+            if migration_version <= version:
+                continue
+            if target is not None and migration_version > target:
+                break
+            try:
+                _apply(conn, migration_version, path)
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise MigrationError(f"迁移 {os.path.basename(path)} 失败: {e}") from e
+            applied.append((migration_version, name))
+            if verbose:
+                print(f"✅ 已应用迁移 {migration_version:04d}_{name}")
+    finally:
+        conn.isolation_level = previous_isolation
+    return applied
+
+
+def migrate_path(db_path, target=None, directory=MIGRATIONS_DIR, verbose=True):
+    """打开指定数据库文件并执行迁移"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return migrate(conn, target=target, directory=directory, verbose=verbose)
+    finally:
+        conn.close()
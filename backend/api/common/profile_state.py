@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学生画像的增量状态
+学生画像统计最近 PROFILE_WINDOW_SIZE 条"答题 × 知识点"记录：按知识点的作答次数、正确数和各维度平均分。
+原先每次请求都从 user_answers 重新聚合，现在由诊断写入路径增量维护三张表：
+- user_profile_window：窗口内的 (user_id, answer_id, node_id, is_correct)，每个学生最多 PROFILE_WINDOW_SIZE 行
+- user_profile_state：按知识点的滚动计数 interaction_count / correct_count，last_answer_id 用于排序
+- user_profile_dimensions：按知识点、维度的 score_sum / score_count
+
+新记录进入窗口时累加计数，挤出窗口的最旧记录同步减去，计数归零的行删除；
+画像读取只查 user_profile_state 中该学生的行，与知识点数成正比。
+窗口按 answer_id（写入顺序）排列，维度分数取自 user_answer_scores，加入和移出窗口时读取同一份数据，
+因此复核更正（会重写维度评分）和归档（会删除维度评分）需要先调整画像再改动评分。
+
+rebuild_profiles() 从 user_answers 重新计算，供 backend/rebuild_profiles.py 使用（迁移 0010 和分片建表使用迁移中的冻结副本）；
+check_profile() 比较已存状态与重新计算的结果，用于核对增量维护是否正确。
+函数在写意图或迁移事务中调用，不自行提交。
+"""
+
+import os
+
+PROFILE_WINDOW_SIZE = int(os.environ.get("PROFILE_WINDOW_SIZE", "30"))
+
+# 核对时分数和允许的浮点误差
+_SCORE_TOLERANCE = 1e-6
+
+
+def _aggregate(conn, entries):
+    """把窗口记录 [(answer_id, node_id, is_correct), ...] 汇总为 {node_id: {count, correct, last, dims}}"""
+    nodes = {}
+    for answer_id, node_id, is_correct in entries:
+        node = nodes.setdefault(node_id, {"count": 0, "correct": 0, "last": answer_id, "dims": {}})
+        node["count"] += 1
+        node["correct"] += 1 if is_correct else 0
+        node["last"] = max(node["last"], answer_id)
+    if not nodes:
+        return nodes
+    pairs = {(answer_id, node_id) for answer_id, node_id, _ in entries}
+    answer_ids = sorted({answer_id for answer_id, _ in pairs})
+    placeholders = ",".join("?" * len(answer_ids))
+    for answer_id, node_id, dimension, score in conn.execute(f"""
+        SELECT answer_id, node_id, dimension, score FROM user_answer_scores
+        WHERE answer_id IN ({placeholders})
+    """, answer_ids):
+        if (answer_id, node_id) in pairs:
+            total = nodes[node_id]["dims"].setdefault(dimension, [0.0, 0])
+            total[0] += score
+            total[1] += 1
+    return nodes
+
+
+def _apply(conn, user_id, entries, sign):
+    """把窗口记录计入（sign=1）或移出（sign=-1）该学生的画像状态"""
+    nodes = _aggregate(conn, entries)
+    if not nodes:
+        return
+    conn.executemany("""
+        INSERT INTO user_profile_state (user_id, node_id, interaction_count, correct_count, last_answer_id)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, node_id) DO UPDATE SET
+            interaction_count = interaction_count + excluded.interaction_count,
+            correct_count = correct_count + excluded.correct_count,
+            last_answer_id = MAX(last_answer_id, excluded.last_answer_id)
+    """, [(user_id, node_id, sign * node["count"], sign * node["correct"], node["last"])
+          for node_id, node in nodes.items()])
+    conn.executemany("""
+        INSERT INTO user_profile_dimensions (user_id, node_id, dimension, score_sum, score_count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, node_id, dimension) DO UPDATE SET
+            score_sum = score_sum + excluded.score_sum,
+            score_count = score_count + excluded.score_count
+    """, [(user_id, node_id, dimension, sign * total[0], sign * total[1])
+          for node_id, node in nodes.items() for dimension, total in node["dims"].items()])
+    if sign < 0:
+        # 移出的是窗口中最旧的记录，仍有计数的知识点 last_answer_id 不受影响
+        conn.execute("DELETE FROM user_profile_state WHERE user_id = ? AND interaction_count <= 0", (user_id,))
+        conn.execute("DELETE FROM user_profile_dimensions WHERE user_id = ? AND score_count <= 0", (user_id,))
+
+
+def record_answers(conn, user_id, answers):
+    """
+    新答题记录进入画像窗口（在维度评分写入之后调用）
+
+    Args:
+        answers: [(answer_id, question_id, is_correct), ...]，question_id 可以是整数或字符串
+    """
+    # 请求里的题目ID是字符串，查询结果是整数，两边统一按字符串匹配
+    question_ids = sorted({str(question_id) for _, question_id, _ in answers})
+    if not question_ids:
+        return
+    placeholders = ",".join("?" * len(question_ids))
+    nodes_by_question = {}
+    for question_id, node_id in conn.execute(f"""
+        SELECT qnm.question_id, qnm.node_id
+        FROM question_to_node_mapping AS qnm
+        JOIN knowledge_nodes AS kn ON kn.node_id = qnm.node_id
+        WHERE qnm.question_id IN ({placeholders})
+    """, question_ids):
+        nodes_by_question.setdefault(str(question_id), []).append(node_id)
+    entries = [
+        (answer_id, node_id, 1 if is_correct else 0)
+        for answer_id, question_id, is_correct in answers
+        for node_id in nodes_by_question.get(str(question_id), ())
+    ]
+    if not entries:
+        return
+    conn.executemany("""
+        INSERT INTO user_profile_window (user_id, answer_id, node_id, is_correct)
+        VALUES (?, ?, ?, ?)
+    """, [(user_id, *entry) for entry in entries])
+    _apply(conn, user_id, entries, 1)
+
+    evicted = conn.execute("""
+        SELECT answer_id, node_id, is_correct FROM user_profile_window
+        WHERE user_id = ?
+        ORDER BY answer_id DESC, node_id DESC
+        LIMIT -1 OFFSET ?
+    """, (user_id, PROFILE_WINDOW_SIZE)).fetchall()
+    if evicted:
+        _apply(conn, user_id, evicted, -1)
+        conn.executemany("DELETE FROM user_profile_window WHERE user_id = ? AND answer_id = ? AND node_id = ?",
+                         [(user_id, answer_id, node_id) for answer_id, node_id, _ in evicted])
+
+
+def drop_answers(conn, answer_ids):
+    """答题记录被删除（归档）前把它们移出各自学生的画像窗口（在删除维度评分之前调用）"""
+    if not answer_ids:
+        return
+    placeholders = ",".join("?" * len(answer_ids))
+    by_user = {}
+    for user_id, answer_id, node_id, is_correct in conn.execute(f"""
+        SELECT user_id, answer_id, node_id, is_correct FROM user_profile_window
+        WHERE answer_id IN ({placeholders})
+    """, list(answer_ids)):
+        by_user.setdefault(user_id, []).append((answer_id, node_id, is_correct))
+    for user_id, entries in by_user.items():
+        _apply(conn, user_id, entries, -1)
+    conn.execute(f"DELETE FROM user_profile_window WHERE answer_id IN ({placeholders})", list(answer_ids))
+
+
+def _recent_entries(conn, user_id):
+    """从 user_answers 取该学生最近的窗口记录"""
+    return conn.execute("""
+        SELECT ua.answer_id, qnm.node_id, CASE WHEN ua.is_correct THEN 1 ELSE 0 END
+        FROM user_answers AS ua
+        JOIN question_to_node_mapping AS qnm ON qnm.question_id = ua.question_id
+        JOIN knowledge_nodes AS kn ON kn.node_id = qnm.node_id
+        WHERE ua.user_id = ?
+        ORDER BY ua.answer_id DESC, qnm.node_id DESC
+        LIMIT ?
+    """, (user_id, PROFILE_WINDOW_SIZE)).fetchall()
+
+
+def rebuild_profile(conn, user_id):
+    """丢弃该学生的画像状态，从 user_answers 重新计算"""
+    for table in ("user_profile_window", "user_profile_state", "user_profile_dimensions"):
+        conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+    entries = _recent_entries(conn, user_id)
+    conn.executemany("""
+        INSERT INTO user_profile_window (user_id, answer_id, node_id, is_correct)
+        VALUES (?, ?, ?, ?)
+    """, [(user_id, *entry) for entry in entries])
+    _apply(conn, user_id, entries, 1)
+
+
+def profile_user_ids(conn):
+    """有答题记录或画像状态的学生"""
+    return [row[0] for row in conn.execute("""
+        SELECT DISTINCT user_id FROM user_answers
+        UNION
+        SELECT DISTINCT user_id FROM user_profile_state
+    """)]
+
+
+def rebuild_profiles(conn, user_ids=None):
+    """重建多个学生（默认全部）的画像状态，返回处理的学生数"""
+    user_ids = profile_user_ids(conn) if user_ids is None else user_ids
+    for user_id in user_ids:
+        rebuild_profile(conn, user_id)
+    return len(user_ids)
+
+
+def _stored(conn, user_id):
+    nodes = {}
+    for node_id, count, correct, last in conn.execute("""
+        SELECT node_id, interaction_count, correct_count, last_answer_id
+        FROM user_profile_state WHERE user_id = ?
+    """, (user_id,)):
+        nodes[node_id] = {"count": count, "correct": correct, "last": last, "dims": {}}
+    for node_id, dimension, score_sum, score_count in conn.execute("""
+        SELECT node_id, dimension, score_sum, score_count
+        FROM user_profile_dimensions WHERE user_id = ?
+    """, (user_id,)):
+        nodes.setdefault(node_id, {"count": 0, "correct": 0, "last": None, "dims": {}})
+        nodes[node_id]["dims"][dimension] = [score_sum, score_count]
+    return nodes
+
+
+def check_profile(conn, user_id):
+    """比较已存的画像状态与从 user_answers 重新计算的结果，返回不一致的描述列表（一致时为空）"""
+    expected = _aggregate(conn, _recent_entries(conn, user_id))
+    stored = _stored(conn, user_id)
+    problems = []
+    for node_id in sorted(set(expected) | set(stored)):
+        want, have = expected.get(node_id), stored.get(node_id)
+        if want is None or have is None:
+            problems.append(f"知识点 {node_id}: {'多余' if want is None else '缺失'}")
+            continue
+        if (want["count"], want["correct"]) != (have["count"], have["correct"]):
+            problems.append(f"知识点 {node_id}: 计数 {have['count']}/{have['correct']}，"
+                            f"应为 {want['count']}/{want['correct']}")
+        if want["last"] != have["last"]:
+            problems.append(f"知识点 {node_id}: 最近作答 {have['last']}，应为 {want['last']}")
+        for dimension in sorted(set(want["dims"]) | set(have["dims"])):
+            want_sum, want_count = want["dims"].get(dimension, (0.0, 0))
+            have_sum, have_count = have["dims"].get(dimension, (0.0, 0))
+            if want_count != have_count or abs(want_sum - have_sum) > _SCORE_TOLERANCE:
+                problems.append(f"知识点 {node_id} 维度 {dimension}: {have_sum:.4f}/{have_count}，"
+                                f"应为 {want_sum:.4f}/{want_count}")
+    return problems
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按学生分片的SQLite存储（可选）
+默认关闭（DB_SHARD_COUNT=0），所有表都在 DB_PATH 一个文件里。
+开启后：
+- 每个学生的答题记录、掌握度、错题及答题日汇总（SHARD_TABLES）写在 DB_SHARD_DIR/shard_XX.db 中，
+  不同分片的写入互不争用文件锁
+- 知识点、题目、映射等公共数据仍在 DB_PATH（目录库），以只读方式 ATTACH 到每个分片连接上，
+  因此分片连接上的 SQL 不需要修改，未加前缀的表名会先在分片中查找，找不到再查目录库
+- 分片由 user_id 决定：shard_for_user(user_id) = user_id % DB_SHARD_COUNT
+
+路由中按学生访问数据时使用 run_user_db(user_id, ...) / submit_user_write(user_id, ...)，
+教师端跨学生的统计使用 fan_out_db() 在所有分片上并行执行后再合并。
+"""
+
+import os
+import threading
+from urllib.request import pathname2url
+
+from .database import (
+    CONNECTION_PRAGMAS,
+    DB_PATH,
+    ConnectionPool,
+    connect,
+)
+from .migrations import load_migration
+
+DB_SHARD_COUNT = int(os.environ.get("DB_SHARD_COUNT", "0"))
+DB_SHARD_DIR = os.path.abspath(os.environ.get(
+    "DB_SHARD_DIR", os.path.join(os.path.dirname(DB_PATH), "shards")))
+
+# 按学生拆分的表，其余表都在目录库中
+SHARD_TABLES = ("user_answers", "user_node_mastery", "wrong_questions", "user_answer_daily_rollup",
+                "provisional_answers", "idempotency_keys", "user_answer_scores",
+                "user_profile_window", "user_profile_state", "user_profile_dimensions", "mission_cache")
+
+CATALOG_SCHEMA = "catalog"
+
+
+def sharding_enabled():
+    return DB_SHARD_COUNT > 0
+
+
+def shard_for_user(user_id):
+    """根据 user_id 计算分片编号"""
+    return int(str(user_id).strip()) % DB_SHARD_COUNT
+
+
+def shard_path(index):
+    return os.path.join(DB_SHARD_DIR, f"shard_{index:02d}.db")
+
+
+def sync_shard_schema(conn):
+    """
+    按目录库中的表结构在分片里创建缺失的表和索引。
+    迁移只作用于目录库；新增的表或索引在分片下次打开时自动同步，
+    修改已有列的迁移需要另外对每个分片执行。
+    新建 user_answer_scores 时用迁移 0009 中冻结的 backfill_scores() 为分片中已有的答题记录回填维度评分，
+    新建 user_profile_state 时用迁移 0010 中冻结的 rebuild_profiles() 重建分片中学生的画像状态（须在维度评分回填之后）。
+    """
+    placeholders = ",".join("?" * len(SHARD_TABLES))
+    rows = conn.execute(f"""
+        SELECT type, name, sql FROM {CATALOG_SCHEMA}.sqlite_master
+        WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL
+        ORDER BY type = 'index'
+    """, SHARD_TABLES).fetchall()
+    existing = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master")}
+    for obj_type, name, sql in rows:
+        if name not in existing:
+            conn.execute(sql)
+    if "user_answer_scores" not in existing:
+        load_migration(9).backfill_scores(conn)
+    if "user_profile_state" not in existing:
+        load_migration(10).rebuild_profiles(conn)
+    conn.commit()
+
+
+def connect_shard(db_path, pragmas=CONNECTION_PRAGMAS):
+    """打开分片连接，并以只读方式挂载目录库"""
+    # ATTACH 使用 URI 参数 mode=ro，需要主库也以 URI 方式打开
+    conn = connect("file:" + pathname2url(db_path), pragmas, uri=True)
+    conn.execute(f"ATTACH DATABASE ? AS {CATALOG_SCHEMA}", ("file:" + pathname2url(DB_PATH) + "?mode=ro",))
+    return conn
+
+
+class ShardRouter:
+    """分片路由：为每个分片维护一个连接池"""
+
+    def __init__(self, count=DB_SHARD_COUNT, directory=DB_SHARD_DIR):
+        self.count = count
+        self.directory = directory
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, index):
+        pool = self._pools.get(index)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(index)
+                if pool is None:
+                    path = shard_path(index)
+                    os.makedirs(self.directory, exist_ok=True)
+                    # 首次打开时同步表结构
+                    conn = connect_shard(path)
+                    try:
+                        sync_shard_schema(conn)
+                    finally:
+                        conn.close()
+                    pool = self._pools[index] = ConnectionPool(path, connector=connect_shard)
+        return pool
+
+    def pool_for_user(self, user_id):
+        return self.pool(shard_for_user(user_id))
+
+    def all_pools(self):
+        return [self.pool(index) for index in range(self.count)]
+
+    def stats(self):
+        with self._lock:
+            pools = dict(self._pools)
+        return {f"shard_{index:02d}": pool.stats() for index, pool in sorted(pools.items())}
+
+    def close_all(self):
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close_all()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """获取进程级分片路由（未开启分片时返回 None）"""
+    global _router
+    if not sharding_enabled():
+        return None
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ShardRouter()
+    return _router
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按请求统计SQL
+连接池借出的连接、写者队列的连接执行SQL时都会记录到当前请求的统计中：
+语句数、SQL总耗时、最慢的一条语句，以及每条归一化语句的执行次数。
+同一条语句在一个请求里执行超过 SQL_REPEAT_WARN_THRESHOLD 次时输出 N+1 警告。
+
+统计对象保存在 contextvar 中，run_db / 写者队列把上下文复制到线程里，线程内的查询同样会被统计。
+SSE 等流式响应的响应体在中间件拿到响应之后才执行，report_after_stream() 在流结束时上报，
+统计通过最后一个 sql 事件发送（此时响应头已经发出）。
+"""
+
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+
+from . import metrics
+
+SQL_REPEAT_WARN_THRESHOLD = int(os.environ.get("SQL_REPEAT_WARN_THRESHOLD", "10"))
+
+_current = contextvars.ContextVar("sql_request_stats", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """去掉字面量和多余空白，同一条查询的不同参数归为同一类"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class RequestSqlStats:
+    """一个请求内的SQL统计（可能被多个数据库线程同时写入）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.statements = {}
+
+    def record(self, sql, elapsed_ms):
+        key = normalize(sql)
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.statements[key] = self.statements.get(key, 0) + 1
+            if elapsed_ms > self.slowest_ms:
+                self.slowest_ms = elapsed_ms
+                self.slowest_sql = key
+
+    def repeated(self, threshold=SQL_REPEAT_WARN_THRESHOLD):
+        """执行次数超过阈值的语句 [(sql, 次数), ...]"""
+        with self._lock:
+            return [(sql, n) for sql, n in self.statements.items() if n > threshold]
+
+
+def start_request():
+    """开始统计，返回 (token, stats)；请求结束时用 token 调用 end_request"""
+    stats = RequestSqlStats()
+    return _current.set(stats), stats
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record(sql, elapsed_ms):
+    metrics.inc("sql.statements")
+    stats = _current.get()
+    if stats is not None:
+        stats.record(sql, elapsed_ms)
+
+
+def report(stats, route):
+    """请求结束后导出指标，并对疑似 N+1 的语句输出警告"""
+    metrics.observe("sql.request.statements", stats.count, route=route)
+    metrics.observe("sql.request.time_ms", stats.total_ms, route=route)
+    for sql, count in stats.repeated():
+        metrics.inc("sql.n_plus_one", route=route)
+        print(f"⚠️ 疑似N+1查询: {route} 中同一语句执行了 {count} 次: {sql[:200]}")
+
+
+def stats_summary(stats):
+    return {
+        "count": stats.count,
+        "time_ms": round(stats.total_ms, 2),
+        "slowest_ms": round(stats.slowest_ms, 2),
+    }
+
+
+async def report_after_stream(body_iterator, stats, route):
+    """
+    包装流式响应体：正常结束时追加一个 sql 事件，无论正常结束还是客户端断开都在结束时上报。
+    响应体在请求的上下文中执行，期间的查询仍计入 stats。
+    """
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+        yield f"event: sql\ndata: {json.dumps(stats_summary(stats))}\n\n".encode("utf-8")
+    finally:
+        report(stats, route)
+
+
+class TracedCursor:
+    """记录 execute/executemany 耗时的游标代理"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            self._cursor.execute(sql, parameters)
+        finally:
+            record(sql, (time.perf_counter() - start) * 1000)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, seq_of_parameters)
+        finally:
+            record(sql, (time.perf_counter() - start) * 1000)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TracedConnectionMixin:
+    """
+    为连接代理提供带统计的 execute/executemany/cursor。
+    子类需提供 raw 属性（底层 sqlite3.Connection）。
+    """
+
+    def execute(self, sql, parameters=()):
+        return TracedCursor(self.raw.cursor()).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return TracedCursor(self.raw.cursor()).executemany(sql, seq_of_parameters)
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self.raw.cursor(*args, **kwargs))
+
+
+class TracedConnection(TracedConnectionMixin):
+    """包装任意 sqlite3 连接（写者队列等不经过连接池的连接）"""
+
+    def __init__(self, conn):
+        self.raw = conn
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
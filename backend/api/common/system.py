@@ -6,7 +6,9 @@
 
 from fastapi import APIRouter
 from datetime import datetime
-from .database import get_db_connection
+from .database import get_pool, run_db
+from . import metrics
+from .sharding import get_router
 
 router = APIRouter(tags=["系统"])
 
@@ -24,9 +26,7 @@ async def root():
 async def health_check():
     """健康检查"""
     try:
-        conn = get_db_connection()
-        conn.execute("SELECT 1")
-        conn.close()
+        await run_db(lambda conn: conn.execute("SELECT 1").fetchone())
         return {
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
@@ -38,4 +38,14 @@ async def health_check():
             "timestamp": datetime.now().isoformat(),
             "database": "disconnected",
             "error": str(e)
-        } 
\ No newline at end of file
+        }
+
+@router.get("/metrics")
+async def get_metrics():
+    """运行时指标（连接池、SQL、LLM调用等）"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "db_pool": get_pool().stats(),
+        "db_shards": get_router().stats() if get_router() is not None else {},
+        **metrics.snapshot()
+    }
@@ -5,7 +5,7 @@
 """
 
 from fastapi import APIRouter, HTTPException
-from .database import get_db_connection
+from .database import run_db
 
 router = APIRouter(prefix="/users", tags=["用户管理"])
 
@@ -13,10 +13,10 @@ router = APIRouter(prefix="/users", tags=["用户管理"])
 async def get_users():
     """获取用户列表"""
     try:
-        conn = get_db_connection()
-        cursor = conn.execute("SELECT user_id, username, role FROM users")
-        users = [{"user_id": row["user_id"], "username": row["username"], "role": row["role"]} for row in cursor.fetchall()]
-        conn.close()
-        return users
+        return await run_db(_query_users)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取用户列表失败: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"获取用户列表失败: {str(e)}")
+
+def _query_users(conn):
+    cursor = conn.execute("SELECT user_id, username, role FROM users")
+    return [{"user_id": row["user_id"], "username": row["username"], "role": row["role"]} for row in cursor.fetchall()]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单写者队列（group commit）
+SQLite 同一时刻只允许一个写事务。多个请求各自 commit 时会互相等待写锁（database is locked），
+并且每次提交都要单独落盘。这里把写操作交给唯一的写者任务：
+每攒够 DB_WRITE_BATCH_SIZE 个写意图或等待 DB_WRITE_BATCH_MS 毫秒，就在一个事务里全部执行并提交一次，
+提交成功（已落盘）后再唤醒各个调用方。
+
+写意图是普通函数 func(conn, *args)，在写者线程中执行：
+- 不要在其中调用 commit()/rollback()，事务由写者统一管理
+- 每个写意图运行在独立的 SAVEPOINT 中，单个写意图抛出异常只回滚它自己，不影响同批的其他请求
+
+开启分片后每个分片有自己的写者，按学生写入时使用 submit_user_write(user_id, ...)。
+
+用法:
+    await submit_user_write(request.user_id, _save_text_diagnosis, request, diagnosis_result)
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import database, metrics
+from .database import CONNECTION_PRAGMAS, DB_PATH, connect
+from .sql_trace import TracedConnection
+
+DB_WRITE_BATCH_SIZE = int(os.environ.get("DB_WRITE_BATCH_SIZE", "64"))
+DB_WRITE_BATCH_MS = float(os.environ.get("DB_WRITE_BATCH_MS", "5"))
+
+# 写者连接每个批次只提交一次，使用 FULL 保证唤醒调用方时数据已经落盘
+WRITER_PRAGMAS = tuple(
+    (name, "FULL" if name == "synchronous" else value) for name, value in CONNECTION_PRAGMAS
+)
+
+
+_STOP = object()  # 停止信号
+
+
+class _WriteIntent:
+    __slots__ = ("call", "future")
+
+    def __init__(self, call, future):
+        self.call = call
+        self.future = future
+
+
+class WriteQueue:
+    """单写者队列：所有写意图由同一个连接、同一个线程按批次执行"""
+
+    def __init__(self, db_path=DB_PATH, batch_size=DB_WRITE_BATCH_SIZE, batch_ms=DB_WRITE_BATCH_MS,
+                 connector=connect):
+        self.db_path = db_path
+        self._connector = connector
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self._queue = None
+        self._task = None
+        self._conn = None
+        # 单线程执行器：写者连接只在这个线程里使用
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, func, *args, **kwargs):
+        """提交写意图，所在批次提交成功后返回 func 的返回值"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        # 复制上下文，使写者线程内的代码能读到当前请求的 contextvars
+        context = contextvars.copy_context()
+        call = lambda conn: context.run(func, conn, *args, **kwargs)
+        await self._queue.put(_WriteIntent(call, future))
+        metrics.set_gauge("db.write.queue_depth", self._queue.qsize())
+        return await future
+
+    async def _collect_batch(self):
+        """
+        取出一个批次：至少一个写意图，攒满 batch_size 或等待 batch_ms 后返回。
+        返回 (批次, 是否收到停止信号)
+        """
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 and self._queue.empty():
+                break
+            try:
+                # 截止时间到了也把已经排队的写意图带上，不再单独等下一批
+                intent = (self._queue.get_nowait() if remaining <= 0
+                          else await asyncio.wait_for(self._queue.get(), remaining))
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if intent is _STOP:
+                return batch, True
+            batch.append(intent)
+        return batch, False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            batch, stop = await self._collect_batch()
+            metrics.set_gauge("db.write.queue_depth", self._queue.qsize())
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self._executor, self._apply_batch, batch)
+            except Exception as e:
+                # 整批提交失败：所有调用方都收到异常
+                metrics.inc("db.write.batch_failures")
+                print(f"❌ 批量写入提交失败: {e}")
+                for intent in batch:
+                    if not intent.future.done():
+                        intent.future.set_exception(e)
+                continue
+            for intent, (ok, value) in zip(batch, results):
+                if intent.future.done():
+                    continue  # 调用方已取消
+                if ok:
+                    intent.future.set_result(value)
+                else:
+                    intent.future.set_exception(value)
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self._connector(self.db_path, WRITER_PRAGMAS)
+            self._conn.isolation_level = None  # 事务由写者显式控制
+        return self._conn
+
+    def _apply_batch(self, batch):
+        """在写者线程中执行一个批次，返回 [(是否成功, 返回值或异常), ...]"""
+        conn = self._connection()
+        start = time.perf_counter()
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for intent in batch:
+                conn.execute("SAVEPOINT write_intent")
+                try:
+                    # 写意图执行的SQL计入提交它的请求
+                    value = intent.call(TracedConnection(conn))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_intent")
+                    conn.execute("RELEASE write_intent")
+                    metrics.inc("db.write.intent_failures")
+                    results.append((False, e))
+                else:
+                    conn.execute("RELEASE write_intent")
+                    results.append((True, value))
+            commit_start = time.perf_counter()
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        now = time.perf_counter()
+        metrics.inc("db.write.batches")
+        metrics.inc("db.write.intents", len(batch))
+        metrics.observe("db.write.batch_size", len(batch))
+        metrics.observe("db.write.commit_ms", (now - commit_start) * 1000)
+        metrics.observe("db.write.batch_ms", (now - start) * 1000)
+        return results
+
+    async def close(self):
+        """执行完队列中已提交的写意图后停止写者（进程退出时调用）"""
+        if self._task is not None and not self._task.done():
+            # 停止信号排在已有写意图之后，保证它们都被提交
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_connection)
+        self._executor.shutdown(wait=True)
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_writers = {}
+
+
+def get_writer(user_id=None):
+    """
+    获取进程级写者队列（惰性创建）。
+    开启分片且传入 user_id 时，返回该学生所在分片的写者。
+    """
+    from .sharding import connect_shard, get_router, shard_for_user, shard_path
+    key = None
+    if user_id is not None and get_router() is not None:
+        key = shard_for_user(user_id)
+    writer = _writers.get(key)
+    if writer is None:
+        if key is None:
+            # 按当前的 database.DB_PATH 创建，而不是导入时绑定的默认参数
+            writer = WriteQueue(database.DB_PATH)
+        else:
+            get_router().pool(key)  # 确保分片文件和表结构已创建
+            writer = WriteQueue(shard_path(key), connector=connect_shard)
+        _writers[key] = writer
+    return writer
+
+
+async def submit_write(func, *args, **kwargs):
+    """把写意图交给主库的写者队列，批次提交成功后返回 func 的返回值"""
+    return await get_writer().submit(func, *args, **kwargs)
+
+
+async def submit_user_write(user_id, func, *args, **kwargs):
+    """把按学生的写意图交给其所在分片的写者队列（未开启分片时与 submit_write 相同）"""
+    return await get_writer(user_id).submit(func, *args, **kwargs)
+
+
+async def shutdown_writer():
+    """停止所有写者队列"""
+    writers = list(_writers.values())
+    _writers.clear()
+    for writer in writers:
+        await writer.close()
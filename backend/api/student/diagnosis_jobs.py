@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步诊断任务
+诊断接口的任务模式：作答先写入 diagnosis_jobs 表（迁移 0006）并立即返回任务ID，
+固定数量的工作协程从有界队列中取任务执行诊断和答题记录写入，结果回填到表中。
+客户端轮询 /student/diagnose/jobs/{job_id}，或订阅 /student/diagnose/jobs/{job_id}/events（SSE）。
+
+队列长度、排队等待时间、执行耗时、工作协程占用率通过 /metrics 的 diagnosis.jobs.* 导出。
+服务重启时，表中仍为 queued/running 的任务重新排队；running 的任务可能已经写入答题记录，
+handler 需以任务ID为幂等键保证重新执行时不重复写入。
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from ..common import metrics
+from ..common.database import run_db
+from ..common.write_queue import submit_write
+
+DIAGNOSIS_JOB_WORKERS = int(os.environ.get("DIAGNOSIS_JOB_WORKERS", "8"))
+DIAGNOSIS_JOB_QUEUE_SIZE = int(os.environ.get("DIAGNOSIS_JOB_QUEUE_SIZE", "500"))
+DIAGNOSIS_JOB_RETENTION_DAYS = int(os.environ.get("DIAGNOSIS_JOB_RETENTION_DAYS", "7"))
+# SSE 订阅最长保持时间，以及检查任务状态、发送保活注释的间隔（秒）
+DIAGNOSIS_JOB_SSE_TIMEOUT_S = float(os.environ.get("DIAGNOSIS_JOB_SSE_TIMEOUT_S", "120"))
+DIAGNOSIS_JOB_SSE_POLL_S = float(os.environ.get("DIAGNOSIS_JOB_SSE_POLL_S", "1"))
+DIAGNOSIS_JOB_SSE_KEEPALIVE_S = float(os.environ.get("DIAGNOSIS_JOB_SSE_KEEPALIVE_S", "15"))
+
+class JobQueueFull(Exception):
+    """任务队列已满"""
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _insert_job(conn, job_id, user_id, question_id, payload_json):
+    conn.execute("""
+        INSERT INTO diagnosis_jobs (job_id, user_id, question_id, payload_json, status, created_at)
+        VALUES (?, ?, ?, ?, 'queued', ?)
+    """, (job_id, user_id, question_id, payload_json, _now()))
+
+
+def _start_job(conn, job_id):
+    conn.execute("UPDATE diagnosis_jobs SET status = 'running', started_at = ? WHERE job_id = ?",
+                 (_now(), job_id))
+
+
+def _finish_job(conn, job_id, status, result_json, error):
+    conn.execute("""
+        UPDATE diagnosis_jobs SET status = ?, result_json = ?, error = ?, finished_at = ?
+        WHERE job_id = ?
+    """, (status, result_json, error, _now(), job_id))
+
+
+def _load_job(conn, job_id):
+    row = conn.execute("""
+        SELECT job_id, user_id, question_id, status, result_json, error, created_at, started_at, finished_at
+        FROM diagnosis_jobs WHERE job_id = ?
+    """, (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    result_json = job.pop("result_json")
+    job["result"] = json.loads(result_json) if result_json else None
+    return job
+
+
+def _load_unfinished(conn):
+    return [(row[0], json.loads(row[1])) for row in conn.execute("""
+        SELECT job_id, payload_json FROM diagnosis_jobs
+        WHERE status IN ('queued', 'running')
+        ORDER BY created_at
+    """)]
+
+
+def _purge_finished(conn, cutoff):
+    conn.execute("""
+        DELETE FROM diagnosis_jobs
+        WHERE status IN ('done', 'failed') AND created_at < ?
+    """, (cutoff,))
+
+
+def sse_event(event, data):
+    """格式化一条 SSE 事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class DiagnosisJobPool:
+    """
+    有界的诊断任务池。handler 为 async handler(job_id, payload) -> 诊断结果 dict，
+    抛出的异常（HTTPException 取 detail）记录为任务失败原因。
+    """
+
+    def __init__(self, handler, workers=DIAGNOSIS_JOB_WORKERS, queue_size=DIAGNOSIS_JOB_QUEUE_SIZE):
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue = None
+        self._tasks = []
+        self._busy = 0
+        self._done_events = {}
+
+    def _ensure_started(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_running_loop()
+        # 工作协程使用独立的上下文，不继承触发启动的那个请求的SQL统计
+        self._tasks = [
+            loop.create_task(self._worker(), context=contextvars.Context())
+            for _ in range(self.workers)
+        ]
+        print(f"🧵 诊断任务池已启动: {self.workers} 个工作协程，队列上限 {self.queue_size}")
+
+    def _update_gauges(self):
+        metrics.set_gauge("diagnosis.jobs.queue_depth", self._queue.qsize() if self._queue else 0)
+        metrics.set_gauge("diagnosis.jobs.busy_workers", self._busy)
+        metrics.set_gauge("diagnosis.jobs.utilization", round(self._busy / self.workers, 3))
+
+    def _enqueue(self, job_id, payload):
+        self._done_events[job_id] = asyncio.Event()
+        self._queue.put_nowait((job_id, payload, time.perf_counter()))
+        self._update_gauges()
+
+    async def start(self):
+        """启动工作协程，清理过期任务，并重新排队上次未完成的任务（服务启动时调用）"""
+        self._ensure_started()
+        cutoff = (datetime.now() - timedelta(days=DIAGNOSIS_JOB_RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        await submit_write(_purge_finished, cutoff)
+        unfinished = await run_db(_load_unfinished)
+        for job_id, payload in unfinished[:self.queue_size]:
+            self._enqueue(job_id, payload)
+        if unfinished:
+            print(f"🔄 重新排队 {min(len(unfinished), self.queue_size)} 个未完成的诊断任务")
+
+    async def submit(self, payload):
+        """持久化作答并排队，返回任务ID；队列已满时抛出 JobQueueFull"""
+        self._ensure_started()
+        if self._queue.full():
+            metrics.inc("diagnosis.jobs.rejected")
+            raise JobQueueFull()
+        job_id = uuid.uuid4().hex
+        await submit_write(_insert_job, job_id, payload["user_id"], payload["question_id"],
+                           json.dumps(payload, ensure_ascii=False))
+        try:
+            self._enqueue(job_id, payload)
+        except asyncio.QueueFull:
+            # 持久化期间队列被占满：任务留在表中，下次启动时恢复
+            self._done_events.pop(job_id, None)
+            metrics.inc("diagnosis.jobs.rejected")
+            raise JobQueueFull()
+        metrics.inc("diagnosis.jobs.submitted")
+        return job_id
+
+    async def _worker(self):
+        while True:
+            job_id, payload, enqueued_at = await self._queue.get()
+            metrics.observe("diagnosis.jobs.wait_ms", (time.perf_counter() - enqueued_at) * 1000)
+            self._busy += 1
+            self._update_gauges()
+            start = time.perf_counter()
+            try:
+                await submit_write(_start_job, job_id)
+                result = await self.handler(job_id, payload)
+                await submit_write(_finish_job, job_id, "done", json.dumps(result, ensure_ascii=False), None)
+                metrics.inc("diagnosis.jobs.completed")
+            except Exception as e:
+                error = str(getattr(e, "detail", None) or e)
+                print(f"❌ 诊断任务 {job_id} 失败: {error}")
+                metrics.inc("diagnosis.jobs.failed")
+                try:
+                    await submit_write(_finish_job, job_id, "failed", None, error)
+                except Exception as write_error:
+                    print(f"❌ 记录诊断任务 {job_id} 失败状态时出错: {write_error}")
+            finally:
+                metrics.observe("diagnosis.jobs.run_ms", (time.perf_counter() - start) * 1000)
+                self._busy -= 1
+                self._queue.task_done()
+                self._update_gauges()
+                event = self._done_events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def get(self, job_id):
+        """任务当前状态，不存在时返回 None"""
+        return await run_db(_load_job, job_id)
+
+    async def events(self, job_id):
+        """SSE 事件流：状态变化时发送 status，结束时发送 result 或 error"""
+        deadline = time.monotonic() + DIAGNOSIS_JOB_SSE_TIMEOUT_S
+        last_status = None
+        last_sent = time.monotonic()
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                yield sse_event("error", {"job_id": job_id, "detail": "诊断任务不存在"})
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                last_sent = time.monotonic()
+                if last_status == "done":
+                    yield sse_event("result", job)
+                    return
+                if last_status == "failed":
+                    yield sse_event("error", job)
+                    return
+                yield sse_event("status", {"job_id": job_id, "status": last_status})
+            if time.monotonic() > deadline:
+                yield sse_event("timeout", {"job_id": job_id, "status": last_status})
+                return
+            if time.monotonic() - last_sent >= DIAGNOSIS_JOB_SSE_KEEPALIVE_S:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            # 本进程内的任务完成时立即唤醒，否则按间隔重新查询
+            event = self._done_events.get(job_id)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), DIAGNOSIS_JOB_SSE_POLL_S)
+                else:
+                    await asyncio.sleep(DIAGNOSIS_JOB_SSE_POLL_S)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        """停止工作协程；执行中的任务保持 running，下次启动时重新排队"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
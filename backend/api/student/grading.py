@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+客观题本地判分
+选择题、填空题在本地比对标准答案，毫秒级返回与AI诊断相同结构的 {is_correct, reason, scores}：
+- 选择题：提取选项字母（"B"、"B. xxx"、"AC"、"A,C"，或与选项原文一致），按集合比较
+- 填空题：多空按分隔符逐空比较；每空先做符号归一化（全角、LaTeX、乘除号、空白），
+  能求值的按数值比较（分数与小数等价，按学生给出的小数位数允许四舍五入误差）
+
+无法确定对错时返回 None（例如文字表述类答案），由调用方交给AI诊断；解答题始终交给AI。
+
+provisional_grade() 是AI诊断不可用时的降级：按最终结果和文本相似度粗略判断，
+结果带 provisional=true，由后台复核协程在AI恢复后更正。
+"""
+
+import ast
+import difflib
+import json
+import math
+import operator
+import re
+import unicodedata
+
+OBJECTIVE_TYPES = ("选择题", "填空题")
+
+# 绝对误差下限
+NUMERIC_ABS_TOL = 1e-9
+
+_OPTION_LETTERS = "ABCDEFGH"
+_CHOICE_PREFIX = re.compile(r"^\s*([A-Ha-h])\s*(?:[.．、:：)）]|$)")
+_CHOICE_LETTERS = re.compile(r"^[A-Ha-h](?:\s*[,，、;；/\s]?\s*[A-Ha-h])*$")
+_BLANK_SEPARATORS = re.compile(r"[;；]|[,，](?![^()\[\]{}]*[)\]}])")
+
+_LATEX_REPLACEMENTS = [
+    (r"\left", ""), (r"\right", ""), (r"\cdot", "*"), (r"\times", "*"), (r"\div", "/"),
+    ("×", "*"), ("÷", "/"), ("·", "*"), ("−", "-"), ("**", "^"),
+    (r"\dfrac", r"\frac"), (r"\tfrac", r"\frac"), (r"\pi", "pi"),
+]
+_LATEX_FRAC = re.compile(r"\\frac\{([^{}]*)\}\{([^{}]*)\}")
+_LATEX_SQRT = re.compile(r"\\sqrt\{([^{}]*)\}")
+_BRACES = re.compile(r"[{}]")
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_FUNCTIONS = {"sqrt": math.sqrt}
+_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+# 与AI诊断 scores 相同的四个维度（英文键为维度，值为中文名称）
+_DIMENSIONS = (
+    ("Knowledge Mastery", "知识掌握"),
+    ("Logical Reasoning", "解题逻辑"),
+    ("Calculation Accuracy", "计算准确性"),
+    ("Behavioral Performance", "行为表现"),
+)
+_CORRECT_SCORES = (0.9, 0.9, 0.9, 0.9)
+_WRONG_SCORES = (0.2, 0.3, 0.3, 0.5)
+# 初步诊断不够可靠，评分向 0.5 收拢，对掌握度的影响较小
+_PROVISIONAL_CORRECT_SCORES = (0.7, 0.7, 0.7, 0.7)
+_PROVISIONAL_WRONG_SCORES = (0.35, 0.4, 0.4, 0.5)
+
+# 初步诊断中与参考答案视为一致的文本相似度
+PROVISIONAL_SIMILARITY = 0.8
+
+
+def _parse_options(options):
+    """options 可能是 JSON 字符串、{"A": "..."} 或 ["...", ...]，统一为 {字母: 原文}"""
+    if isinstance(options, str):
+        try:
+            options = json.loads(options) if options.strip() else {}
+        except json.JSONDecodeError:
+            return {}
+    if isinstance(options, list):
+        return {_OPTION_LETTERS[i]: str(text) for i, text in enumerate(options[:len(_OPTION_LETTERS)])}
+    if isinstance(options, dict):
+        return {str(k).strip().upper(): str(v) for k, v in options.items()}
+    return {}
+
+
+def extract_choices(answer, options=None):
+    """从答案中提取选项字母集合，无法识别时返回 None"""
+    text = unicodedata.normalize("NFKC", answer or "").strip()
+    if not text:
+        return None
+    if _CHOICE_LETTERS.match(text):
+        return frozenset(c.upper() for c in text if c.isalpha())
+    match = _CHOICE_PREFIX.match(text)
+    if match:
+        return frozenset(match.group(1).upper())
+    # 学生直接写了选项原文
+    for letter, option_text in _parse_options(options).items():
+        option_text = _CHOICE_PREFIX.sub("", unicodedata.normalize("NFKC", option_text)).strip()
+        if option_text and option_text == text:
+            return frozenset(letter)
+    return None
+
+
+def normalize_expression(text):
+    """符号归一化：全角转半角、展开常见 LaTeX、统一乘除号、去掉空白和末尾标点"""
+    text = unicodedata.normalize("NFKC", text or "").strip().strip("$").strip()
+    for old, new in _LATEX_REPLACEMENTS:
+        text = text.replace(old, new)
+    # 嵌套的 \frac 逐层展开
+    previous = None
+    while previous != text:
+        previous = text
+        text = _LATEX_FRAC.sub(r"((\1)/(\2))", text)
+        text = _LATEX_SQRT.sub(r"sqrt(\1)", text)
+    text = _BRACES.sub("", text).replace("\\", "")
+    text = re.sub(r"\s+", "", text)
+    return text.rstrip(".。")
+
+
+def _evaluate(node):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return float(node.value)
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow) and abs(right) > 64:
+            raise ValueError("指数过大")
+        return _BINARY_OPS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+        return _CONSTANTS[node.id]
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS
+            and len(node.args) == 1 and not node.keywords):
+        return _FUNCTIONS[node.func.id](_evaluate(node.args[0]))
+    raise ValueError("不支持的表达式")
+
+
+def to_number(expression):
+    """把归一化后的表达式求值为数值（支持分数、百分数、四则运算、乘方、sqrt），失败返回 None"""
+    if not expression or len(expression) > 100:
+        return None
+    percent = expression.endswith("%")
+    if percent:
+        expression = expression[:-1]
+    try:
+        value = _evaluate(ast.parse(expression.replace("^", "**"), mode="eval"))
+    except (SyntaxError, ValueError, TypeError, ZeroDivisionError, OverflowError, RecursionError):
+        return None
+    if not math.isfinite(value):
+        return None
+    return value / 100 if percent else value
+
+
+def _decimal_places(expression):
+    match = re.fullmatch(r"-?\d*\.(\d+)%?", expression)
+    return len(match.group(1)) if match else None
+
+
+def _numbers_match(user_value, key_value, user_expression):
+    """数值比较：学生写成至少两位小数时，允许其位数下的四舍五入误差"""
+    tolerance = max(NUMERIC_ABS_TOL, abs(key_value) * 1e-9)
+    places = _decimal_places(user_expression)
+    if places is not None and places >= 2:
+        scale = 100 if user_expression.endswith("%") else 1
+        tolerance = max(tolerance, 0.5 * 10 ** -places / scale)
+    return abs(user_value - key_value) <= tolerance
+
+
+def _strip_left_hand_side(user_expression, key_expression):
+    """标准答案只有结果时，学生写的 "P(A)=0.5" 只取等号右边"""
+    if "=" in user_expression and "=" not in key_expression:
+        return user_expression.rsplit("=", 1)[1]
+    return user_expression
+
+
+def compare_blank(user_answer, key_answer):
+    """比较一个空：True/False 表示确定对错，None 表示无法判断"""
+    key_expression = normalize_expression(key_answer)
+    user_expression = _strip_left_hand_side(normalize_expression(user_answer), key_expression)
+    if not key_expression or not user_expression:
+        return None
+    if user_expression == key_expression:
+        return True
+    key_value = to_number(key_expression)
+    user_value = to_number(user_expression)
+    if key_value is not None and user_value is not None:
+        return _numbers_match(user_value, key_value, user_expression)
+    return None
+
+
+def _split_blanks(answer):
+    return [part.strip() for part in _BLANK_SEPARATORS.split(answer or "") if part.strip()]
+
+
+def _grade_fill_in(user_answer, key_answer):
+    verdict = compare_blank(user_answer, key_answer)
+    if verdict is not None:
+        return verdict, None
+    key_blanks = _split_blanks(key_answer)
+    user_blanks = _split_blanks(user_answer)
+    if len(key_blanks) < 2 or len(key_blanks) != len(user_blanks):
+        return None, None
+    verdicts = [compare_blank(u, k) for u, k in zip(user_blanks, key_blanks)]
+    if None in verdicts:
+        return None, None
+    wrong = [str(i + 1) for i, ok in enumerate(verdicts) if not ok]
+    return not wrong, wrong
+
+
+def _result(is_correct, reason, values=None, feedback=None):
+    if values is None:
+        values = _CORRECT_SCORES if is_correct else _WRONG_SCORES
+    if feedback is None:
+        feedback = "客观题自动判分：答案正确" if is_correct else "客观题自动判分：答案与标准答案不一致"
+    return {
+        "is_correct": is_correct,
+        "reason": reason,
+        "scores": [
+            {dimension: name, "score": score, "feedback": feedback}
+            for (dimension, name), score in zip(_DIMENSIONS, values)
+        ],
+    }
+
+
+def grade(question_type, key_answer, user_answer, options=None):
+    """
+    本地判分
+
+    Args:
+        question_type: 选择题 / 填空题 / 解答题
+        key_answer: questions.answer
+        user_answer: 学生答案（或OCR识别结果）
+        options: questions.options（选择题）
+
+    Returns:
+        dict | None: 与AI诊断相同结构的结果；无法确定时返回 None
+    """
+    if question_type not in OBJECTIVE_TYPES or not key_answer or not user_answer:
+        return None
+
+    if question_type == "选择题":
+        key_choices = extract_choices(key_answer, options)
+        user_choices = extract_choices(user_answer, options)
+        if key_choices is None or user_choices is None:
+            return None
+        key_text = "".join(sorted(key_choices))
+        if user_choices == key_choices:
+            return _result(True, f"回答正确，正确答案为 {key_text}。")
+        return _result(False, f"回答错误：你选择了 {''.join(sorted(user_choices))}，正确答案为 {key_text}。")
+
+    is_correct, wrong_blanks = _grade_fill_in(user_answer, key_answer)
+    if is_correct is None:
+        return None
+    if is_correct:
+        return _result(True, "回答正确，与标准答案一致。")
+    if wrong_blanks:
+        return _result(False, f"第 {'、'.join(wrong_blanks)} 空与标准答案不一致，正确答案为 {key_answer}。")
+    return _result(False, f"回答错误，正确答案为 {key_answer}。")
+
+
+def _final_answer(expression):
+    """解答过程的最终结果：最后一个等号右边的部分"""
+    return expression.rsplit("=", 1)[-1]
+
+
+def provisional_grade(question_type, key_answer, user_answer, options=None):
+    """
+    AI诊断不可用时的初步判断，总是返回结果（带 provisional=true）
+
+    能本地判分的按 grade() 处理；否则最终结果一致或与参考答案足够相似时视为正确。
+    """
+    result = grade(question_type, key_answer, user_answer, options)
+    if result is None:
+        key_expression = normalize_expression(key_answer)
+        user_expression = normalize_expression(user_answer)
+        is_correct = bool(key_expression and user_expression) and (
+            compare_blank(_final_answer(user_expression), _final_answer(key_expression)) is True
+            or difflib.SequenceMatcher(None, user_expression, key_expression).ratio() >= PROVISIONAL_SIMILARITY
+        )
+        values = _PROVISIONAL_CORRECT_SCORES if is_correct else _PROVISIONAL_WRONG_SCORES
+        verdict = "与参考答案基本一致" if is_correct else "与参考答案不一致"
+        result = _result(is_correct, f"AI诊断暂不可用，初步判断：{verdict}。稍后将自动复核并更新结果。",
+                         values, f"初步判断：{verdict}，待复核")
+    result["provisional"] = True
+    return result
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片作答的接收与识别
+- save_upload(): 按块读取上传文件，在线程中边写临时文件边计算 SHA-256，
+  完成后以内容摘要命名（uploads/<sha256>.<ext>），同一张照片重复提交只保留一份；
+  单个请求的内存占用与图片大小无关
+- recognize(): 图片转文字。识别结果与图片同名保存（<sha256>.ocr.txt），重复提交直接复用；
+  同时进行的识别数受 OCR_MAX_CONCURRENCY 限制，排队数超过 OCR_QUEUE_LIMIT 时拒绝新请求，
+  大量照片不会挤占其他接口
+"""
+
+import asyncio
+import hashlib
+import mimetypes
+import os
+import tempfile
+import time
+
+from ..common import metrics
+from ..common.http_client import FLOW_OCR, LLMError, call_workflow, upload_workflow_file
+
+UPLOAD_DIR = os.path.abspath(os.environ.get(
+    "UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "uploads")))
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+OCR_MAX_CONCURRENCY = int(os.environ.get("OCR_MAX_CONCURRENCY", "8"))
+# 排队加执行中的识别请求上限
+OCR_QUEUE_LIMIT = int(os.environ.get("OCR_QUEUE_LIMIT", "64"))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp")
+
+_ocr_semaphore = None
+_ocr_pending = 0
+
+
+class UploadTooLarge(Exception):
+    """上传文件超过 UPLOAD_MAX_BYTES"""
+
+
+class OcrBusy(Exception):
+    """识别队列已满"""
+
+
+def _write_chunk(file, hasher, chunk):
+    file.write(chunk)
+    hasher.update(chunk)
+
+
+def _finalize(temp_path, final_path):
+    """已存在同内容的文件时丢弃临时文件，返回是否为重复提交"""
+    if os.path.exists(final_path):
+        os.remove(temp_path)
+        return True
+    os.replace(temp_path, final_path)
+    return False
+
+
+async def save_upload(upload, upload_dir=UPLOAD_DIR):
+    """
+    流式保存上传的图片
+
+    Returns:
+        tuple: (文件路径, 内容摘要, 字节数)
+
+    Raises:
+        UploadTooLarge: 超过大小限制（已写入的临时文件会被删除）
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    extension = os.path.splitext(upload.filename or "")[1].lower() or ".jpg"
+    if extension not in IMAGE_EXTENSIONS:
+        # 上传目录通过 /uploads 对外提供静态访问，非图片扩展名一律不保留
+        extension = ".bin"
+    temp = await asyncio.to_thread(tempfile.NamedTemporaryFile, dir=upload_dir, suffix=".part", delete=False)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                raise UploadTooLarge(f"图片超过 {UPLOAD_MAX_BYTES // (1024 * 1024)}MB")
+            await asyncio.to_thread(_write_chunk, temp, hasher, chunk)
+        await asyncio.to_thread(temp.close)
+    except BaseException:
+        await asyncio.to_thread(temp.close)
+        await asyncio.to_thread(os.remove, temp.name)
+        raise
+
+    digest = hasher.hexdigest()
+    final_path = os.path.join(upload_dir, digest + extension)
+    duplicate = await asyncio.to_thread(_finalize, temp.name, final_path)
+    metrics.inc("uploads.images", duplicate=str(duplicate).lower())
+    metrics.observe("uploads.image_bytes", size)
+    return final_path, digest, size
+
+
+def _read_text(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _write_text(path, text):
+    temp_path = path + ".part"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+async def _recognize_remote(image_path, mime_type):
+    """先上传图片拿到URL，再交给OCR工作流识别"""
+    image_url = await upload_workflow_file(image_path, mime_type)
+    return await call_workflow(FLOW_OCR, {
+        "AGENT_USER_INPUT": "图片转文字",
+        "image": image_url,
+    })
+
+
+async def recognize(image_path):
+    """
+    调用API进行图片转文字识别
+
+    Returns:
+        str: OCR识别的文字内容；失败时返回说明文字（与诊断流程约定一致，不抛出异常）
+
+    Raises:
+        OcrBusy: 识别队列已满
+    """
+    global _ocr_semaphore, _ocr_pending
+
+    if not os.path.exists(image_path):
+        return "图片文件不存在"
+    mime_type, _ = mimetypes.guess_type(image_path)
+    if not mime_type or not mime_type.startswith('image/'):
+        return "不支持的图片格式"
+
+    text_path = os.path.splitext(image_path)[0] + ".ocr.txt"
+    cached = await asyncio.to_thread(_read_text, text_path)
+    if cached is not None:
+        metrics.inc("ocr.cache_hits")
+        return cached
+
+    if _ocr_pending >= OCR_QUEUE_LIMIT:
+        metrics.inc("ocr.rejected")
+        raise OcrBusy()
+    if _ocr_semaphore is None:
+        _ocr_semaphore = asyncio.Semaphore(OCR_MAX_CONCURRENCY)
+
+    _ocr_pending += 1
+    metrics.set_gauge("ocr.pending", _ocr_pending)
+    queued_at = time.perf_counter()
+    try:
+        async with _ocr_semaphore:
+            metrics.observe("ocr.queue_wait_ms", (time.perf_counter() - queued_at) * 1000)
+            with metrics.timer("ocr.recognize_ms"):
+                text = await _recognize_remote(image_path, mime_type)
+    except LLMError as e:
+        return f"OCR识别失败: {str(e)}"
+    except Exception as e:
+        return f"图片处理异常: {str(e)}"
+    finally:
+        _ocr_pending -= 1
+        metrics.set_gauge("ocr.pending", _ocr_pending)
+
+    await asyncio.to_thread(_write_text, text_path, text)
+    return text
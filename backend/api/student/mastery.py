@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+掌握度与错题更新
+文本诊断、图片诊断、批量诊断共用：
+- 在 Python 中算出每道题关联知识点的掌握度变化量
+- 用 INSERT ... ON CONFLICT(user_id, node_id) DO UPDATE 一次 executemany 写入 user_node_mastery
+- 答错的题目同样以 UPSERT 一次写入 wrong_questions
+- 初步诊断被复核更正时，revise_answers() 按新旧结果的变化量之差修正掌握度，并同步错题记录
+
+函数在写者队列的写意图中调用，不自行提交。
+"""
+
+from datetime import datetime
+
+# 四个评估维度的权重：知识掌握(40%) > 逻辑推理(30%) > 计算准确性(20%) > 行为表现(10%)
+DIMENSION_WEIGHTS = {
+    "Knowledge Mastery": 0.4,
+    "Logical Reasoning": 0.3,
+    "Calculation Accuracy": 0.2,
+    "Behavioral Performance": 0.1
+}
+
+# 新知识点的初始掌握度
+INITIAL_MASTERY = 0.5
+
+
+def weighted_score(scores):
+    """按维度权重计算加权分（0-1），没有可用的维度评分时返回 None"""
+    if not scores:
+        return None
+    total = 0.0
+    matched = False
+    for dimension in scores:
+        if not isinstance(dimension, dict):
+            continue
+        for name, weight in DIMENSION_WEIGHTS.items():
+            if name in dimension and isinstance(dimension.get("score"), (int, float)):
+                total += dimension["score"] * weight
+                matched = True
+                break
+    return total if matched else None
+
+
+def mastery_delta(diagnosis_result, difficulty):
+    """
+    一次作答对某个知识点掌握度的变化量
+
+    有维度评分时：基础变化 (加权分 - 0.5) * 0.3，即 -0.15 到 +0.15，难题影响更大（0.7-1.3倍）；
+    没有评分时按对错：答对 +0.05~0.15（难度越高奖励越多），答错 -0.02~0.12（难度越低惩罚越多）。
+    """
+    difficulty = 0.5 if difficulty is None else difficulty
+    score = weighted_score(diagnosis_result.get("scores"))
+    if score is not None:
+        return (score - 0.5) * 0.3 * (0.7 + difficulty * 0.6)
+    if diagnosis_result.get("is_correct"):
+        return 0.05 + difficulty * 0.1
+    return -(0.02 + (1 - difficulty) * 0.1)
+
+
+def _linked_nodes(conn, question_ids):
+    """{question_id: [(node_id, difficulty), ...]}"""
+    ids = list(dict.fromkeys(str(question_id) for question_id in question_ids))
+    placeholders = ",".join("?" * len(ids))
+    nodes = {}
+    for row in conn.execute(f"""
+        SELECT qm.question_id, qm.node_id, q.difficulty
+        FROM question_to_node_mapping qm
+        JOIN questions q ON qm.question_id = q.question_id
+        WHERE qm.question_id IN ({placeholders})
+    """, ids):
+        nodes.setdefault(str(row[0]), []).append((row[1], row[2]))
+    return nodes
+
+
+def _upsert_mastery(conn, user_id, rows):
+    """rows: [(node_id, delta), ...]，没有掌握度记录的知识点从 INITIAL_MASTERY 起算"""
+    if not rows:
+        return
+    conn.executemany("""
+        INSERT INTO user_node_mastery (user_id, node_id, mastery_score, updated_at)
+        VALUES (:user_id, :node_id, :initial, CURRENT_TIMESTAMP)
+        ON CONFLICT(user_id, node_id) DO UPDATE SET
+            mastery_score = MAX(0.0, MIN(1.0, mastery_score + :delta)),
+            updated_at = CURRENT_TIMESTAMP
+    """, [{
+        "user_id": user_id,
+        "node_id": node_id,
+        "initial": max(0.0, min(1.0, INITIAL_MASTERY + delta)),
+        "delta": delta,
+    } for node_id, delta in rows])
+
+
+def _record_wrong(conn, user_id, question_ids):
+    if not question_ids:
+        return
+    now = datetime.now().isoformat()
+    conn.executemany("""
+        INSERT INTO wrong_questions (user_id, question_id, wrong_count, last_wrong_time, status)
+        VALUES (?, ?, 1, ?, '未掌握')
+        ON CONFLICT(user_id, question_id) DO UPDATE SET
+            wrong_count = wrong_count + 1,
+            last_wrong_time = excluded.last_wrong_time
+    """, [(user_id, question_id, now) for question_id in question_ids])
+
+
+def apply_answers(conn, user_id, answers):
+    """
+    按诊断结果更新掌握度和错题记录
+
+    Args:
+        answers: [(question_id, diagnosis_result), ...]，同一知识点出现多次时依次累加
+
+    Returns:
+        int: 更新的掌握度行数
+    """
+    if not answers:
+        return 0
+    nodes = _linked_nodes(conn, [question_id for question_id, _ in answers])
+
+    mastery_rows = [
+        (node_id, mastery_delta(diagnosis_result, difficulty))
+        for question_id, diagnosis_result in answers
+        for node_id, difficulty in nodes.get(str(question_id), [])
+    ]
+    _upsert_mastery(conn, user_id, mastery_rows)
+    _record_wrong(conn, user_id, [
+        question_id for question_id, diagnosis_result in answers
+        if not diagnosis_result.get("is_correct")
+    ])
+    return len(mastery_rows)
+
+
+def revise_answers(conn, user_id, revisions):
+    """
+    诊断结果被更正后修正掌握度和错题记录
+
+    Args:
+        revisions: [(question_id, 原诊断结果, 新诊断结果), ...]
+
+    Returns:
+        int: 修正的掌握度行数
+    """
+    if not revisions:
+        return 0
+    nodes = _linked_nodes(conn, [question_id for question_id, _, _ in revisions])
+
+    mastery_rows = []
+    for question_id, old_result, new_result in revisions:
+        for node_id, difficulty in nodes.get(str(question_id), []):
+            delta = mastery_delta(new_result, difficulty) - mastery_delta(old_result, difficulty)
+            if delta:
+                mastery_rows.append((node_id, delta))
+    _upsert_mastery(conn, user_id, mastery_rows)
+
+    _record_wrong(conn, user_id, [
+        question_id for question_id, old_result, new_result in revisions
+        if old_result.get("is_correct") and not new_result.get("is_correct")
+    ])
+    # 原先判错、复核后判对：撤销那一次错题计数
+    corrected = [
+        (user_id, question_id) for question_id, old_result, new_result in revisions
+        if not old_result.get("is_correct") and new_result.get("is_correct")
+    ]
+    if corrected:
+        conn.executemany("""
+            UPDATE wrong_questions SET wrong_count = wrong_count - 1
+            WHERE user_id = ? AND question_id = ?
+        """, corrected)
+        conn.executemany("""
+            DELETE FROM wrong_questions WHERE user_id = ? AND question_id = ? AND wrong_count <= 0
+        """, corrected)
+    return len(mastery_rows)
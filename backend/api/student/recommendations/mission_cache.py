@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预计算的学习任务包缓存
+生成任务包要依次查询画像、调用总指挥决策、GNN预测和适合度评估，学生点击"获取任务"时等待很久。
+现在每次诊断写入后由 schedule_refresh() 在后台生成下一个任务包并写入 mission_cache 表（迁移 0011），
+GET /student/recommendation/{user_id} 命中时直接返回，响应带 generated_at 与 cached
+（缓存的任务包不含生成时的 debug 阶段耗时）。
+
+缓存项在以下情况视为过期，下次请求时同步重新生成：
+- 该学生的掌握度（user_node_mastery）与生成时不同
+- 知识图谱或题目有改动（catalog_version 由目录表上的触发器递增）
+- 生成超过 MISSION_CACHE_MAX_AGE_H 小时
+没有学习步骤的任务包（全部完成、暂无推荐、生成出错）不缓存。
+
+同一学生同时只有一个生成任务：生成期间再次诊断只标记一次补算，请求到达时等待正在进行的生成。
+/metrics 导出 mission_cache.hits、mission_cache.misses{reason=}、mission_cache.refresh_ms、
+mission_cache.refresh_failed。
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from ...common import metrics
+from ...common.database import run_user_db
+from ...common.llm_scheduler import llm_caller
+from ...common.write_queue import submit_user_write
+
+MISSION_CACHE_MAX_AGE_H = float(os.environ.get("MISSION_CACHE_MAX_AGE_H", "24"))
+
+
+def mastery_fingerprint(conn, user_id):
+    """该学生掌握度的摘要，任一知识点的掌握度变化都会改变"""
+    digest = hashlib.sha1()
+    for node_id, score in conn.execute("""
+        SELECT node_id, mastery_score FROM user_node_mastery
+        WHERE user_id = ? ORDER BY node_id
+    """, (user_id,)):
+        digest.update(f"{node_id}:{score};".encode())
+    return digest.hexdigest()
+
+
+def catalog_version(conn):
+    row = conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def _versions(conn, user_id):
+    return mastery_fingerprint(conn, user_id), catalog_version(conn)
+
+
+def _load(conn, user_id):
+    """返回 (任务包, generated_at)；没有缓存或已过期时返回 (None, 过期原因)"""
+    row = conn.execute("""
+        SELECT package_json, mastery_fingerprint, catalog_version, generated_at
+        FROM mission_cache WHERE user_id = ?
+    """, (user_id,)).fetchone()
+    if row is None:
+        return None, "missing"
+    if row[1] != mastery_fingerprint(conn, user_id):
+        return None, "mastery"
+    if row[2] != catalog_version(conn):
+        return None, "catalog"
+    if datetime.fromisoformat(row[3]) < datetime.now() - timedelta(hours=MISSION_CACHE_MAX_AGE_H):
+        return None, "expired"
+    return json.loads(row[0]), row[3]
+
+
+def _store(conn, user_id, package, fingerprint, version, generated_at):
+    # debug 是本次生成的阶段耗时，对之后命中缓存的请求没有意义，不写入缓存
+    package = {key: value for key, value in package.items() if key != "debug"}
+    conn.execute("""
+        INSERT OR REPLACE INTO mission_cache
+        (user_id, package_json, mastery_fingerprint, catalog_version, generated_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, (user_id, json.dumps(package, ensure_ascii=False), fingerprint, version, generated_at))
+
+
+class MissionCache:
+    """
+    学习任务包缓存。build 为 async build(user_id) -> 任务包 dict，
+    学习记录不足等情况抛出的异常（如 HTTPException）原样传给等待中的请求。
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self._tasks = {}     # user_id -> 正在进行的生成任务
+        self._pending = set()  # 生成期间又有新诊断、完成后需要再算一次的学生
+
+    async def get(self, user_id, refresh=False):
+        """返回带 generated_at、cached 的任务包；refresh=True 时忽略缓存重新生成"""
+        user_id = int(user_id)
+        if not refresh:
+            package, detail = await run_user_db(user_id, _load, user_id)
+            if package is not None:
+                metrics.inc("mission_cache.hits")
+                return {**package, "generated_at": detail, "cached": True}
+            metrics.inc("mission_cache.misses", reason=detail)
+        else:
+            metrics.inc("mission_cache.misses", reason="refresh")
+        task = self._tasks.get(user_id)
+        if task is None or refresh:
+            task = self._start(user_id)
+        # 客户端断开不取消生成，结果仍会写入缓存
+        package, generated_at = await asyncio.shield(task)
+        return {**package, "generated_at": generated_at, "cached": False}
+
+    def schedule_refresh(self, user_id):
+        """诊断写入后调用：在后台生成该学生的下一个任务包"""
+        user_id = int(user_id)
+        if user_id in self._tasks:
+            self._pending.add(user_id)
+            return
+        self._start(user_id)
+
+    def _start(self, user_id):
+        # 后台任务不继承当前请求的上下文（SQL统计、LLM调用方）
+        task = asyncio.get_running_loop().create_task(self._refresh(user_id), context=contextvars.Context())
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda done: self._finished(user_id, done))
+        return task
+
+    def _finished(self, user_id, task):
+        if self._tasks.get(user_id) is task:
+            del self._tasks[user_id]
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            metrics.inc("mission_cache.refresh_failed")
+            print(f"⚠️ 学生{user_id}的任务包生成失败: {getattr(error, 'detail', None) or error}")
+        if user_id in self._pending and user_id not in self._tasks:
+            self._pending.discard(user_id)
+            self._start(user_id)
+
+    async def _refresh(self, user_id):
+        """生成任务包并写入缓存，返回 (任务包, generated_at)"""
+        start = time.perf_counter()
+        # 先记下生成前的版本：生成期间掌握度或目录再变化时，这份缓存会在读取时被判为过期
+        fingerprint, version = await run_user_db(user_id, _versions, user_id)
+        with llm_caller(user_id=user_id):
+            package = await self.build(user_id)
+        generated_at = datetime.now().isoformat()
+        if package and package.get("payload", {}).get("steps"):
+            await submit_user_write(user_id, _store, user_id, package, fingerprint, version, generated_at)
+        metrics.observe("mission_cache.refresh_ms", (time.perf_counter() - start) * 1000)
+        print(f"📦 学生{user_id}的任务包已生成: {package.get('metadata', {}).get('title') if package else None}")
+        return package, generated_at
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        self._pending.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -5,9 +5,9 @@
 """
 
 import json
-from ...common.database import get_db_connection
+from ...common.database import run_user_db
 
-def handle_skill_enhancement(user_id: int, strategic_decision: dict, decision_reasoning: str = None):
+async def handle_skill_enhancement(user_id: int, strategic_decision: dict, decision_reasoning: str = None):
     """
     处理技能提升类型的学习任务
     
@@ -45,8 +45,12 @@ def handle_skill_enhancement(user_id: int, strategic_decision: dict, decision_re
             }
         }
     
-    # 连接数据库
-    conn = get_db_connection()
+    return await run_user_db(user_id, _build_skill_mission, user_id, domain_name, difficulty_range,
+                             decision_reasoning)
+
+
+def _build_skill_mission(conn, user_id, domain_name, difficulty_range, decision_reasoning):
+    """查询目标领域的技能知识点和推荐题目并组装任务包（在数据库线程中执行）"""
     target_skills = []
     
     try:
@@ -198,7 +202,6 @@ def handle_skill_enhancement(user_id: int, strategic_decision: dict, decision_re
                 ).fetchall()
             
             skill_data["recommended_questions"] = [q['question_id'] for q in question_results]
-            target_skills.append(skill_data)
         
         # 如果没有找到技能，添加一些默认技能
         if not target_skills:
@@ -236,5 +239,3 @@ def handle_skill_enhancement(user_id: int, strategic_decision: dict, decision_re
     except Exception as e:
         print(f"处理技能提升任务时出错: {e}")
         raise
-    finally:
-        conn.close()
\ No newline at end of file
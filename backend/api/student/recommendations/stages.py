@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推荐流水线的阶段计时与降级
+任务包生成由若干阶段组成：profile（画像）、strategy（总指挥决策）、frontier（候选节点）、
+gnn（候选节点的GNN预测）、suitability（AI适合度评估）。互不依赖的阶段并发执行，
+每个阶段有自己的超时（RECOMMEND_STAGE_TIMEOUT_S_<STAGE>），超时或出错时用降级结果继续，
+整体耗时取决于最慢的一条依赖链而不是各阶段之和。
+
+各阶段耗时和状态（ok / timeout / error / cancelled）写入任务包的 debug 字段，
+/metrics 导出 recommendation.stage_ms{stage=}、recommendation.stage_fallback{stage=,status=}。
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+from ...common import metrics
+
+_DEFAULT_STAGE_TIMEOUTS = {"strategy": 90, "frontier": 10, "gnn": 8, "suitability": 40}
+STAGE_TIMEOUTS = {
+    stage: float(os.environ.get(f"RECOMMEND_STAGE_TIMEOUT_S_{stage.upper()}", timeout))
+    for stage, timeout in _DEFAULT_STAGE_TIMEOUTS.items()
+}
+
+# 未提供降级结果的阶段失败时照常抛出异常
+_RAISE = object()
+
+
+class StageTimer:
+    """
+    记录一次任务包生成中各阶段的耗时
+
+    用法:
+        timer = StageTimer()
+        decision = await timer.run("strategy", call_ai_diagnosis_api(profile), fallback=(None, {}))
+        package["debug"] = timer.debug()
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._start = time.perf_counter()
+
+    def _record(self, name, start, status):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stages[name] = {"ms": round(elapsed_ms, 1), "status": status}
+        metrics.observe("recommendation.stage_ms", elapsed_ms, stage=name)
+        if status != "ok":
+            metrics.inc("recommendation.stage_fallback", stage=name, status=status)
+
+    async def run(self, name, awaitable, fallback=_RAISE):
+        """等待一个阶段（超时见 STAGE_TIMEOUTS）；给出 fallback 时超时或出错返回 fallback"""
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(awaitable, STAGE_TIMEOUTS.get(name))
+        except asyncio.CancelledError:
+            self._record(name, start, "cancelled")
+            raise
+        except Exception as e:
+            status = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+            self._record(name, start, status)
+            if fallback is _RAISE:
+                raise
+            reason = f"超时（{STAGE_TIMEOUTS.get(name)}秒）" if status == "timeout" else f"失败: {e}"
+            print(f"⚠️ 推荐阶段 {name} {reason}，使用降级结果")
+            return fallback
+        self._record(name, start, "ok")
+        return result
+
+    @contextmanager
+    def measure(self, name):
+        """记录一段同步代码的耗时（异常照常抛出）"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self._record(name, start, "error")
+            raise
+        self._record(name, start, "ok")
+
+    def debug(self):
+        return {
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 1),
+            "stages": dict(self.stages),
+        }
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+初步诊断复核
+AI诊断熔断或失败时，诊断接口给出的初步结果会登记在 provisional_answers 表（迁移 0007）。
+后台协程每 REDIAGNOSIS_INTERVAL_S 秒检查一次：熔断器未打开时，按登记顺序取出一批重新调用AI诊断，
+更新答题记录，并按新旧结果的差值修正掌握度和错题记录。
+
+复核失败 REDIAGNOSIS_MAX_ATTEMPTS 次的记录不再重试，保留初步结果。
+复核数量、失败次数和待复核数通过 /metrics 的 diagnosis.rediagnosis.* 导出。
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+
+from ..common import metrics
+from ..common.answer_scores import replace_scores
+from ..common.circuit_breaker import OPEN, CircuitOpen
+from ..common.database import fan_out_db
+from ..common.profile_state import rebuild_profile
+from ..common.write_queue import submit_user_write
+from .mastery import revise_answers
+
+REDIAGNOSIS_INTERVAL_S = float(os.environ.get("REDIAGNOSIS_INTERVAL_S", "30"))
+REDIAGNOSIS_BATCH_SIZE = int(os.environ.get("REDIAGNOSIS_BATCH_SIZE", "20"))
+REDIAGNOSIS_MAX_ATTEMPTS = int(os.environ.get("REDIAGNOSIS_MAX_ATTEMPTS", "5"))
+
+
+def register_provisional(conn, answer_id, user_id, question_id):
+    """登记一条初步诊断（在写入答题记录的同一个写意图中调用）"""
+    conn.execute("""
+        INSERT OR IGNORE INTO provisional_answers (answer_id, user_id, question_id)
+        VALUES (?, ?, ?)
+    """, (answer_id, user_id, question_id))
+
+
+def _load_pending(conn, limit):
+    rows = conn.execute("""
+        SELECT p.answer_id, p.user_id, p.question_id, a.user_answer, a.answer_id IS NOT NULL AS present
+        FROM provisional_answers p
+        LEFT JOIN user_answers a ON a.answer_id = p.answer_id
+        WHERE p.attempts < ?
+        ORDER BY p.answer_id
+        LIMIT ?
+    """, (REDIAGNOSIS_MAX_ATTEMPTS, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _count_pending(conn):
+    return conn.execute("SELECT COUNT(*) FROM provisional_answers WHERE attempts < ?",
+                        (REDIAGNOSIS_MAX_ATTEMPTS,)).fetchone()[0]
+
+
+def _drop(conn, answer_id):
+    conn.execute("DELETE FROM provisional_answers WHERE answer_id = ?", (answer_id,))
+
+
+def _record_failure(conn, answer_id, error):
+    conn.execute("""
+        UPDATE provisional_answers SET attempts = attempts + 1, last_error = ?
+        WHERE answer_id = ?
+    """, (error[:500], answer_id))
+
+
+def _finalize(conn, answer_id, user_id, question_id, new_result):
+    """用复核结果替换初步诊断并修正掌握度；答题记录已归档或已被更正时只删除登记"""
+    row = conn.execute("SELECT diagnosis_json FROM user_answers WHERE answer_id = ?", (answer_id,)).fetchone()
+    _drop(conn, answer_id)
+    if row is None or not row[0]:
+        return False
+    old_result = json.loads(row[0])
+    if not old_result.get("provisional"):
+        return False
+    conn.execute("""
+        UPDATE user_answers SET is_correct = ?, diagnosis_json = ?
+        WHERE answer_id = ?
+    """, (new_result["is_correct"], json.dumps(new_result, ensure_ascii=False), answer_id))
+    replace_scores(conn, answer_id, question_id, new_result)
+    # 更正很少发生，直接按更正后的记录重算该学生的画像状态
+    rebuild_profile(conn, user_id)
+    revise_answers(conn, user_id, [(question_id, old_result, new_result)])
+    return True
+
+
+class RediagnosisQueue:
+    """
+    初步诊断的后台复核。handler 为 async handler(question_id, user_answer) -> 诊断结果 dict，
+    需经过 breaker 调用AI（熔断时抛出 CircuitOpen）；题目已删除时返回 None。
+    """
+
+    def __init__(self, breaker, handler, interval_s=REDIAGNOSIS_INTERVAL_S, batch_size=REDIAGNOSIS_BATCH_SIZE):
+        self.breaker = breaker
+        self.handler = handler
+        self.interval_s = interval_s
+        self.batch_size = batch_size
+        self._task = None
+
+    def start(self):
+        """启动后台复核协程（服务启动时调用）"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(), context=contextvars.Context())
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"❌ 初步诊断复核出错: {e}")
+
+    async def run_once(self):
+        """复核一批初步诊断，返回更正的记录数"""
+        if self.breaker.state == OPEN:
+            return 0
+        pending = [row for rows in await fan_out_db(_load_pending, self.batch_size) for row in rows]
+        upgraded = 0
+        for row in pending[:self.batch_size]:
+            answer_id, user_id = row["answer_id"], row["user_id"]
+            if not row["present"]:
+                await submit_user_write(user_id, _drop, answer_id)
+                continue
+            try:
+                new_result = await self.handler(row["question_id"], row["user_answer"] or "")
+            except CircuitOpen:
+                break
+            except Exception as e:
+                error = str(getattr(e, "detail", None) or e)
+                metrics.inc("diagnosis.rediagnosis.failed")
+                await submit_user_write(user_id, _record_failure, answer_id, error)
+                continue
+            if new_result is None:
+                await submit_user_write(user_id, _drop, answer_id)
+                continue
+            if await submit_user_write(user_id, _finalize, answer_id, user_id, row["question_id"], new_result):
+                upgraded += 1
+                metrics.inc("diagnosis.rediagnosis.upgraded")
+
+        metrics.set_gauge("diagnosis.rediagnosis.pending", sum(await fan_out_db(_count_pending)))
+        if upgraded:
+            print(f"🔄 已复核 {upgraded} 条初步诊断")
+        return upgraded
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
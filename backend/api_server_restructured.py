@@ -13,12 +13,21 @@ from fastapi.staticfiles import StaticFiles
 import os
 
 # 导入通用模块
+from api.common.database import get_pool, shutdown_executor
+from api.common.write_queue import shutdown_writer
+from api.common.http_client import close_http_client
+from api.common.sharding import get_router
+from api.common import sql_trace
 from api.common.system import router as system_router
 from api.common.users import router as users_router
+from api.common.catalog import router as catalog_router
 
 # 导入学生端模块
 from api.student.recommendations.main import router as student_recommendation_router
+from api.student.recommendations.main import mission_cache
 from api.student.diagnosis import router as student_diagnosis_router
+from api.student.diagnosis import job_pool as diagnosis_job_pool
+from api.student.diagnosis import rediagnosis_queue
 from api.student.knowledge_map import router as student_knowledge_map_router
 from api.student.questions import router as student_questions_router
 from api.student.wrong_questions import router as student_wrong_questions_router
@@ -44,6 +53,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 按请求统计SQL：语句数、总耗时、最慢语句写入响应头和 /metrics，重复语句过多时输出N+1警告
+# SSE 响应的查询在流式发送期间执行，统计在流结束时上报，并作为最后一个 sql 事件发送
+@app.middleware("http")
+async def sql_instrumentation(request, call_next):
+    token, stats = sql_trace.start_request()
+    try:
+        response = await call_next(request)
+    finally:
+        sql_trace.end_request(token)
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else request.url.path
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        response.body_iterator = sql_trace.report_after_stream(response.body_iterator, stats, route_path)
+        return response
+    sql_trace.report(stats, route_path)
+    response.headers["X-SQL-Count"] = str(stats.count)
+    response.headers["X-SQL-Time-Ms"] = f"{stats.total_ms:.2f}"
+    response.headers["X-SQL-Slowest-Ms"] = f"{stats.slowest_ms:.2f}"
+    return response
+
 # 创建上传目录
 uploads_dir = "uploads"
 if not os.path.exists(uploads_dir):
@@ -55,6 +84,7 @@ app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
 # 注册通用路由
 app.include_router(system_router)
 app.include_router(users_router)
+app.include_router(catalog_router)
 
 # 注册学生端路由（添加前缀）
 app.include_router(student_recommendation_router, prefix="/student")
@@ -69,6 +99,25 @@ app.include_router(teacher_analytics_router, prefix="/teacher")
 app.include_router(teacher_question_router, prefix="/teacher")
 app.include_router(teacher_knowledge_router, prefix="/teacher")
 
+# 启动诊断任务工作协程并重新排队上次未完成的诊断任务，启动初步诊断复核协程
+@app.on_event("startup")
+async def start_diagnosis_jobs():
+    await diagnosis_job_pool.start()
+    rediagnosis_queue.start()
+
+# 进程退出时先停止诊断任务、复核协程和任务包预生成、提交写队列中剩余的写入，再关闭数据库线程池和连接池中的空闲连接、共享HTTP会话
+@app.on_event("shutdown")
+async def close_db_pool():
+    await diagnosis_job_pool.close()
+    await rediagnosis_queue.close()
+    await mission_cache.close()
+    await shutdown_writer()
+    await close_http_client()
+    shutdown_executor()
+    get_pool().close_all()
+    if get_router() is not None:
+        get_router().close_all()
+
 # 错误处理
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -91,7 +140,7 @@ async def get_api_info():
         "structure": {
             "common": {
                 "description": "通用接口",
-                "routes": ["/", "/health", "/users"]
+                "routes": ["/", "/health", "/metrics", "/users", "/catalog"]
             },
             "student": {
                 "description": "学生端接口",
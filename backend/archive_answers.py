@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+答题记录归档脚本
+把早于保留期的 user_answers 分批移入 data/archive/ 下的按月归档库，热表保持较小。
+每批只持有一次短写事务，可以在后端运行时执行（例如每天凌晨用 cron 调度）。
+开启分片（DB_SHARD_COUNT）时依次归档每个分片。
+
+用法:
+    python archive_answers.py                 # 归档 ANSWER_ARCHIVE_HORIZON_DAYS（默认180）天之前的记录
+    python archive_answers.py --days 90       # 指定保留天数
+"""
+
+import argparse
+
+from api.common.answer_archive import (
+    ANSWER_ARCHIVE_BATCH_SIZE,
+    ANSWER_ARCHIVE_HORIZON_DAYS,
+    archive_old_answers,
+)
+from api.common.database import DB_PATH
+from api.common.sharding import get_router
+
+
+def main():
+    parser = argparse.ArgumentParser(description="归档旧的答题记录")
+    parser.add_argument("--days", type=int, default=ANSWER_ARCHIVE_HORIZON_DAYS, help="热表保留的天数")
+    parser.add_argument("--batch-size", type=int, default=ANSWER_ARCHIVE_BATCH_SIZE, help="每批归档条数")
+    args = parser.parse_args()
+
+    router = get_router()
+    paths = [pool.db_path for pool in router.all_pools()] if router is not None else [DB_PATH]
+    for path in paths:
+        print(f"🔧 归档 {path}")
+        total = archive_old_answers(path, horizon_days=args.days, batch_size=args.batch_size)
+        print(f"✅ 共归档 {total} 条答题记录")
+
+
+if __name__ == "__main__":
+    main()
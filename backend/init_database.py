@@ -2,52 +2,54 @@
 # -*- coding: utf-8 -*-
 """
 数据库初始化脚本
-创建所有必要的表结构和初始数据
+按版本号依次应用 data/migrations/ 下尚未执行的迁移。
+对已有数据的库只做增量升级，不会删除任何表或数据。
+
+用法:
+    python init_database.py                # 升级 data/my_database.db 到最新版本
+    python init_database.py --db other.db  # 指定数据库文件
+    python init_database.py --target 2     # 只升级到指定版本
 """
 
+import argparse
 import sqlite3
-import os
 from pathlib import Path
 
-def init_database():
-    """初始化数据库"""
-    # 确保data目录存在
-    data_dir = Path("../data")
-    data_dir.mkdir(exist_ok=True)
-    
-    db_path = data_dir / "my_database.db"
-    
+from api.common.migrations import migrate, current_version, MigrationError
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "my_database.db"
+
+
+def init_database(db_path=DEFAULT_DB_PATH, target=None):
+    """初始化（升级）数据库"""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
     # 连接数据库
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
-    
+
     print(f"🔧 初始化数据库: {db_path}")
-    
-    # 读取SQL文件
-    sql_file = Path("../data/create_tables.sql")
-    if sql_file.exists():
-        with open(sql_file, 'r', encoding='utf-8') as f:
-            sql_content = f.read()
-        
-        # 执行SQL语句
-        try:
-            conn.executescript(sql_content)
-            conn.commit()
-            print("✅ 数据库表结构创建成功")
-        except Exception as e:
-            print(f"❌ 创建表结构失败: {e}")
-            return False
-    else:
-        print("❌ SQL文件不存在")
+    print(f"📌 当前版本: {current_version(conn)}")
+
+    try:
+        applied = migrate(conn, target=target)
+    except MigrationError as e:
+        print(f"❌ {e}")
+        conn.close()
         return False
-    
+
+    if not applied:
+        print("ℹ️  数据库已是最新版本，无需迁移")
+    print(f"📌 迁移后版本: {current_version(conn)}")
+
     # 验证表是否创建成功
     tables = [
-        'users', 'knowledge_nodes', 'knowledge_edges', 
-        'questions', 'question_to_node_mapping', 
+        'users', 'knowledge_nodes', 'knowledge_edges',
+        'questions', 'question_to_node_mapping',
         'user_node_mastery', 'user_answers', 'wrong_questions'
     ]
-    
+
     for table in tables:
         try:
             cursor = conn.execute(f"SELECT COUNT(*) as count FROM {table}")
@@ -55,10 +57,14 @@ def init_database():
             print(f"✅ 表 {table}: {count} 条记录")
         except Exception as e:
             print(f"❌ 表 {table} 验证失败: {e}")
-    
+
     conn.close()
     print("🎉 数据库初始化完成")
     return True
 
 if __name__ == "__main__":
-    init_database() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="应用数据库迁移")
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="数据库文件路径")
+    parser.add_argument("--target", type=int, default=None, help="目标版本号，默认最新")
+    args = parser.parse_args()
+    init_database(args.db, args.target)
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地LLM工作流替身
+与星辰工作流相同的接口（/workflow/v1/chat/completions、/workflow/v1/upload_file），
+返回相同的 choices[0].delta.content 结构，用于离线压测和基准测试。
+请求带 "stream": true 时以 SSE 分段推送内容（LLM_STUB_TOKEN_CHARS 个字符一段，间隔 LLM_STUB_TOKEN_MS 毫秒）。
+
+运行模式（LLM_STUB_MODE）:
+- replay（默认）：按 flow_id + 参数从录制的样本中返回响应；没有样本时按 LLM_STUB_ON_MISS
+  返回合成响应（synthetic，默认）或 404（error）
+- record：把请求转发到真实服务（LLM_STUB_UPSTREAM），响应原样返回并保存为样本
+- synthetic：不读样本，按工作流类型生成确定性的合成响应
+
+故障注入（启动时由环境变量设置，运行中可通过 POST /stub/config 调整，可按 flow_id 单独设置）:
+- LLM_STUB_LATENCY_MS / LLM_STUB_JITTER_MS：基础延迟与随机抖动
+- LLM_STUB_TAIL_RATE / LLM_STUB_TAIL_MS：按比例注入长尾延迟
+- LLM_STUB_ERROR_RATE / LLM_STUB_ERROR_STATUS：按比例返回错误状态码（默认503）
+- LLM_STUB_SEED：随机种子，固定后注入序列可复现
+
+用法:
+    LLM_STUB_MODE=record python llm_stub_server.py      # 录制
+    python llm_stub_server.py                            # 回放
+    LLM_STUB_URL=http://127.0.0.1:8009 python api_server_restructured.py
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+
+import aiohttp
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from api.common import metrics
+from api.common.http_client import (
+    FLOW_DIAGNOSIS,
+    FLOW_LEARNING_OBJECTIVE,
+    FLOW_OCR,
+    FLOW_STRATEGY,
+    FLOW_SUITABILITY,
+    close_http_client,
+    get_session,
+)
+
+LLM_STUB_PORT = int(os.environ.get("LLM_STUB_PORT", "8009"))
+LLM_STUB_MODE = os.environ.get("LLM_STUB_MODE", "replay")
+LLM_STUB_ON_MISS = os.environ.get("LLM_STUB_ON_MISS", "synthetic")
+LLM_STUB_FIXTURE_DIR = os.path.abspath(os.environ.get(
+    "LLM_STUB_FIXTURE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'llm_fixtures')))
+LLM_STUB_UPSTREAM = os.environ.get("LLM_STUB_UPSTREAM", "https://xingchen-api.xf-yun.com").rstrip("/")
+LLM_STUB_UPSTREAM_TIMEOUT_S = float(os.environ.get("LLM_STUB_UPSTREAM_TIMEOUT_S", "120"))
+# 流式请求（"stream": true）每段的字符数与间隔
+LLM_STUB_TOKEN_CHARS = int(os.environ.get("LLM_STUB_TOKEN_CHARS", "4"))
+LLM_STUB_TOKEN_MS = float(os.environ.get("LLM_STUB_TOKEN_MS", "30"))
+
+MODES = ("replay", "record", "synthetic")
+FAULT_KNOBS = ("latency_ms", "jitter_ms", "tail_rate", "tail_ms", "error_rate", "error_status")
+
+
+def request_key(flow_id, parameters):
+    """同一工作流、同样参数（键顺序无关）得到同一个样本键"""
+    canonical = json.dumps(parameters, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(f"{flow_id}|{canonical}".encode("utf-8")).hexdigest()[:20]
+
+
+def workflow_response(content, key):
+    """与星辰工作流一致的非流式响应结构"""
+    return {
+        "code": 0,
+        "message": "Success",
+        "id": f"stub-{key}",
+        "created": int(time.time()),
+        "choices": [{
+            "delta": {"role": "assistant", "content": content},
+            "index": 0,
+            "finish_reason": "stop",
+        }],
+    }
+
+
+# ---------------- 合成响应 ----------------
+
+def _synthetic_diagnosis(user_input, roll):
+    parts = user_input.split("##")
+    answer = parts[1].strip() if len(parts) > 1 else ""
+    is_correct = bool(answer) and roll < 0.7
+    base = 0.85 if is_correct else 0.3
+    scores = [
+        {"Knowledge Mastery": "知识掌握", "score": base, "feedback": "替身服务生成的评分"},
+        {"Logical Reasoning": "解题逻辑", "score": base, "feedback": "替身服务生成的评分"},
+        {"Calculation Accuracy": "计算准确性", "score": base, "feedback": "替身服务生成的评分"},
+        {"Behavioral Performance": "行为表现", "score": 0.6, "feedback": "替身服务生成的评分"},
+    ]
+    verdict = "yes" if is_correct else "no"
+    reason = "解题思路正确，结果无误。" if is_correct else "解题过程存在错误，请对照解析复习相关知识点。"
+    return f"{verdict}##{reason}##{json.dumps(scores, ensure_ascii=False)}"
+
+
+def _synthetic_strategy(user_input, roll):
+    mission_types = ("NEW_KNOWLEDGE", "WEAK_POINT_CONSOLIDATION", "SKILL_ENHANCEMENT")
+    mission_type = mission_types[int(roll * len(mission_types))]
+    decision = {"mission_type": mission_type, "target": {}, "constraints": {}}
+    return f"根据学习画像（替身服务），建议本次任务类型为 {mission_type}。##{json.dumps(decision, ensure_ascii=False)}"
+
+
+def _synthetic_suitability(user_input, roll):
+    try:
+        candidates = json.loads(user_input).get("candidate_knowledge", [])
+    except (ValueError, AttributeError):
+        candidates = []
+    return json.dumps([
+        {"node_name": name, "suitability_score": round(0.3 + 0.6 * int(request_key("node", name)[:4], 16) / 0xFFFF, 3)}
+        for name in candidates
+    ], ensure_ascii=False)
+
+
+def _synthetic_learning_objective(user_input, roll):
+    return f"1. 理解{user_input}的基本概念；2. 掌握{user_input}的常用方法；3. 能运用{user_input}解决典型问题。"
+
+
+def _synthetic_ocr(user_input, roll):
+    return "解：由题意得 P(A)=0.5，所以答案为 0.5"
+
+
+SYNTHETIC = {
+    FLOW_DIAGNOSIS: _synthetic_diagnosis,
+    FLOW_STRATEGY: _synthetic_strategy,
+    FLOW_SUITABILITY: _synthetic_suitability,
+    FLOW_LEARNING_OBJECTIVE: _synthetic_learning_objective,
+    FLOW_OCR: _synthetic_ocr,
+}
+
+
+def synthetic_content(flow_id, parameters, key):
+    """按工作流类型生成确定性的响应内容（同样的参数总是得到同样的内容）"""
+    generator = SYNTHETIC.get(flow_id)
+    if generator is None:
+        return f"替身服务：未知工作流 {flow_id}"
+    roll = int(key[:8], 16) / 0x100000000
+    return generator(str(parameters.get("AGENT_USER_INPUT", "")), roll)
+
+
+# ---------------- 样本存储 ----------------
+
+class FixtureStore:
+    """样本按 <目录>/<flow_id>/<键>.json 保存，上传文件按内容摘要保存在 uploads/ 下"""
+
+    def __init__(self, directory=LLM_STUB_FIXTURE_DIR):
+        self.directory = directory
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.part"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    def load(self, flow_id, key):
+        fixture = self._read(self._path(flow_id, f"{key}.json"))
+        return fixture["response"] if fixture else None
+
+    def save(self, flow_id, key, parameters, response):
+        self._write(self._path(flow_id, f"{key}.json"), {
+            "flow_id": flow_id,
+            "parameters": parameters,
+            "response": response,
+        })
+
+    def load_upload(self, digest):
+        fixture = self._read(self._path("uploads", f"{digest}.json"))
+        return fixture["response"] if fixture else None
+
+    def save_upload(self, digest, filename, response):
+        self._write(self._path("uploads", f"{digest}.json"), {"filename": filename, "response": response})
+
+
+# ---------------- 故障注入 ----------------
+
+class FaultInjector:
+    """按配置为每个请求决定注入的延迟和错误，可按 flow_id 覆盖默认配置"""
+
+    def __init__(self, seed=None, **knobs):
+        self.defaults = {
+            "latency_ms": float(os.environ.get("LLM_STUB_LATENCY_MS", "0")),
+            "jitter_ms": float(os.environ.get("LLM_STUB_JITTER_MS", "0")),
+            "tail_rate": float(os.environ.get("LLM_STUB_TAIL_RATE", "0")),
+            "tail_ms": float(os.environ.get("LLM_STUB_TAIL_MS", "0")),
+            "error_rate": float(os.environ.get("LLM_STUB_ERROR_RATE", "0")),
+            "error_status": int(os.environ.get("LLM_STUB_ERROR_STATUS", "503")),
+        }
+        self.defaults.update(knobs)
+        self.flows = {}
+        seed = seed if seed is not None else os.environ.get("LLM_STUB_SEED")
+        self._random = random.Random(seed)
+
+    def config(self):
+        return {"defaults": dict(self.defaults), "flows": {k: dict(v) for k, v in self.flows.items()}}
+
+    def update(self, flow_id=None, **knobs):
+        unknown = set(knobs) - set(FAULT_KNOBS)
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(sorted(unknown))}")
+        if flow_id:
+            self.flows.setdefault(flow_id, {}).update(knobs)
+        else:
+            self.defaults.update(knobs)
+
+    def plan(self, flow_id):
+        """返回 (延迟秒数, 注入的错误状态码或 None)"""
+        knobs = {**self.defaults, **self.flows.get(flow_id, {})}
+        delay_ms = knobs["latency_ms"] + self._random.uniform(0, knobs["jitter_ms"])
+        if knobs["tail_rate"] and self._random.random() < knobs["tail_rate"]:
+            delay_ms += knobs["tail_ms"]
+        status = None
+        if knobs["error_rate"] and self._random.random() < knobs["error_rate"]:
+            status = int(knobs["error_status"])
+        return delay_ms / 1000, status
+
+
+# ---------------- 服务 ----------------
+
+app = FastAPI(title="LLM工作流替身", description="离线压测用的星辰工作流替身，支持录制/回放与故障注入")
+
+store = FixtureStore()
+faults = FaultInjector()
+state = {"mode": LLM_STUB_MODE}
+
+
+async def _inject(flow_id):
+    """按故障配置等待，需要注入错误时返回错误响应"""
+    delay_s, status = faults.plan(flow_id)
+    if delay_s > 0:
+        await asyncio.sleep(delay_s)
+    if status is not None:
+        metrics.inc("stub.injected_errors", flow_id=flow_id)
+        return JSONResponse(status_code=status, content={"code": status, "message": "替身服务注入的错误"})
+    return None
+
+
+async def _forward(path, headers, **kwargs):
+    """转发到真实服务，返回 (状态码, 响应JSON)"""
+    timeout = aiohttp.ClientTimeout(total=LLM_STUB_UPSTREAM_TIMEOUT_S)
+    async with get_session().post(LLM_STUB_UPSTREAM + path, headers=headers, timeout=timeout, **kwargs) as response:
+        return response.status, await response.json(content_type=None)
+
+
+def _upstream_headers(request: Request):
+    authorization = request.headers.get("authorization")
+    return {"Authorization": authorization} if authorization else {}
+
+
+async def _stream_content(response, flow_id):
+    """把完整响应的内容按 LLM_STUB_TOKEN_CHARS 个字符一段、间隔 LLM_STUB_TOKEN_MS 以 SSE 推送"""
+    choices = response.get("choices") or [{}]
+    content = (choices[0].get("delta") or {}).get("content") or ""
+    for i in range(0, len(content), LLM_STUB_TOKEN_CHARS):
+        if i:
+            await asyncio.sleep(LLM_STUB_TOKEN_MS / 1000)
+        chunk = {
+            "code": 0,
+            "message": "Success",
+            "id": response.get("id"),
+            "choices": [{"delta": {"role": "assistant", "content": content[i:i + LLM_STUB_TOKEN_CHARS]},
+                         "index": 0, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    done = {"code": 0, "message": "Success", "id": response.get("id"),
+            "choices": [{"delta": {"role": "assistant", "content": ""}, "index": 0, "finish_reason": "stop"}]}
+    yield f"data: {json.dumps(done, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+    metrics.inc("stub.streamed", flow_id=flow_id)
+
+
+async def _workflow_response(request, body, flow_id, parameters, key):
+    """按运行模式得到完整（非流式）响应，返回 (状态码, 响应JSON)"""
+    if state["mode"] == "record":
+        # 流式请求也按非流式向真实服务录制，回放时再按片段推送
+        status, response = await _forward("/workflow/v1/chat/completions", _upstream_headers(request),
+                                          json={**body, "stream": False})
+        if status < 400:
+            await asyncio.to_thread(store.save, flow_id, key, parameters, response)
+            metrics.inc("stub.recorded", flow_id=flow_id)
+        return status, response
+
+    if state["mode"] == "replay":
+        response = await asyncio.to_thread(store.load, flow_id, key)
+        if response is not None:
+            metrics.inc("stub.replayed", flow_id=flow_id)
+            return 200, response
+        metrics.inc("stub.misses", flow_id=flow_id)
+        if LLM_STUB_ON_MISS == "error":
+            return 404, {"code": 404, "message": f"没有录制的样本: {flow_id}/{key}"}
+
+    metrics.inc("stub.synthetic", flow_id=flow_id)
+    return 200, workflow_response(synthetic_content(flow_id, parameters, key), key)
+
+
+@app.post("/workflow/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    flow_id = str(body.get("flow_id", ""))
+    parameters = body.get("parameters") or {}
+    key = request_key(flow_id, parameters)
+    metrics.inc("stub.requests", flow_id=flow_id)
+
+    with metrics.timer("stub.latency_ms", flow_id=flow_id):
+        injected = await _inject(flow_id)
+        if injected is not None:
+            return injected
+        status, response = await _workflow_response(request, body, flow_id, parameters, key)
+
+    if status >= 400 or not body.get("stream"):
+        return JSONResponse(status_code=status, content=response)
+    return StreamingResponse(_stream_content(response, flow_id), media_type="text/event-stream")
+
+
+@app.post("/workflow/v1/upload_file")
+async def upload_file(request: Request, file: UploadFile = File(...)):
+    content = await file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    metrics.inc("stub.requests", flow_id="upload_file")
+
+    with metrics.timer("stub.latency_ms", flow_id="upload_file"):
+        injected = await _inject("upload_file")
+        if injected is not None:
+            return injected
+
+        if state["mode"] == "record":
+            form = aiohttp.FormData()
+            form.add_field("file", content, filename=file.filename, content_type=file.content_type)
+            status, response = await _forward("/workflow/v1/upload_file", _upstream_headers(request), data=form)
+            if status < 400:
+                await asyncio.to_thread(store.save_upload, digest, file.filename, response)
+                metrics.inc("stub.recorded", flow_id="upload_file")
+            return JSONResponse(status_code=status, content=response)
+
+        if state["mode"] == "replay":
+            # 回放录制时的文件URL，使后续OCR请求的参数与录制时一致
+            response = await asyncio.to_thread(store.load_upload, digest)
+            if response is not None:
+                metrics.inc("stub.replayed", flow_id="upload_file")
+                return response
+
+        metrics.inc("stub.synthetic", flow_id="upload_file")
+        return {"code": 0, "message": "Success", "data": {"url": f"stub://uploads/{digest}"}}
+
+
+@app.get("/stub/config")
+async def get_config():
+    """当前运行模式与故障注入配置"""
+    return {"mode": state["mode"], "fixture_dir": store.directory, **faults.config()}
+
+
+@app.post("/stub/config")
+async def update_config(request: dict):
+    """
+    调整运行模式和故障注入，例如:
+    {"mode": "replay", "latency_ms": 800, "tail_rate": 0.05, "tail_ms": 20000}
+    {"flow_id": "7347650620700119042", "error_rate": 0.3}
+    """
+    knobs = dict(request)
+    mode = knobs.pop("mode", None)
+    if mode is not None:
+        if mode not in MODES:
+            raise HTTPException(status_code=400, detail=f"mode 只能是 {' / '.join(MODES)}")
+        state["mode"] = mode
+    try:
+        faults.update(knobs.pop("flow_id", None), **knobs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await get_config()
+
+
+@app.get("/stub/stats")
+async def get_stats():
+    """请求数、回放/录制/合成次数、注入的错误数与耗时（stub.*）"""
+    return metrics.snapshot()
+
+
+@app.post("/stub/stats/reset")
+async def reset_stats():
+    metrics.reset()
+    return {"status": "success"}
+
+
+@app.on_event("shutdown")
+async def close_upstream():
+    await close_http_client()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    print(f"🧪 启动LLM工作流替身（{state['mode']} 模式）...")
+    print(f"📁 样本目录: {store.directory}")
+    print(f"🔗 后端设置 LLM_STUB_URL=http://127.0.0.1:{LLM_STUB_PORT} 即可改用替身")
+
+    uvicorn.run(app, host="0.0.0.0", port=LLM_STUB_PORT, log_level="info")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学生画像状态重建/核对脚本
+画像状态（user_profile_state 等，见 api/common/profile_state.py）由诊断写入路径增量维护，
+本脚本从 user_answers 重新计算：默认重建，--check 只比较已存状态与重新计算的结果并列出差异。
+每个学生一个短写事务，可以在后端运行时执行。开启分片（DB_SHARD_COUNT）时依次处理每个分片。
+
+用法:
+    python rebuild_profiles.py                # 重建所有学生的画像状态
+    python rebuild_profiles.py --user 3       # 只重建指定学生（可重复）
+    python rebuild_profiles.py --check        # 只核对，存在差异时退出码为 1
+"""
+
+import argparse
+import sys
+
+from api.common.database import DB_PATH, connect
+from api.common.profile_state import check_profile, profile_user_ids, rebuild_profile
+from api.common.sharding import connect_shard, get_router, shard_for_user
+
+
+def _process(conn, user_ids, check):
+    """处理一个库中的学生，返回 (处理人数, 存在差异的人数)"""
+    mismatched = 0
+    for user_id in user_ids:
+        if check:
+            problems = check_profile(conn, user_id)
+            if problems:
+                mismatched += 1
+                print(f"❌ 学生 {user_id} 的画像状态与答题记录不一致:")
+                for problem in problems:
+                    print(f"   - {problem}")
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rebuild_profile(conn, user_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return len(user_ids), mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建或核对学生画像状态")
+    parser.add_argument("--user", type=int, action="append", help="只处理指定学生，可重复")
+    parser.add_argument("--check", action="store_true", help="只核对不修改")
+    args = parser.parse_args()
+
+    router = get_router()
+    if router is not None:
+        targets = [(index, pool.db_path) for index, pool in enumerate(router.all_pools())]
+    else:
+        targets = [(None, DB_PATH)]
+
+    total = mismatched = 0
+    for index, path in targets:
+        print(f"🔧 {'核对' if args.check else '重建'} {path}")
+        conn = connect_shard(path) if index is not None else connect(path)
+        conn.isolation_level = None  # 事务由本脚本显式控制
+        try:
+            user_ids = profile_user_ids(conn) if args.user is None else [
+                user_id for user_id in args.user if index is None or shard_for_user(user_id) == index]
+            counts = _process(conn, user_ids, args.check)
+        finally:
+            conn.close()
+        total += counts[0]
+        mismatched += counts[1]
+
+    if args.check:
+        if mismatched:
+            print(f"❌ {total} 名学生中 {mismatched} 名的画像状态不一致，可不带 --check 重新运行以重建")
+            sys.exit(1)
+        print(f"✅ {total} 名学生的画像状态均与答题记录一致")
+    else:
+        print(f"✅ 已重建 {total} 名学生的画像状态")
+
+
+if __name__ == "__main__":
+    main()
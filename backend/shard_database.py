@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学生数据分片脚本
+把目录库（DB_PATH）中已有的答题记录、掌握度、错题按 user_id 复制到 DB_SHARD_DIR 下的各个分片。
+开启分片（设置 DB_SHARD_COUNT）前运行一次；重复运行不会产生重复数据。
+目录库中的原始数据保留不动，开启分片后这些表由分片中的同名表覆盖。
+没有 user_id 列的表（user_answer_scores）按 answer_id 对应答题记录的 user_id 分片。
+
+用法:
+    DB_SHARD_COUNT=4 python shard_database.py
+"""
+
+import sqlite3
+import sys
+
+from api.common.database import DB_PATH
+from api.common.sharding import (
+    DB_SHARD_COUNT,
+    SHARD_TABLES,
+    get_router,
+    shard_for_user,
+)
+
+
+def _owner_query(table, columns):
+    """查询表中所有行，最后一列 owner_id 为该行所属学生"""
+    if "user_id" in columns:
+        column_list = ", ".join(columns)
+        return f"SELECT {column_list}, user_id AS owner_id FROM {table}"
+    # 维度评分只有 answer_id，跟随答题记录分片；答题记录已不存在的孤立行不复制
+    column_list = ", ".join(f"t.{column}" for column in columns)
+    return f"""
+        SELECT {column_list}, ua.user_id AS owner_id
+        FROM {table} AS t
+        JOIN user_answers AS ua ON ua.answer_id = t.answer_id
+    """
+
+
+def shard_existing_data():
+    router = get_router()
+    if router is None:
+        print("❌ 未开启分片，请先设置环境变量 DB_SHARD_COUNT")
+        return False
+
+    source = sqlite3.connect(DB_PATH)
+    source.row_factory = sqlite3.Row
+    print(f"🔧 目录库: {DB_PATH}")
+    print(f"📦 分片数: {DB_SHARD_COUNT}，目录: {router.directory}")
+
+    shard_conns = {index: pool.acquire() for index, pool in enumerate(router.all_pools())}
+    try:
+        for table in SHARD_TABLES:
+            columns = [row["name"] for row in source.execute(f"PRAGMA table_info({table})")]
+            column_list = ", ".join(columns)
+            placeholders = ", ".join("?" * len(columns))
+            counts = {index: 0 for index in shard_conns}
+            for row in source.execute(_owner_query(table, columns)):
+                index = shard_for_user(row["owner_id"])
+                cursor = shard_conns[index].execute(
+                    f"INSERT OR IGNORE INTO main.{table} ({column_list}) VALUES ({placeholders})",
+                    tuple(row)[:len(columns)])
+                counts[index] += cursor.rowcount
+            for conn in shard_conns.values():
+                conn.commit()
+            detail = "，".join(f"shard_{index:02d}: {count}" for index, count in counts.items())
+            print(f"✅ 表 {table}: {detail}")
+    finally:
+        for conn in shard_conns.values():
+            conn.close()
+        source.close()
+
+    print("🎉 分片完成")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if shard_existing_data() else 1)
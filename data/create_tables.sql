@@ -1,269 +0,0 @@
--- ====================================================================
---            AI自适应学习平台 - 最终版SQLite数据库 Schema
--- ====================================================================
-
--- 删除旧表，确保每次执行都是一个全新的、干净的开始
-PRAGMA foreign_keys = OFF;
-DROP TABLE IF EXISTS users;
-DROP TABLE IF EXISTS knowledge_nodes;
-DROP TABLE IF EXISTS knowledge_edges;
-DROP TABLE IF EXISTS questions;
-DROP TABLE IF EXISTS question_to_node_mapping;
-DROP TABLE IF EXISTS user_node_mastery;
-DROP TABLE IF EXISTS user_answers;
-DROP TABLE IF EXISTS wrong_questions;
-PRAGMA foreign_keys = ON;
-
-
--- 表1: 用户表 (增加了role字段)
-CREATE TABLE users (
-    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL UNIQUE,
-    role TEXT NOT NULL DEFAULT 'student' -- 'student' 或 'teacher'
-);
-
--- 表2: 知识点表 (图的“点”)
-CREATE TABLE knowledge_nodes (
-    node_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    node_name TEXT NOT NULL,
-    node_difficulty REAL, -- 知识点本身的抽象难度 (0.0 - 1.0)
-    level TEXT,           -- 知识点所属年级
-    node_type TEXT,        -- 知识点类型：概念、章节等
-    node_learning TEXT    -- 知识点的讲解、定义等核心文本
-);
-
--- 表3: 知识点关系表 (图的“边”) (增加了status和created_by)
-CREATE TABLE knowledge_edges (
-    edge_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    source_node_id TEXT NOT NULL,
-    target_node_id TEXT NOT NULL,
-    relation_type TEXT NOT NULL, -- 例如 'is_prerequisite_for'
-    status TEXT NOT NULL DEFAULT 'published', -- 'draft' (AI建议), 'published' (教师确认)
-    created_by INTEGER NOT NULL, -- 关联到users表，记录创建者
-    FOREIGN KEY (source_node_id) REFERENCES knowledge_nodes (node_id),
-    FOREIGN KEY (target_node_id) REFERENCES knowledge_nodes (node_id),
-    FOREIGN KEY (created_by) REFERENCES users (user_id)
-);
-
--- 表4: 题库表 (增加了图片、状态和创建者)
-CREATE TABLE questions (
-    question_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    question_text TEXT NOT NULL,
-    question_image_url TEXT, -- 存储图片路径
-    question_type TEXT,      -- '选择题', '填空题', '解答题'
-    difficulty REAL,         -- 题目的具体难度 (0.0 - 1.0)
-    options TEXT,            -- 对于选择题，存储JSON格式的选项
-    answer TEXT,
-    analysis TEXT,
-    skill_focus TEXT,        -- 题目的技能重点
-    status TEXT NOT NULL DEFAULT 'published', -- 'draft' (AI生成), 'published' (教师发布)
-    created_by INTEGER NOT NULL, -- 关联到users表，记录创建者
-    FOREIGN KEY (created_by) REFERENCES users (user_id)
-);
-
--- 表5: 题目与知识点关联表
-CREATE TABLE question_to_node_mapping (
-    mapping_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    question_id INTEGER NOT NULL,
-    node_id TEXT NOT NULL,
-    FOREIGN KEY (question_id) REFERENCES questions (question_id),
-    FOREIGN KEY (node_id) REFERENCES knowledge_nodes (node_id)
-);
-
--- 表6: 用户掌握度表
-CREATE TABLE user_node_mastery (
-    mastery_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL,
-    node_id TEXT NOT NULL,
-    mastery_score REAL NOT NULL DEFAULT 0.0,
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- 掌握度更新时间戳
-    FOREIGN KEY (user_id) REFERENCES users (user_id),
-    FOREIGN KEY (node_id) REFERENCES knowledge_nodes (node_id),
-    UNIQUE(user_id, node_id)
-);
-
--- 表7: 用户答题记录表
-CREATE TABLE user_answers (
-    answer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL,
-    question_id INTEGER NOT NULL,
-    user_answer TEXT,
-    is_correct BOOLEAN NOT NULL,
-    time_spent INTEGER, -- 答题用时（秒）
-    confidence REAL,    -- 答题信心度（0-1）
-    diagnosis_json TEXT, -- 答题诊断agent返回的多维得分数组（JSON格式）
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users (user_id),
-    FOREIGN KEY (question_id) REFERENCES questions (question_id)
-);
-
--- 表8: 错题表
-CREATE TABLE wrong_questions (
-    wrong_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL,
-    question_id INTEGER NOT NULL,
-    wrong_count INTEGER DEFAULT 1,
-    last_wrong_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-    status TEXT DEFAULT '未掌握', -- '未掌握', '已攻克'
-    FOREIGN KEY (user_id) REFERENCES users (user_id),
-    FOREIGN KEY (question_id) REFERENCES questions (question_id),
-    UNIQUE(user_id, question_id)
-);
-
--- 插入150个学生用户和1个教师用户，用于测试
--- 前20个用户保留具体名字
-INSERT INTO users (username, role) VALUES ('小崔', 'student');
-INSERT INTO users (username, role) VALUES ('小陈', 'student');
-INSERT INTO users (username, role) VALUES ('小李', 'student');
-INSERT INTO users (username, role) VALUES ('小张', 'student');
-INSERT INTO users (username, role) VALUES ('小王', 'student');
-INSERT INTO users (username, role) VALUES ('小赵', 'student');
-INSERT INTO users (username, role) VALUES ('小钱', 'student');
-INSERT INTO users (username, role) VALUES ('小孙', 'student');
-INSERT INTO users (username, role) VALUES ('小周', 'student');
-INSERT INTO users (username, role) VALUES ('小吴', 'student');
-INSERT INTO users (username, role) VALUES ('小郑', 'student');
-INSERT INTO users (username, role) VALUES ('小冯', 'student');
-INSERT INTO users (username, role) VALUES ('小陆', 'student');
-INSERT INTO users (username, role) VALUES ('小丁', 'student');
-INSERT INTO users (username, role) VALUES ('小石', 'student');
-INSERT INTO users (username, role) VALUES ('小田', 'student');
-INSERT INTO users (username, role) VALUES ('小何', 'student');
-INSERT INTO users (username, role) VALUES ('小林', 'student');
-INSERT INTO users (username, role) VALUES ('小徐', 'student');
-INSERT INTO users (username, role) VALUES ('小黄', 'student');
-
--- 后130个用户使用编号形式 (user021 到 user150)
-INSERT INTO users (username, role) VALUES ('user021', 'student');
-INSERT INTO users (username, role) VALUES ('user022', 'student');
-INSERT INTO users (username, role) VALUES ('user023', 'student');
-INSERT INTO users (username, role) VALUES ('user024', 'student');
-INSERT INTO users (username, role) VALUES ('user025', 'student');
-INSERT INTO users (username, role) VALUES ('user026', 'student');
-INSERT INTO users (username, role) VALUES ('user027', 'student');
-INSERT INTO users (username, role) VALUES ('user028', 'student');
-INSERT INTO users (username, role) VALUES ('user029', 'student');
-INSERT INTO users (username, role) VALUES ('user030', 'student');
-INSERT INTO users (username, role) VALUES ('user031', 'student');
-INSERT INTO users (username, role) VALUES ('user032', 'student');
-INSERT INTO users (username, role) VALUES ('user033', 'student');
-INSERT INTO users (username, role) VALUES ('user034', 'student');
-INSERT INTO users (username, role) VALUES ('user035', 'student');
-INSERT INTO users (username, role) VALUES ('user036', 'student');
-INSERT INTO users (username, role) VALUES ('user037', 'student');
-INSERT INTO users (username, role) VALUES ('user038', 'student');
-INSERT INTO users (username, role) VALUES ('user039', 'student');
-INSERT INTO users (username, role) VALUES ('user040', 'student');
-INSERT INTO users (username, role) VALUES ('user041', 'student');
-INSERT INTO users (username, role) VALUES ('user042', 'student');
-INSERT INTO users (username, role) VALUES ('user043', 'student');
-INSERT INTO users (username, role) VALUES ('user044', 'student');
-INSERT INTO users (username, role) VALUES ('user045', 'student');
-INSERT INTO users (username, role) VALUES ('user046', 'student');
-INSERT INTO users (username, role) VALUES ('user047', 'student');
-INSERT INTO users (username, role) VALUES ('user048', 'student');
-INSERT INTO users (username, role) VALUES ('user049', 'student');
-INSERT INTO users (username, role) VALUES ('user050', 'student');
-INSERT INTO users (username, role) VALUES ('user051', 'student');
-INSERT INTO users (username, role) VALUES ('user052', 'student');
-INSERT INTO users (username, role) VALUES ('user053', 'student');
-INSERT INTO users (username, role) VALUES ('user054', 'student');
-INSERT INTO users (username, role) VALUES ('user055', 'student');
-INSERT INTO users (username, role) VALUES ('user056', 'student');
-INSERT INTO users (username, role) VALUES ('user057', 'student');
-INSERT INTO users (username, role) VALUES ('user058', 'student');
-INSERT INTO users (username, role) VALUES ('user059', 'student');
-INSERT INTO users (username, role) VALUES ('user060', 'student');
-INSERT INTO users (username, role) VALUES ('user061', 'student');
-INSERT INTO users (username, role) VALUES ('user062', 'student');
-INSERT INTO users (username, role) VALUES ('user063', 'student');
-INSERT INTO users (username, role) VALUES ('user064', 'student');
-INSERT INTO users (username, role) VALUES ('user065', 'student');
-INSERT INTO users (username, role) VALUES ('user066', 'student');
-INSERT INTO users (username, role) VALUES ('user067', 'student');
-INSERT INTO users (username, role) VALUES ('user068', 'student');
-INSERT INTO users (username, role) VALUES ('user069', 'student');
-INSERT INTO users (username, role) VALUES ('user070', 'student');
-INSERT INTO users (username, role) VALUES ('user071', 'student');
-INSERT INTO users (username, role) VALUES ('user072', 'student');
-INSERT INTO users (username, role) VALUES ('user073', 'student');
-INSERT INTO users (username, role) VALUES ('user074', 'student');
-INSERT INTO users (username, role) VALUES ('user075', 'student');
-INSERT INTO users (username, role) VALUES ('user076', 'student');
-INSERT INTO users (username, role) VALUES ('user077', 'student');
-INSERT INTO users (username, role) VALUES ('user078', 'student');
-INSERT INTO users (username, role) VALUES ('user079', 'student');
-INSERT INTO users (username, role) VALUES ('user080', 'student');
-INSERT INTO users (username, role) VALUES ('user081', 'student');
-INSERT INTO users (username, role) VALUES ('user082', 'student');
-INSERT INTO users (username, role) VALUES ('user083', 'student');
-INSERT INTO users (username, role) VALUES ('user084', 'student');
-INSERT INTO users (username, role) VALUES ('user085', 'student');
-INSERT INTO users (username, role) VALUES ('user086', 'student');
-INSERT INTO users (username, role) VALUES ('user087', 'student');
-INSERT INTO users (username, role) VALUES ('user088', 'student');
-INSERT INTO users (username, role) VALUES ('user089', 'student');
-INSERT INTO users (username, role) VALUES ('user090', 'student');
-INSERT INTO users (username, role) VALUES ('user091', 'student');
-INSERT INTO users (username, role) VALUES ('user092', 'student');
-INSERT INTO users (username, role) VALUES ('user093', 'student');
-INSERT INTO users (username, role) VALUES ('user094', 'student');
-INSERT INTO users (username, role) VALUES ('user095', 'student');
-INSERT INTO users (username, role) VALUES ('user096', 'student');
-INSERT INTO users (username, role) VALUES ('user097', 'student');
-INSERT INTO users (username, role) VALUES ('user098', 'student');
-INSERT INTO users (username, role) VALUES ('user099', 'student');
-INSERT INTO users (username, role) VALUES ('user100', 'student');
-INSERT INTO users (username, role) VALUES ('user101', 'student');
-INSERT INTO users (username, role) VALUES ('user102', 'student');
-INSERT INTO users (username, role) VALUES ('user103', 'student');
-INSERT INTO users (username, role) VALUES ('user104', 'student');
-INSERT INTO users (username, role) VALUES ('user105', 'student');
-INSERT INTO users (username, role) VALUES ('user106', 'student');
-INSERT INTO users (username, role) VALUES ('user107', 'student');
-INSERT INTO users (username, role) VALUES ('user108', 'student');
-INSERT INTO users (username, role) VALUES ('user109', 'student');
-INSERT INTO users (username, role) VALUES ('user110', 'student');
-INSERT INTO users (username, role) VALUES ('user111', 'student');
-INSERT INTO users (username, role) VALUES ('user112', 'student');
-INSERT INTO users (username, role) VALUES ('user113', 'student');
-INSERT INTO users (username, role) VALUES ('user114', 'student');
-INSERT INTO users (username, role) VALUES ('user115', 'student');
-INSERT INTO users (username, role) VALUES ('user116', 'student');
-INSERT INTO users (username, role) VALUES ('user117', 'student');
-INSERT INTO users (username, role) VALUES ('user118', 'student');
-INSERT INTO users (username, role) VALUES ('user119', 'student');
-INSERT INTO users (username, role) VALUES ('user120', 'student');
-INSERT INTO users (username, role) VALUES ('user121', 'student');
-INSERT INTO users (username, role) VALUES ('user122', 'student');
-INSERT INTO users (username, role) VALUES ('user123', 'student');
-INSERT INTO users (username, role) VALUES ('user124', 'student');
-INSERT INTO users (username, role) VALUES ('user125', 'student');
-INSERT INTO users (username, role) VALUES ('user126', 'student');
-INSERT INTO users (username, role) VALUES ('user127', 'student');
-INSERT INTO users (username, role) VALUES ('user128', 'student');
-INSERT INTO users (username, role) VALUES ('user129', 'student');
-INSERT INTO users (username, role) VALUES ('user130', 'student');
-INSERT INTO users (username, role) VALUES ('user131', 'student');
-INSERT INTO users (username, role) VALUES ('user132', 'student');
-INSERT INTO users (username, role) VALUES ('user133', 'student');
-INSERT INTO users (username, role) VALUES ('user134', 'student');
-INSERT INTO users (username, role) VALUES ('user135', 'student');
-INSERT INTO users (username, role) VALUES ('user136', 'student');
-INSERT INTO users (username, role) VALUES ('user137', 'student');
-INSERT INTO users (username, role) VALUES ('user138', 'student');
-INSERT INTO users (username, role) VALUES ('user139', 'student');
-INSERT INTO users (username, role) VALUES ('user140', 'student');
-INSERT INTO users (username, role) VALUES ('user141', 'student');
-INSERT INTO users (username, role) VALUES ('user142', 'student');
-INSERT INTO users (username, role) VALUES ('user143', 'student');
-INSERT INTO users (username, role) VALUES ('user144', 'student');
-INSERT INTO users (username, role) VALUES ('user145', 'student');
-INSERT INTO users (username, role) VALUES ('user146', 'student');
-INSERT INTO users (username, role) VALUES ('user147', 'student');
-INSERT INTO users (username, role) VALUES ('user148', 'student');
-INSERT INTO users (username, role) VALUES ('user149', 'student');
-INSERT INTO users (username, role) VALUES ('user150', 'student');
-
--- 教师用户
-INSERT INTO users (username, role) VALUES ('舵老师', 'teacher');
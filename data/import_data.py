@@ -170,7 +170,7 @@ def insert_question(conn: sqlite3.Connection, question_data: Dict[str, Any],
     return cursor.lastrowid
 
 
-def insert_question_node_mapping(conn: sqlite3.Connection, question_id: int, node_id: str):
+def insert_question_node_mapping(conn: sqlite3.Connection, question_id: int, node_id: int):
     """
     插入题目与知识点的关联关系
     
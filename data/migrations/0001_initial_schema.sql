@@ -0,0 +1,121 @@
+-- ====================================================================
+--            迁移 0001: 初始表结构与测试用户
+-- ====================================================================
+-- 只创建不存在的表、只插入不存在的用户，可以安全地在已有数据的库上执行
+
+-- 表1: 用户表 (增加了role字段)
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    role TEXT NOT NULL DEFAULT 'student' -- 'student' 或 'teacher'
+);
+
+-- 表2: 知识点表 (图的“点”)
+CREATE TABLE IF NOT EXISTS knowledge_nodes (
+    node_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    node_name TEXT NOT NULL,
+    node_difficulty REAL, -- 知识点本身的抽象难度 (0.0 - 1.0)
+    level TEXT,           -- 知识点所属年级
+    node_type TEXT,        -- 知识点类型：概念、章节等
+    node_learning TEXT    -- 知识点的讲解、定义等核心文本
+);
+
+-- 表3: 知识点关系表 (图的“边”) (增加了status和created_by)
+CREATE TABLE IF NOT EXISTS knowledge_edges (
+    edge_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_node_id TEXT NOT NULL,
+    target_node_id TEXT NOT NULL,
+    relation_type TEXT NOT NULL, -- 例如 'is_prerequisite_for'
+    status TEXT NOT NULL DEFAULT 'published', -- 'draft' (AI建议), 'published' (教师确认)
+    created_by INTEGER NOT NULL, -- 关联到users表，记录创建者
+    FOREIGN KEY (source_node_id) REFERENCES knowledge_nodes (node_id),
+    FOREIGN KEY (target_node_id) REFERENCES knowledge_nodes (node_id),
+    FOREIGN KEY (created_by) REFERENCES users (user_id)
+);
+
+-- 表4: 题库表 (增加了图片、状态和创建者)
+CREATE TABLE IF NOT EXISTS questions (
+    question_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_text TEXT NOT NULL,
+    question_image_url TEXT, -- 存储图片路径
+    question_type TEXT,      -- '选择题', '填空题', '解答题'
+    difficulty REAL,         -- 题目的具体难度 (0.0 - 1.0)
+    options TEXT,            -- 对于选择题，存储JSON格式的选项
+    answer TEXT,
+    analysis TEXT,
+    skill_focus TEXT,        -- 题目的技能重点
+    status TEXT NOT NULL DEFAULT 'published', -- 'draft' (AI生成), 'published' (教师发布)
+    created_by INTEGER NOT NULL, -- 关联到users表，记录创建者
+    FOREIGN KEY (created_by) REFERENCES users (user_id)
+);
+
+-- 表5: 题目与知识点关联表
+CREATE TABLE IF NOT EXISTS question_to_node_mapping (
+    mapping_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_id INTEGER NOT NULL,
+    node_id TEXT NOT NULL,
+    FOREIGN KEY (question_id) REFERENCES questions (question_id),
+    FOREIGN KEY (node_id) REFERENCES knowledge_nodes (node_id)
+);
+
+-- 表6: 用户掌握度表
+CREATE TABLE IF NOT EXISTS user_node_mastery (
+    mastery_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    node_id TEXT NOT NULL,
+    mastery_score REAL NOT NULL DEFAULT 0.0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- 掌握度更新时间戳
+    FOREIGN KEY (user_id) REFERENCES users (user_id),
+    FOREIGN KEY (node_id) REFERENCES knowledge_nodes (node_id),
+    UNIQUE(user_id, node_id)
+);
+
+-- 表7: 用户答题记录表
+CREATE TABLE IF NOT EXISTS user_answers (
+    answer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    user_answer TEXT,
+    is_correct BOOLEAN NOT NULL,
+    time_spent INTEGER, -- 答题用时（秒）
+    confidence REAL,    -- 答题信心度（0-1）
+    diagnosis_json TEXT, -- 答题诊断agent返回的多维得分数组（JSON格式）
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (user_id),
+    FOREIGN KEY (question_id) REFERENCES questions (question_id)
+);
+
+-- 表8: 错题表
+CREATE TABLE IF NOT EXISTS wrong_questions (
+    wrong_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    wrong_count INTEGER DEFAULT 1,
+    last_wrong_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+    status TEXT DEFAULT '未掌握', -- '未掌握', '已攻克'
+    FOREIGN KEY (user_id) REFERENCES users (user_id),
+    FOREIGN KEY (question_id) REFERENCES questions (question_id),
+    UNIQUE(user_id, question_id)
+);
+
+-- 150个学生用户和1个教师用户，用于测试
+-- 前20个用户保留具体名字，后130个用户使用编号形式 (user021 到 user150)
+INSERT OR IGNORE INTO users (username, role)
+WITH RECURSIVE seq(n) AS (
+    SELECT 21 UNION ALL SELECT n + 1 FROM seq WHERE n < 150
+),
+named(ord, username, role) AS (
+    VALUES (1, '小崔', 'student'), (2, '小陈', 'student'), (3, '小李', 'student'), (4, '小张', 'student'),
+           (5, '小王', 'student'), (6, '小赵', 'student'), (7, '小钱', 'student'), (8, '小孙', 'student'),
+           (9, '小周', 'student'), (10, '小吴', 'student'), (11, '小郑', 'student'), (12, '小冯', 'student'),
+           (13, '小陆', 'student'), (14, '小丁', 'student'), (15, '小石', 'student'), (16, '小田', 'student'),
+           (17, '小何', 'student'), (18, '小林', 'student'), (19, '小徐', 'student'), (20, '小黄', 'student')
+),
+all_users(ord, username, role) AS (
+    SELECT ord, username, role FROM named
+    UNION ALL
+    SELECT n, printf('user%03d', n), 'student' FROM seq
+    UNION ALL
+    SELECT 151, '舵老师', 'teacher'  -- 教师用户
+)
+SELECT username, role FROM all_users ORDER BY ord;
@@ -0,0 +1,36 @@
+-- ====================================================================
+--            迁移 0002: 热点查询的二级索引
+-- ====================================================================
+-- 每个索引后面注明依赖它的查询，test/test_query_plans.py 会检查这些查询不再全表扫描
+
+-- 近期答题记录、今日统计：WHERE user_id = ? ORDER BY timestamp DESC
+CREATE INDEX IF NOT EXISTS idx_user_answers_user_time
+    ON user_answers (user_id, timestamp);
+
+-- 按知识点取题：WHERE qnm.node_id = ?（覆盖 question_id，无需回表）
+CREATE INDEX IF NOT EXISTS idx_qnm_node_question
+    ON question_to_node_mapping (node_id, question_id);
+
+-- 按题目取知识点：WHERE qnm.question_id = ?（覆盖 node_id，无需回表）
+CREATE INDEX IF NOT EXISTS idx_qnm_question_node
+    ON question_to_node_mapping (question_id, node_id);
+
+-- 模块包含的节点、后续节点：WHERE source_node_id = ? AND relation_type = ?
+CREATE INDEX IF NOT EXISTS idx_edges_source_relation
+    ON knowledge_edges (source_node_id, relation_type, target_node_id);
+
+-- 前置节点：WHERE target_node_id = ? AND relation_type = ?
+CREATE INDEX IF NOT EXISTS idx_edges_target_relation
+    ON knowledge_edges (target_node_id, relation_type, source_node_id);
+
+-- 全量前置关系：WHERE relation_type = '指向'
+CREATE INDEX IF NOT EXISTS idx_edges_relation
+    ON knowledge_edges (relation_type, target_node_id, source_node_id);
+
+-- 错题集：WHERE user_id = ? ORDER BY last_wrong_time DESC
+CREATE INDEX IF NOT EXISTS idx_wrong_questions_user_time
+    ON wrong_questions (user_id, last_wrong_time);
+
+-- 按名称查知识点：WHERE node_name = ?
+CREATE INDEX IF NOT EXISTS idx_knowledge_nodes_name
+    ON knowledge_nodes (node_name);
@@ -0,0 +1,73 @@
+-- ====================================================================
+--            迁移 0003: 知识点外键统一为 INTEGER
+-- ====================================================================
+-- knowledge_nodes.node_id 是 INTEGER，而边、题目映射、掌握度表中的 node_id 是 TEXT。
+-- 两种亲和性混用时，JOIN 条件需要做类型转换，SQLite 无法在 TEXT 列的索引上查找整数。
+-- SQLite 不支持修改列类型，这里按官方推荐的方式重建表：新建 -> 复制 -> 删除旧表 -> 改名。
+
+-- 知识点关系表
+CREATE TABLE knowledge_edges_new (
+    edge_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_node_id INTEGER NOT NULL,
+    target_node_id INTEGER NOT NULL,
+    relation_type TEXT NOT NULL, -- 例如 'is_prerequisite_for'
+    status TEXT NOT NULL DEFAULT 'published', -- 'draft' (AI建议), 'published' (教师确认)
+    created_by INTEGER NOT NULL, -- 关联到users表，记录创建者
+    FOREIGN KEY (source_node_id) REFERENCES knowledge_nodes (node_id),
+    FOREIGN KEY (target_node_id) REFERENCES knowledge_nodes (node_id),
+    FOREIGN KEY (created_by) REFERENCES users (user_id)
+);
+INSERT INTO knowledge_edges_new (edge_id, source_node_id, target_node_id, relation_type, status, created_by)
+SELECT edge_id, CAST(source_node_id AS INTEGER), CAST(target_node_id AS INTEGER), relation_type, status, created_by
+FROM knowledge_edges;
+DROP TABLE knowledge_edges;
+ALTER TABLE knowledge_edges_new RENAME TO knowledge_edges;
+
+CREATE INDEX idx_edges_source_relation
+    ON knowledge_edges (source_node_id, relation_type, target_node_id);
+CREATE INDEX idx_edges_target_relation
+    ON knowledge_edges (target_node_id, relation_type, source_node_id);
+CREATE INDEX idx_edges_relation
+    ON knowledge_edges (relation_type, target_node_id, source_node_id);
+
+-- 题目与知识点关联表
+CREATE TABLE question_to_node_mapping_new (
+    mapping_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_id INTEGER NOT NULL,
+    node_id INTEGER NOT NULL,
+    FOREIGN KEY (question_id) REFERENCES questions (question_id),
+    FOREIGN KEY (node_id) REFERENCES knowledge_nodes (node_id)
+);
+INSERT INTO question_to_node_mapping_new (mapping_id, question_id, node_id)
+SELECT mapping_id, question_id, CAST(node_id AS INTEGER)
+FROM question_to_node_mapping;
+DROP TABLE question_to_node_mapping;
+ALTER TABLE question_to_node_mapping_new RENAME TO question_to_node_mapping;
+
+CREATE INDEX idx_qnm_node_question
+    ON question_to_node_mapping (node_id, question_id);
+CREATE INDEX idx_qnm_question_node
+    ON question_to_node_mapping (question_id, node_id);
+
+-- 用户掌握度表
+CREATE TABLE user_node_mastery_new (
+    mastery_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    node_id INTEGER NOT NULL,
+    mastery_score REAL NOT NULL DEFAULT 0.0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- 掌握度更新时间戳
+    FOREIGN KEY (user_id) REFERENCES users (user_id),
+    FOREIGN KEY (node_id) REFERENCES knowledge_nodes (node_id),
+    UNIQUE(user_id, node_id)
+);
+-- 旧数据中 '12' 与 '12.0' 之类的写法 CAST 后会落到同一行，保留最近更新的一条
+INSERT INTO user_node_mastery_new (mastery_id, user_id, node_id, mastery_score, updated_at)
+SELECT mastery_id, user_id, CAST(node_id AS INTEGER), mastery_score, updated_at
+FROM user_node_mastery
+WHERE true
+ON CONFLICT(user_id, node_id) DO UPDATE SET
+    mastery_score = excluded.mastery_score,
+    updated_at = excluded.updated_at
+WHERE excluded.updated_at >= user_node_mastery_new.updated_at;
+DROP TABLE user_node_mastery;
+ALTER TABLE user_node_mastery_new RENAME TO user_node_mastery;
@@ -0,0 +1,19 @@
+-- ====================================================================
+--            迁移 0004: 答题记录归档支持
+-- ====================================================================
+-- 超过保留期的答题记录按月移入 data/archive/ 下的归档库（见 backend/archive_answers.py），
+-- 热表只保留近期数据。归档时按学生、按天汇总写入 user_answer_daily_rollup，
+-- 正确率、学习天数等全量统计 = 热表 + 汇总表，不需要打开归档库。
+
+CREATE TABLE IF NOT EXISTS user_answer_daily_rollup (
+    user_id INTEGER NOT NULL,
+    day TEXT NOT NULL,                      -- YYYY-MM-DD
+    answer_count INTEGER NOT NULL DEFAULT 0,
+    correct_count INTEGER NOT NULL DEFAULT 0,
+    total_time_spent INTEGER NOT NULL DEFAULT 0, -- 秒
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID;
+
+-- 归档任务按时间分批挑选旧记录：WHERE timestamp < ? ORDER BY timestamp
+CREATE INDEX IF NOT EXISTS idx_user_answers_time
+    ON user_answers (timestamp);
@@ -0,0 +1,17 @@
+-- ====================================================================
+--            迁移 0005: 诊断结果缓存
+-- ====================================================================
+-- 同一道题的相同答案（归一化后）直接复用上一次AI诊断的结果，不再调用工作流。
+-- question_hash 是题干与标准答案的摘要，题目被修改后旧结果自动失效；
+-- 教师通过 /teacher/question/update 修改题目时也会删除该题的缓存。
+-- 内存中的一级缓存见 backend/api/common/diagnosis_cache.py。
+
+CREATE TABLE IF NOT EXISTS diagnosis_cache (
+    question_id INTEGER NOT NULL,
+    answer_key TEXT NOT NULL,               -- 归一化后的学生答案
+    question_hash TEXT NOT NULL,
+    result_json TEXT NOT NULL,              -- {is_correct, reason, scores}
+    llm_ms REAL NOT NULL DEFAULT 0,         -- 生成该结果时AI诊断的耗时
+    created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+    PRIMARY KEY (question_id, answer_key)
+) WITHOUT ROWID;
@@ -0,0 +1,23 @@
+-- ====================================================================
+--            迁移 0006: 异步诊断任务
+-- ====================================================================
+-- POST /student/diagnose/?mode=job 先把原始作答写入本表再返回任务ID，
+-- 后台工作协程完成诊断和答题记录写入后回填结果；服务重启时重新排队未完成的任务。
+-- 见 backend/api/student/diagnosis_jobs.py。
+
+CREATE TABLE IF NOT EXISTS diagnosis_jobs (
+    job_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    payload_json TEXT NOT NULL,             -- 原始诊断请求
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued / running / done / failed
+    result_json TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+    started_at TEXT,
+    finished_at TEXT
+) WITHOUT ROWID;
+
+-- 启动时恢复未完成的任务、清理过期任务
+CREATE INDEX IF NOT EXISTS idx_diagnosis_jobs_status_created
+    ON diagnosis_jobs (status, created_at);
@@ -0,0 +1,16 @@
+-- ====================================================================
+--            迁移 0007: 待复核的初步诊断
+-- ====================================================================
+-- AI诊断熔断或调用失败时，诊断接口先用本地启发式给出初步结果（diagnosis_json 中 provisional=true），
+-- 答题记录照常写入，同时在本表登记；后台复核协程在熔断器关闭后重新调用AI诊断，
+-- 更新答题记录并按新旧结果的差值修正掌握度，完成后删除登记。
+-- 本表按学生分片（见 backend/api/common/sharding.py 的 SHARD_TABLES），answer_id 与同库的 user_answers 对应。
+
+CREATE TABLE IF NOT EXISTS provisional_answers (
+    answer_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,  -- 复核失败次数
+    last_error TEXT,
+    created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
@@ -0,0 +1,16 @@
+-- ====================================================================
+--            迁移 0008: 提交接口的幂等键
+-- ====================================================================
+-- /student/diagnose 与 /student/diagnose/image 带 Idempotency-Key 请求头时，
+-- 结果与答题记录在同一个事务中写入本表，重复提交直接返回保存的结果。
+-- 本表按学生分片（见 backend/api/common/sharding.py 的 SHARD_TABLES）。见 backend/api/common/idempotency.py。
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,          -- 接口，如 diagnose / diagnose_image
+    idem_key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,   -- 请求内容指纹，防止同一个键被用于不同的请求
+    response_json TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, scope, idem_key)
+) WITHOUT ROWID;
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+迁移 0009: 答题记录的维度评分表
+
+诊断结果写入答题记录时同时拆成 user_answer_scores 行（每个关联知识点、每个维度一行），
+学生画像的各维度平均分改为一次 SQL 聚合，不再逐条解析 diagnosis_json。
+本迁移建表并为已有答题记录回填。
+本表按学生分片（见 backend/api/common/sharding.py 的 SHARD_TABLES），分片在建表时调用本文件的 backfill_scores() 回填。
+
+回填逻辑是 backend/api/common/answer_scores.py 在本迁移发布时的冻结副本，
+之后应用代码怎么改都不影响本迁移的结果；不要改成导入应用代码。
+"""
+
+import json
+
+# 每批处理的答题记录数
+BACKFILL_BATCH_SIZE = 500
+
+
+def _dimension_scores(diagnosis_result):
+    """从诊断结果中提取 [(维度中文名, 分数), ...]，兼容 scores 与旧的 assessment_dimensions 两种格式"""
+    if not isinstance(diagnosis_result, dict):
+        return []
+    rows = []
+    if "assessment_dimensions" in diagnosis_result:
+        for dim in diagnosis_result["assessment_dimensions"] or []:
+            if isinstance(dim, dict) and isinstance(dim.get("dimension"), str) \
+                    and isinstance(dim.get("score"), (int, float)):
+                rows.append((dim["dimension"].split(" ")[0], dim["score"]))
+    elif "scores" in diagnosis_result:
+        for item in diagnosis_result["scores"] or []:
+            if not isinstance(item, dict) or not isinstance(item.get("score"), (int, float)):
+                continue
+            for key, chinese_name in item.items():
+                if key not in ("score", "feedback") and isinstance(chinese_name, str):
+                    rows.append((chinese_name.split(" ")[0], item["score"]))
+                    break
+    return rows
+
+
+def backfill_scores(conn, batch_size=BACKFILL_BATCH_SIZE):
+    """按 answer_id 分批为已有答题记录补写维度评分，返回处理的记录数"""
+    last_id = 0
+    total = 0
+    while True:
+        rows = conn.execute("""
+            SELECT answer_id, question_id, diagnosis_json FROM user_answers
+            WHERE answer_id > ? AND diagnosis_json IS NOT NULL
+            ORDER BY answer_id
+            LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            return total
+        scores = []
+        for answer_id, question_id, diagnosis_json in rows:
+            try:
+                diagnosis_result = json.loads(diagnosis_json)
+            except (TypeError, ValueError):
+                continue
+            scores.extend((answer_id, dimension, score, question_id)
+                          for dimension, score in _dimension_scores(diagnosis_result))
+        # 同一次诊断出现重复维度时保留最后一个
+        conn.executemany("""
+            INSERT OR REPLACE INTO user_answer_scores (answer_id, node_id, dimension, score)
+            SELECT ?, node_id, ?, ? FROM question_to_node_mapping WHERE question_id = ?
+        """, scores)
+        last_id = rows[-1][0]
+        total += len(rows)
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_answer_scores (
+            answer_id INTEGER NOT NULL,   -- 同库 user_answers.answer_id
+            node_id INTEGER NOT NULL,     -- 题目关联的知识点
+            dimension TEXT NOT NULL,      -- 维度中文名称，如 知识掌握
+            score REAL NOT NULL,
+            PRIMARY KEY (answer_id, node_id, dimension)
+        ) WITHOUT ROWID
+    """)
+    backfill_scores(conn)
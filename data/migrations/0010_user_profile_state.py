@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+迁移 0010: 学生画像的增量状态
+
+诊断写入答题记录时同步维护最近窗口内按知识点的作答计数和维度分数和，
+GET /student/recommendation/profile/{user_id} 直接读取，不再每次从 user_answers 重新聚合。
+本迁移建表并为已有答题记录重建画像状态（依赖 0009 的 user_answer_scores）。
+这些表按学生分片（见 backend/api/common/sharding.py 的 SHARD_TABLES），分片在建表时调用本文件的 rebuild_profiles() 重建。
+
+重建逻辑是 backend/api/common/profile_state.py 在本迁移发布时的冻结副本（改写为按表整体计算的SQL），
+之后应用代码怎么改都不影响本迁移的结果；不要改成导入应用代码。
+"""
+
+import os
+
+# 窗口大小是部署配置，与应用读取同一个环境变量，否则重建的状态与增量维护的口径不一致
+PROFILE_WINDOW_SIZE = int(os.environ.get("PROFILE_WINDOW_SIZE", "30"))
+
+
+def rebuild_profiles(conn, window_size=PROFILE_WINDOW_SIZE):
+    """丢弃所有学生的画像状态，从 user_answers 重新计算，返回处理的学生数"""
+    for table in ("user_profile_window", "user_profile_state", "user_profile_dimensions"):
+        conn.execute(f"DELETE FROM {table}")
+    # 每个学生最近 window_size 条"答题 × 知识点"记录
+    conn.execute("""
+        INSERT INTO user_profile_window (user_id, answer_id, node_id, is_correct)
+        SELECT user_id, answer_id, node_id, is_correct FROM (
+            SELECT ua.user_id, ua.answer_id, qnm.node_id,
+                   CASE WHEN ua.is_correct THEN 1 ELSE 0 END AS is_correct,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY ua.user_id ORDER BY ua.answer_id DESC, qnm.node_id DESC
+                   ) AS position
+            FROM user_answers AS ua
+            JOIN question_to_node_mapping AS qnm ON qnm.question_id = ua.question_id
+            JOIN knowledge_nodes AS kn ON kn.node_id = qnm.node_id
+        )
+        WHERE position <= ?
+    """, (window_size,))
+    conn.execute("""
+        INSERT INTO user_profile_state (user_id, node_id, interaction_count, correct_count, last_answer_id)
+        SELECT user_id, node_id, COUNT(*), SUM(is_correct), MAX(answer_id)
+        FROM user_profile_window
+        GROUP BY user_id, node_id
+    """)
+    conn.execute("""
+        INSERT INTO user_profile_dimensions (user_id, node_id, dimension, score_sum, score_count)
+        SELECT w.user_id, w.node_id, s.dimension, SUM(s.score), COUNT(*)
+        FROM user_profile_window AS w
+        JOIN user_answer_scores AS s ON s.answer_id = w.answer_id AND s.node_id = w.node_id
+        GROUP BY w.user_id, w.node_id, s.dimension
+    """)
+    return conn.execute("SELECT COUNT(DISTINCT user_id) FROM user_answers").fetchone()[0]
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_profile_window (
+            user_id INTEGER NOT NULL,
+            answer_id INTEGER NOT NULL,   -- 同库 user_answers.answer_id
+            node_id INTEGER NOT NULL,
+            is_correct INTEGER NOT NULL,
+            PRIMARY KEY (user_id, answer_id, node_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_profile_window_answer ON user_profile_window(answer_id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_profile_state (
+            user_id INTEGER NOT NULL,
+            node_id INTEGER NOT NULL,
+            interaction_count INTEGER NOT NULL,  -- 窗口内该知识点的作答次数
+            correct_count INTEGER NOT NULL,
+            last_answer_id INTEGER NOT NULL,     -- 窗口内该知识点最近一次作答，画像按它倒序排列
+            PRIMARY KEY (user_id, node_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_profile_dimensions (
+            user_id INTEGER NOT NULL,
+            node_id INTEGER NOT NULL,
+            dimension TEXT NOT NULL,
+            score_sum REAL NOT NULL,
+            score_count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, node_id, dimension)
+        ) WITHOUT ROWID
+    """)
+    rebuild_profiles(conn)
@@ -0,0 +1,87 @@
+-- ====================================================================
+--            迁移 0011: 预计算的学习任务包缓存
+-- ====================================================================
+-- 学生每次诊断写入后，后台预先生成下一个学习任务包写入 mission_cache，
+-- GET /student/recommendation/{user_id} 直接返回缓存。缓存记录生成时的掌握度指纹和目录版本，
+-- 任一变化即视为过期。mission_cache 按学生分片（见 backend/api/common/sharding.py 的 SHARD_TABLES）。
+-- catalog_version 在目录库中，知识点、关系、题目、映射的任何写入（教师端编辑、目录同步、导入）
+-- 都由触发器递增版本号。见 backend/api/student/recommendations/mission_cache.py。
+
+CREATE TABLE IF NOT EXISTS mission_cache (
+    user_id INTEGER PRIMARY KEY,
+    package_json TEXT NOT NULL,
+    mastery_fingerprint TEXT NOT NULL,  -- 生成时该学生 user_node_mastery 的摘要
+    catalog_version INTEGER NOT NULL,   -- 生成时的 catalog_version.version
+    generated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);
+
+-- 目录表的任何写入都递增版本号
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_knowledge_nodes_insert
+AFTER INSERT ON knowledge_nodes
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_knowledge_nodes_update
+AFTER UPDATE ON knowledge_nodes
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_knowledge_nodes_delete
+AFTER DELETE ON knowledge_nodes
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_knowledge_edges_insert
+AFTER INSERT ON knowledge_edges
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_knowledge_edges_update
+AFTER UPDATE ON knowledge_edges
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_knowledge_edges_delete
+AFTER DELETE ON knowledge_edges
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_questions_insert
+AFTER INSERT ON questions
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_questions_update
+AFTER UPDATE ON questions
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_questions_delete
+AFTER DELETE ON questions
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_question_to_node_mapping_insert
+AFTER INSERT ON question_to_node_mapping
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_question_to_node_mapping_update
+AFTER UPDATE ON question_to_node_mapping
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_catalog_version_question_to_node_mapping_delete
+AFTER DELETE ON question_to_node_mapping
+BEGIN
+    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+END;
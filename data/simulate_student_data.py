@@ -20,7 +20,7 @@ def generate_personas():
     weaknesses = ["knowledge", "calculation", "logic", None]
     weakness_weights = [0.3, 0.3, 0.3, 0.1]  # 各种弱点的分布权重
     
-    # 前20个用户的具体名字，与create_tables.sql保持一致
+    # 前20个用户的具体名字，与 migrations/0001_initial_schema.sql 保持一致
     specific_names = [
         "小崔", "小陈", "小李", "小张", "小王", "小赵", "小钱", "小孙", "小周", "小吴",
         "小郑", "小冯", "小陆", "小丁", "小石", "小田", "小何", "小林", "小徐", "小黄"
@@ -155,19 +155,17 @@ def get_next_learnable_node_in_module(cursor, user_id, module_name, all_nodes, p
     # 在模块内寻找可学习的节点
     learnable_candidates = []
     for node_id in module_nodes:
-        node_id_str = str(node_id)
         # 如果节点未掌握，并且它的所有前置知识都已掌握
-        prerequisites = prereq_map.get(node_id_str, set())
-        if user_mastery.get(node_id_str, 0.0) < 0.8 and prerequisites.issubset(mastered_nodes):
-            if node_id_str in all_nodes:
-                learnable_candidates.append(all_nodes[node_id_str])
+        prerequisites = prereq_map.get(node_id, set())
+        if user_mastery.get(node_id, 0.0) < 0.8 and prerequisites.issubset(mastered_nodes):
+            if node_id in all_nodes:
+                learnable_candidates.append(all_nodes[node_id])
     
     # 如果没有找到可学习的节点，选择模块内第一个未掌握的节点（可能是循环依赖的情况）
     if not learnable_candidates:
         for node_id in module_nodes:
-            node_id_str = str(node_id)
-            if user_mastery.get(node_id_str, 0.0) < 0.8 and node_id_str in all_nodes:
-                learnable_candidates.append(all_nodes[node_id_str])
+            if user_mastery.get(node_id, 0.0) < 0.8 and node_id in all_nodes:
+                learnable_candidates.append(all_nodes[node_id])
                 break
     
     if not learnable_candidates:
@@ -230,14 +228,14 @@ def simulate_user_learning():
 
         # --- 1. 预加载所有需要的静态数据到内存 ---
         print("\n--- 正在预加载知识图谱和题库 ---")
-        all_nodes = {str(row['node_id']): dict(row) for row in cursor.execute("SELECT * FROM knowledge_nodes").fetchall()}
+        all_nodes = {row['node_id']: dict(row) for row in cursor.execute("SELECT * FROM knowledge_nodes").fetchall()}
         
         # 构建节点间的依赖关系图（仅针对模块内的节点）
         prereq_map = defaultdict(set)
         all_edges = cursor.execute("SELECT source_node_id, target_node_id, relation_type FROM knowledge_edges").fetchall()
         
         for edge in all_edges:
-            source_id, target_id, rel_type = str(edge['source_node_id']), str(edge['target_node_id']), edge['relation_type']
+            source_id, target_id, rel_type = edge['source_node_id'], edge['target_node_id'], edge['relation_type']
             
             # 只处理节点间的指向关系（不包括模块的包含关系）
             if rel_type == '指向':
@@ -248,7 +246,7 @@ def simulate_user_learning():
         # 构建节点到题目的映射
         node_to_questions_map = defaultdict(list)
         for row in cursor.execute("SELECT q.question_id, q.difficulty, qnm.node_id FROM questions q JOIN question_to_node_mapping qnm ON q.question_id = qnm.question_id").fetchall():
-            node_to_questions_map[str(row['node_id'])].append(dict(row))
+            node_to_questions_map[row['node_id']].append(dict(row))
         
         users = cursor.execute("SELECT user_id, username FROM users WHERE role = 'student'").fetchall()
 
@@ -290,7 +288,7 @@ def simulate_user_learning():
                     print(f"\n  🎓 {username} 已完成所有模块的学习！模拟结束。(共切换了{node_switch_count}个节点)")
                     break
                 
-                available_questions = node_to_questions_map.get(str(target_node['node_id']))
+                available_questions = node_to_questions_map.get(target_node['node_id'])
                 if not available_questions:
                     print(f"  ⚠️ 节点 {target_node['node_id']} 没有关联的题目，跳过")
                     continue
@@ -309,10 +307,18 @@ def simulate_user_learning():
                     "INSERT INTO user_answers (user_id, question_id, user_answer, is_correct, time_spent, confidence, diagnosis_json) VALUES (?, ?, ?, ?, ?, ?, ?)",
                     (user_id, question_id, "模拟答案", is_correct, random.randint(30, 300), random.uniform(0.3, 1.0), diagnosis_json_str)
                 )
+                # 同步写入维度评分（与 backend/api/common/answer_scores.py 一致，每个关联知识点一份）
+                answer_id = cursor.lastrowid
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO user_answer_scores (answer_id, node_id, dimension, score) "
+                    "SELECT ?, node_id, ?, ? FROM question_to_node_mapping WHERE question_id = ?",
+                    [(answer_id, dim["dimension"], dim["score"], question_id)
+                     for dim in json.loads(diagnosis_json_str)["assessment_dimensions"]]
+                )
 
                 # 更新掌握度
-                node_id_str = str(target_node['node_id'])
-                cursor.execute("SELECT mastery_score FROM user_node_mastery WHERE user_id = ? AND node_id = ?", (user_id, node_id_str))
+                node_id = target_node['node_id']
+                cursor.execute("SELECT mastery_score FROM user_node_mastery WHERE user_id = ? AND node_id = ?", (user_id, node_id))
                 current_mastery_row = cursor.fetchone()
                 current_mastery = current_mastery_row['mastery_score'] if current_mastery_row else 0.0
                 
@@ -330,14 +336,14 @@ def simulate_user_learning():
                 
                 # 更新或插入掌握度记录
                 if current_mastery_row:
-                    cursor.execute("UPDATE user_node_mastery SET mastery_score = ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ? AND node_id = ?", (new_mastery, user_id, node_id_str))
+                    cursor.execute("UPDATE user_node_mastery SET mastery_score = ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ? AND node_id = ?", (new_mastery, user_id, node_id))
                 else:
-                    cursor.execute("INSERT INTO user_node_mastery (user_id, node_id, mastery_score, updated_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)", (user_id, node_id_str, new_mastery))
+                    cursor.execute("INSERT INTO user_node_mastery (user_id, node_id, mastery_score, updated_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)", (user_id, node_id, new_mastery))
                 
                 # # 详细的掌握度变化日志
                 # if interaction_num % 10 == 0 or new_mastery >= 0.8:
                 #     result_emoji = "✅" if is_correct else "❌"
-                #     print(f"  {result_emoji} 节点{node_id_str}: {current_mastery:.3f} -> {new_mastery:.3f} (题目难度: {question_difficulty:.2f})")
+                #     print(f"  {result_emoji} 节点{node_id}: {current_mastery:.3f} -> {new_mastery:.3f} (题目难度: {question_difficulty:.2f})")
                 
                 # 记录错题
                 if not is_correct:
@@ -350,6 +356,7 @@ def simulate_user_learning():
 
         print("\n🎉 模块化学习轨迹模拟完成！")
         print("📊 数据已成功写入数据库，可以开始体验智能推荐系统了。")
+        print("👤 请运行 make profiles 重建学生画像状态（make all 会自动执行）。")
 
     except Exception as e:
         print(f"❌ 模拟过程中发生错误: {e}")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录数据同步工具（替代 scp 覆盖整个数据库文件）
+
+- snapshot: 用在线备份 API 生成本地数据库的一致性快照，后端运行中也可以执行
+- push:     只把上次同步之后变化的知识点、关系、题目、映射推送到服务器，
+            服务器在一个事务里应用，无需重启，学生数据不受影响
+
+上次成功推送的快照保存在 snapshots/last_synced.db，作为下次增量比较的基线。
+
+用法:
+    python3 sync_catalog.py snapshot
+    python3 sync_catalog.py push --server http://101.201.28.39:8000
+    python3 sync_catalog.py push --server http://101.201.28.39:8000 --full     # 全量同步
+    python3 sync_catalog.py push --server http://101.201.28.39:8000 --dry-run  # 只统计变更
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+
+import requests
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DATA_DIR, '..', 'backend'))
+
+from api.common.catalog_sync import build_changeset, changeset_size, snapshot
+
+DB_FILE = os.path.join(DATA_DIR, "my_database.db")
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+LAST_SYNCED = os.path.join(SNAPSHOT_DIR, "last_synced.db")
+PENDING = os.path.join(SNAPSHOT_DIR, "pending.db")
+
+
+def cmd_snapshot(args):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    target = args.out or os.path.join(SNAPSHOT_DIR, f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
+    snapshot(args.db, target)
+    print(f"✅ 快照已生成: {target}")
+    return True
+
+
+def cmd_push(args):
+    token = args.token or os.environ.get("CATALOG_SYNC_TOKEN", "")
+    if not token and not args.dry_run:
+        print("❌ 请通过 --token 或环境变量 CATALOG_SYNC_TOKEN 提供同步令牌")
+        return False
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    print(f"📸 生成本地快照: {args.db}")
+    snapshot(args.db, PENDING)
+
+    base = None if args.full or not os.path.exists(LAST_SYNCED) else LAST_SYNCED
+    changeset = build_changeset(PENDING, base)
+    rows = changeset_size(changeset)
+    print(f"📦 {'全量' if changeset['full'] else '增量'}变更集: {rows} 行")
+    for table, change in changeset["tables"].items():
+        print(f"    - {table}: 新增/修改 {len(change['upserts'])}，删除 {len(change['deletes'])}")
+
+    if args.dry_run:
+        return True
+    if rows == 0 and not changeset["full"]:
+        print("ℹ️  目录没有变化，无需同步")
+        return True
+
+    body = gzip.compress(json.dumps(changeset, ensure_ascii=False).encode("utf-8"))
+    print(f"🚀 推送到 {args.server}（{len(body) / 1024:.1f} KB）...")
+    try:
+        response = requests.post(
+            f"{args.server.rstrip('/')}/catalog/sync",
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "Content-Encoding": "gzip",
+                "X-Sync-Token": token,
+            },
+            timeout=120,
+        )
+    except requests.RequestException as e:
+        print(f"❌ 连接服务器失败: {e}")
+        return False
+
+    if response.status_code == 409:
+        print(f"❌ 服务器拒绝了变更集: {response.json().get('detail')}")
+        print("   如果服务器上的目录被单独修改过，请使用 --full 做一次全量同步")
+        return False
+    if response.status_code != 200:
+        print(f"❌ 同步失败 ({response.status_code}): {response.text}")
+        return False
+
+    # 服务器已应用，本次快照成为下一次增量的基线
+    os.replace(PENDING, LAST_SYNCED)
+    print("✅ 目录同步成功，服务器无需重启")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="目录数据快照与增量同步")
+    parser.add_argument("--db", default=DB_FILE, help="本地数据库文件")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="生成一致性快照")
+    snapshot_parser.add_argument("--out", help="快照文件路径")
+
+    push_parser = subparsers.add_parser("push", help="增量推送目录数据到服务器")
+    push_parser.add_argument("--server", required=True, help="后端地址，例如 http://101.201.28.39:8000")
+    push_parser.add_argument("--token", help="同步令牌（默认读取 CATALOG_SYNC_TOKEN）")
+    push_parser.add_argument("--full", action="store_true", help="忽略基线，全量同步")
+    push_parser.add_argument("--dry-run", action="store_true", help="只统计变更，不推送")
+
+    args = parser.parse_args()
+    handler = cmd_snapshot if args.command == "snapshot" else cmd_push
+    sys.exit(0 if handler(args) else 1)
@@ -7,6 +7,7 @@
 
 import streamlit as st
 import random
+import uuid
 from typing import Dict, List, Any, Optional, Callable
 
 class QuestionPracticeComponent:
@@ -488,10 +489,63 @@ class QuestionPracticeComponent:
                     st.session_state[f'submit_success_{question_id}'] = False
                     if f'diagnosis_result_{question_id}' in st.session_state:
                         del st.session_state[f'diagnosis_result_{question_id}']
+                    # 重新提交视为新的一次作答，使用新的幂等键
+                    st.session_state.pop(f'submission_key_{question_id}', None)
                     st.rerun()
         
         return {'answer': answer, 'button_states': button_states}
     
+    def get_submission_key(self, question_id: Any, answer: Any) -> str:
+        """获取本次提交的幂等键
+        
+        页面重跑导致同一道题、同样的答案再次提交时复用同一个键，后端直接返回第一次的诊断结果；
+        答案变化时生成新键。
+        
+        Args:
+            question_id: 题目ID
+            answer: 文本答案或上传的图片文件
+        """
+        if hasattr(answer, 'read') and hasattr(answer, 'name'):
+            signature = f"image:{answer.name}:{getattr(answer, 'size', '')}"
+        else:
+            signature = f"text:{answer}"
+        state_key = f'submission_key_{question_id}'
+        saved = st.session_state.get(state_key)
+        if not saved or saved[0] != signature:
+            saved = (signature, uuid.uuid4().hex)
+            st.session_state[state_key] = saved
+        return saved[1]
+    
+    def stream_diagnosis(self, question_id: Any, answer: str) -> Dict[str, Any]:
+        """流式提交文本答案，AI生成理由的同时实时显示
+        
+        Args:
+            question_id: 题目ID
+            answer: 文本答案
+            
+        Returns:
+            最终诊断结果；失败时返回 {"error": 原因}
+        """
+        placeholder = st.empty()
+        reason = ""
+        for event, data in self.api_service.diagnose_answer_stream(
+            user_id=str(self.user_id),
+            question_id=str(question_id),
+            answer=str(answer),
+            idempotency_key=self.get_submission_key(question_id, answer)
+        ):
+            if event == "token":
+                reason += data.get("text", "")
+                placeholder.info(f"🤖 {reason}▌")
+            elif event == "result":
+                placeholder.empty()
+                return data
+            elif event == "error":
+                placeholder.empty()
+                return {"error": data.get("detail", "诊断失败")}
+        placeholder.empty()
+        return {"error": "诊断连接中断"}
+    
     def _default_submit_handler(self, question: Dict[str, Any], answer: Any) -> None:
         """默认的提交处理函数"""
         question_id = question.get('question_id', question.get('id', 'unknown'))
@@ -519,7 +573,8 @@ class QuestionPracticeComponent:
                     diagnosis = self.api_service.diagnose_image_answer(
                         user_id=str(self.user_id),
                         question_id=str(question_id),
-                        image_file=answer  # 传递文件对象
+                        image_file=answer,  # 传递文件对象
+                        idempotency_key=self.get_submission_key(question_id, answer)
                     )
                     
                     if "error" not in diagnosis:
@@ -539,12 +594,7 @@ class QuestionPracticeComponent:
             # 文本答案处理
             with st.spinner("🤖 AI正在分析你的答案..."):
                 try:
-                    diagnosis = self.api_service.diagnose_answer(
-                        user_id=str(self.user_id),
-                        question_id=str(question_id),
-                        answer=str(answer),
-                        answer_type="text"
-                    )
+                    diagnosis = self.stream_diagnosis(question_id, answer)
                     
                     if "error" not in diagnosis:
                         # 将诊断结果存储到session_state中
@@ -256,7 +256,8 @@ def render_free_practice_page(api_service, current_user, user_id):
                             diagnosis_result = api_service.diagnose_image_answer(
                                 user_id=str(user_id),
                                 question_id=str(question_id),
-                                image_file=answer
+                                image_file=answer,
+                                idempotency_key=question_component.get_submission_key(question_id, answer)
                             )
                             
                             if "error" not in diagnosis_result:
@@ -272,12 +273,7 @@ def render_free_practice_page(api_service, current_user, user_id):
                     with st.spinner("🔍 正在诊断你的答案..."):
                         try:
                             question_id = current_question.get('question_id', st.session_state.selected_question_index + 1) if isinstance(current_question, dict) else st.session_state.selected_question_index + 1
-                            diagnosis_result = api_service.diagnose_answer(
-                                user_id=str(user_id),
-                                question_id=str(question_id),
-                                answer=str(answer),
-                                answer_type="text"
-                            )
+                            diagnosis_result = question_component.stream_diagnosis(question_id, answer)
                             
                             if "error" not in diagnosis_result:
                                 st.success("✅ 提交成功！")
@@ -184,7 +184,9 @@ def render_recommended_tasks_page(api_service, current_user, user_id):
         # 调用API获取推荐
         try:
             with st.spinner("正在生成个性化任务推荐..."):
-                recommendation = api_service.get_recommendation(user_id)
+                # "换个任务"时跳过后端缓存的任务包
+                refresh = st.session_state.pop('refresh_recommendation', False)
+                recommendation = api_service.get_recommendation(user_id, refresh=refresh)
                 st.session_state.current_recommendation = recommendation
                 st.session_state.loading_recommendation = False
         except Exception as e:
@@ -269,6 +271,8 @@ def render_recommended_tasks_page(api_service, current_user, user_id):
                 </div>
             </div>
             """, unsafe_allow_html=True)
+            if recommendation.get('generated_at'):
+                st.caption(f"🕒 任务包生成于 {recommendation['generated_at'][:19].replace('T', ' ')}")
             
             # 任务内容展示
             render_mission_content(mission_type, payload, api_service, user_id)
@@ -313,6 +317,7 @@ def render_recommended_tasks_page(api_service, current_user, user_id):
                     st.session_state.current_recommendation = None
                     st.session_state.task_started = False
                     st.session_state.loading_recommendation = False
+                    st.session_state.refresh_recommendation = True
                     st.rerun()
                 
                 st.markdown("<div style='margin: 15px 0;'></div>", unsafe_allow_html=True)
@@ -96,10 +96,11 @@ class APIService:
             return []
     
     # 学习推荐
-    def get_recommendation(self, user_id: str) -> Dict[str, Any]:
-        """获取用户推荐"""
-        print(f"[API调用] get_recommendation(user_id={user_id})")
-        return self._make_request("GET", f"/student/recommendation/{user_id}")
+    def get_recommendation(self, user_id: str, refresh: bool = False) -> Dict[str, Any]:
+        """获取用户推荐（后端优先返回预先生成的任务包，refresh=True 时重新生成）"""
+        print(f"[API调用] get_recommendation(user_id={user_id}, refresh={refresh})")
+        params = {"refresh": "true"} if refresh else None
+        return self._make_request("GET", f"/student/recommendation/{user_id}", params=params)
     
     def get_user_profile(self, user_id: str) -> Dict[str, Any]:
         """获取用户画像数据"""
@@ -109,8 +110,9 @@ class APIService:
     # 答案诊断
     def diagnose_answer(self, user_id: str, question_id: str, answer: str, 
                        answer_type: str = "text", time_spent: Optional[int] = None, 
-                       confidence: Optional[float] = None) -> Dict[str, Any]:
-        """诊断答案"""
+                       confidence: Optional[float] = None,
+                       idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """诊断答案（idempotency_key 相同的重复提交由后端返回同一次诊断结果）"""
         print(f"[API调用] diagnose_answer(user_id={user_id}, question_id={question_id}, answer={answer}, answer_type={answer_type}, time_spent={time_spent}, confidence={confidence})")
         data = {
             "user_id": user_id,
@@ -123,12 +125,50 @@ class APIService:
         if confidence is not None:
             data["confidence"] = str(confidence)
         
-        return self._make_request("POST", "/student/diagnose", json=data)
-    
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        return self._make_request("POST", "/student/diagnose", json=data, headers=headers)
+
+    def diagnose_answer_stream(self, user_id: str, question_id: str, answer: str,
+                               idempotency_key: Optional[str] = None):
+        """流式诊断答案，逐个产出 (事件名, 数据)：token 为理由片段，result 为最终诊断结果，error 为失败原因"""
+        print(f"[API调用] diagnose_answer_stream(user_id={user_id}, question_id={question_id}, answer={answer})")
+        data = {
+            "user_id": user_id,
+            "question_id": question_id,
+            "answer": answer,
+            "answer_type": "text"
+        }
+        headers = {"Accept": "text/event-stream"}
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        try:
+            with self.session.post(f"{self.base_url}/student/diagnose/stream", json=data,
+                                   headers=headers, stream=True, timeout=(3, 90)) as response:
+                response.raise_for_status()
+                event = "message"
+                for raw in response.iter_lines():
+                    line = raw.decode("utf-8")
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        yield event, json.loads(line[5:].strip())
+                        event = "message"
+        except requests.exceptions.RequestException as e:
+            yield "error", {"detail": str(e)}
+
+    def diagnose_batch(self, user_id: str, answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """批量诊断一个学习任务的作答，answers 中每项包含 question_id、answer，可选 time_spent、confidence"""
+        print(f"[API调用] diagnose_batch(user_id={user_id}, answers={len(answers)}道)")
+        return self._make_request("POST", "/student/diagnose/batch", json={
+            "user_id": user_id,
+            "answers": answers
+        })
+
     def diagnose_image_answer(self, user_id: str, question_id: str, 
                             image_file, time_spent: Optional[int] = None, 
-                            confidence: Optional[float] = None) -> Dict[str, Any]:
-        """诊断图片答案"""
+                            confidence: Optional[float] = None,
+                            idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """诊断图片答案（idempotency_key 相同的重复提交由后端返回同一次诊断结果）"""
         print(f"[API调用] diagnose_image_answer(user_id={user_id}, question_id={question_id}, image_file={image_file}, time_spent={time_spent}, confidence={confidence})")
         try:
             # 构造 multipart/form-data
@@ -156,7 +196,8 @@ class APIService:
             # 使用临时session避免默认JSON header
             temp_session = requests.Session()
             temp_session.timeout = 10
-            response = temp_session.post(url, files=files, data=data)
+            headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+            response = temp_session.post(url, files=files, data=data, headers=headers)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -502,7 +543,7 @@ class APIService:
                 '/teacher/question/node-mapping',
                 json={
                     'question_id': int(question_id),
-                    'node_id': str(node_id)
+                    'node_id': int(node_id)
                 }
             )
             return response
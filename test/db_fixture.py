@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试用临时数据库
+连接池、分片路由和写者队列都是进程级单例，原先各测试在导入前设置环境变量 DB_PATH，
+同一进程里运行多个测试文件（pytest test/）时只有第一个生效，其余测试会写到 data/my_database.db。
+temp_database() 在临时目录里建库并迁移，把这些单例切换到该文件，退出时恢复原来的路径。
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common import database, sharding, write_queue
+from api.common.migrations import migrate_path
+
+
+def _reset_singletons():
+    """关闭并丢弃进程级连接池、分片路由和并发信号量，下次使用时按当前 DB_PATH 重新创建"""
+    if database._pool is not None:
+        database._pool.close_all()
+        database._pool = None
+    # 信号量在发生争用时绑定到当时的事件循环，每个测试的 asyncio.run() 都是新的循环
+    database._semaphore = None
+    if sharding._router is not None:
+        sharding._router.close_all()
+        sharding._router = None
+    # 写者队列由各测试在事件循环内 shutdown_writer() 关闭，这里只丢弃残留的引用
+    write_queue._writers.clear()
+
+
+@contextlib.contextmanager
+def temp_database(target=None):
+    """在临时目录中创建并迁移数据库，期间连接池和写者队列都使用它；返回数据库路径"""
+    previous = database.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        migrate_path(db_path, target=target, verbose=False)
+        _reset_singletons()
+        database.DB_PATH = db_path
+        try:
+            yield db_path
+        finally:
+            _reset_singletons()
+            database.DB_PATH = previous
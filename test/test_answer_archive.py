@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+答题记录归档测试
+旧记录按月移入归档库，热表只保留近期记录；日汇总保证全量统计不变；
+历史视图能同时查到热表和归档库中的记录。
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common.answer_archive import archive_dir_for, archive_old_answers, history_connection, list_archives
+from api.common.migrations import migrate_path
+
+
+def _insert_answers(db_path):
+    conn = sqlite3.connect(db_path)
+    now = datetime.now()
+    rows = []
+    for days_ago in (400, 380, 370, 200, 10, 1):
+        timestamp = now - timedelta(days=days_ago)
+        # 两种时间格式都会出现：isoformat（诊断接口）和 CURRENT_TIMESTAMP 格式
+        rows.append((1, 1, "A", days_ago % 2, 30, timestamp.isoformat()))
+        rows.append((2, 1, "B", 1, 60, timestamp.strftime("%Y-%m-%d %H:%M:%S")))
+    conn.executemany("""
+        INSERT INTO user_answers (user_id, question_id, user_answer, is_correct, time_spent, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+
+
+def _totals(conn, user_id):
+    hot = conn.execute("""
+        SELECT COUNT(*), SUM(is_correct) FROM user_answers WHERE user_id = ?
+    """, (user_id,)).fetchone()
+    rolled = conn.execute("""
+        SELECT COALESCE(SUM(answer_count), 0), COALESCE(SUM(correct_count), 0)
+        FROM user_answer_daily_rollup WHERE user_id = ?
+    """, (user_id,)).fetchone()
+    return hot[0] + rolled[0], (hot[1] or 0) + rolled[1]
+
+
+def test_archive_old_answers():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        archive_root = os.path.join(tmp, "archive")
+        migrate_path(db_path, verbose=False)
+        _insert_answers(db_path)
+
+        conn = sqlite3.connect(db_path)
+        before = _totals(conn, 1)
+        conn.close()
+
+        moved = archive_old_answers(db_path, horizon_days=180, batch_size=3, pause_ms=0,
+                                    archive_root=archive_root, verbose=False)
+        assert moved == 8
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM user_answers").fetchone()[0] == 4
+        assert _totals(conn, 1) == before
+        conn.close()
+
+        archives = list_archives(archive_dir_for(db_path, archive_root))
+        assert 3 <= len(archives) <= 4
+
+        # 重复执行不会再移动任何记录
+        assert archive_old_answers(db_path, horizon_days=180, pause_ms=0,
+                                   archive_root=archive_root, verbose=False) == 0
+
+        history = history_connection(db_path, archive_root=archive_root)
+        assert history.execute("SELECT COUNT(*) FROM user_answers_all").fetchone()[0] == 12
+        history.close()
+
+
+if __name__ == "__main__":
+    print("🧪 测试答题记录归档...")
+    print("=" * 40)
+    test_archive_old_answers()
+    print("✅ 旧记录已归档，统计结果不变")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+维度评分表测试
+迁移 0009 为已有答题记录回填 user_answer_scores（兼容 scores 与 assessment_dimensions 两种格式，
+无法解析的 diagnosis_json 跳过）；新写入和复核更正同步维度评分；按知识点聚合的平均分与逐条解析一致。
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common.answer_scores import dimension_scores, replace_scores, save_scores
+from api.common.migrations import migrate_path
+
+NEW_FORMAT = {"is_correct": True, "reason": "", "scores": [
+    {"Knowledge Mastery": "知识掌握", "score": 0.8, "feedback": "好"},
+    {"Logical Reasoning": "解题逻辑 (推理)", "score": 0.6, "feedback": "一般"},
+]}
+OLD_FORMAT = {"is_correct": False, "assessment_dimensions": [
+    {"dimension": "知识掌握", "score": 0.4},
+    {"dimension": "解题逻辑 (推理)", "score": 0.2},
+]}
+
+
+def test_dimension_scores():
+    assert dimension_scores(NEW_FORMAT) == [("知识掌握", 0.8), ("解题逻辑", 0.6)]
+    assert dimension_scores(OLD_FORMAT) == [("知识掌握", 0.4), ("解题逻辑", 0.2)]
+    assert dimension_scores({"is_correct": True, "scores": []}) == []
+    assert dimension_scores(None) == []
+
+
+def test_backfill_and_sync():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        migrate_path(db_path, target=8, verbose=False)
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO knowledge_nodes (node_id, node_name) VALUES (1, '随机事件'), (2, '条件概率')")
+        conn.execute("""
+            INSERT INTO questions (question_id, question_text, question_type, difficulty, answer, analysis, created_by)
+            VALUES (1, '题目1', '解答题', 0.5, '0.5', '', 1)
+        """)
+        conn.execute("INSERT INTO question_to_node_mapping (question_id, node_id) VALUES (1, 1), (1, 2)")
+        for diagnosis_json in (json.dumps(NEW_FORMAT), json.dumps(OLD_FORMAT), "不是JSON", None):
+            conn.execute("""
+                INSERT INTO user_answers (user_id, question_id, user_answer, is_correct, diagnosis_json)
+                VALUES (7, 1, '答案', 0, ?)
+            """, (diagnosis_json,))
+        conn.commit()
+        conn.close()
+
+        migrate_path(db_path, verbose=False)
+        conn = sqlite3.connect(db_path)
+        # 两条可解析的记录 × 两个知识点 × 两个维度
+        assert conn.execute("SELECT COUNT(*) FROM user_answer_scores").fetchone()[0] == 8
+        averages = dict(conn.execute("""
+            SELECT dimension, ROUND(AVG(score), 2) FROM user_answer_scores
+            WHERE node_id = 1 GROUP BY dimension
+        """).fetchall())
+        assert averages == {"知识掌握": 0.6, "解题逻辑": 0.4}
+
+        # 复核更正时重写该记录的评分，新写入的记录同步写入
+        replace_scores(conn, 2, 1, NEW_FORMAT)
+        save_scores(conn, [(3, 1, OLD_FORMAT)])
+        conn.commit()
+        rows = conn.execute("""
+            SELECT answer_id, dimension, score FROM user_answer_scores
+            WHERE node_id = 2 ORDER BY answer_id, dimension
+        """).fetchall()
+        assert rows == [(1, "知识掌握", 0.8), (1, "解题逻辑", 0.6),
+                        (2, "知识掌握", 0.8), (2, "解题逻辑", 0.6),
+                        (3, "知识掌握", 0.4), (3, "解题逻辑", 0.2)]
+        conn.close()
+
+
+if __name__ == "__main__":
+    print("🧪 测试维度评分表...")
+    print("=" * 40)
+    test_dimension_scores()
+    test_backfill_and_sync()
+    print("✅ 维度评分回填与同步写入正常")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录同步测试
+本地改动知识点和题目后，增量变更集只包含变化的行，应用到服务器库后两边目录一致，
+服务器上的学生数据保持不变；基线不一致时拒绝应用。
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common.catalog_sync import (
+    CatalogSyncError,
+    apply_changeset,
+    build_changeset,
+    changeset_size,
+    fingerprint,
+    snapshot,
+)
+from api.common.migrations import migrate_path
+
+
+def _open(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _seed(conn):
+    conn.execute("INSERT INTO knowledge_nodes (node_id, node_name, level) VALUES (1, '随机事件', '概率'), (2, '条件概率', '概率')")
+    conn.execute("""
+        INSERT INTO questions (question_id, question_text, question_type, difficulty, answer, analysis, created_by)
+        VALUES (1, '题目1', '选择题', 0.3, 'A', '解析1', 151), (2, '题目2', '填空题', 0.6, '0.5', '解析2', 151)
+    """)
+    conn.execute("INSERT INTO question_to_node_mapping (question_id, node_id) VALUES (1, 1), (2, 2)")
+
+
+def test_incremental_sync():
+    with tempfile.TemporaryDirectory() as tmp:
+        local_path = os.path.join(tmp, "local.db")
+        server_path = os.path.join(tmp, "server.db")
+        base_path = os.path.join(tmp, "base.db")
+        new_path = os.path.join(tmp, "new.db")
+        for path in (local_path, server_path):
+            migrate_path(path, verbose=False)
+
+        local = _open(local_path)
+        _seed(local)
+        server = _open(server_path)
+        server.execute("INSERT INTO user_answers (user_id, question_id, user_answer, is_correct) VALUES (1, 1, 'A', 1)")
+
+        # 首次全量同步
+        snapshot(local_path, base_path)
+        apply_changeset(server, build_changeset(base_path))
+        assert fingerprint(server) == fingerprint(local)
+
+        # 本地修改一道题、删除一个映射、新增一个知识点
+        local.execute("UPDATE questions SET difficulty = 0.4 WHERE question_id = 1")
+        local.execute("DELETE FROM question_to_node_mapping WHERE question_id = 2")
+        local.execute("INSERT INTO knowledge_nodes (node_id, node_name, level) VALUES (3, '全概率公式', '概率')")
+        snapshot(local_path, new_path)
+
+        changeset = build_changeset(new_path, base_path)
+        assert not changeset["full"]
+        assert changeset_size(changeset) == 3
+        apply_changeset(server, changeset)
+        assert fingerprint(server) == fingerprint(local)
+        assert server.execute("SELECT COUNT(*) FROM user_answers").fetchone()[0] == 1
+
+        # 服务器目录与基线不一致时拒绝，且不做任何修改
+        server.execute("UPDATE knowledge_nodes SET node_name = '改名' WHERE node_id = 1")
+        before = fingerprint(server)
+        try:
+            apply_changeset(server, changeset)
+            assert False, "基线不一致时应拒绝应用"
+        except CatalogSyncError:
+            pass
+        assert fingerprint(server) == before
+
+        local.close()
+        server.close()
+
+
+if __name__ == "__main__":
+    print("🧪 测试目录同步...")
+    print("=" * 40)
+    test_incremental_sync()
+    print("✅ 增量同步后目录一致，学生数据不受影响")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+熔断与初步诊断复核测试
+失败率或 P95 耗时超限时熔断器打开，打开期间直接拒绝，到时放行一个探测调用；
+主观题能给出带 provisional 标记的初步诊断；熔断器关闭后复核协程更正答题记录，
+并按新旧结果的差值修正掌握度和错题记录。
+"""
+
+import asyncio
+import json
+import sqlite3
+
+from db_fixture import temp_database
+
+from api.common.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from api.common.database import shutdown_executor
+from api.common.write_queue import shutdown_writer
+from api.student.grading import provisional_grade
+from api.student.mastery import INITIAL_MASTERY, apply_answers, mastery_delta
+from api.student.rediagnosis import RediagnosisQueue, register_provisional
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _fail():
+    raise RuntimeError("服务不可用")
+
+
+async def _ok():
+    return "ok"
+
+
+def test_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", window=10, min_calls=4, error_rate=0.5, open_s=30, clock=clock)
+
+    async def run():
+        assert await breaker.call(_ok) == "ok"
+        for _ in range(3):
+            try:
+                await breaker.call(_fail)
+            except RuntimeError:
+                pass
+        assert breaker.state == OPEN
+        try:
+            await breaker.call(_ok)
+            assert False, "熔断期间应直接拒绝"
+        except CircuitOpen:
+            pass
+
+        clock.now = 31
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() and not breaker.allow()  # 只放行一个探测调用
+        breaker.record(True, 10)
+        assert breaker.state == CLOSED
+
+        # 全部成功但 P95 耗时超限同样熔断
+        slow = CircuitBreaker("slow", min_calls=3, latency_p95_ms=1000, clock=clock)
+        for _ in range(3):
+            slow.record(True, 5000)
+        assert slow.state == OPEN
+
+    asyncio.run(run())
+
+
+def test_provisional_grade():
+    result = provisional_grade("解答题", "P(A)=0.3×0.5=0.15", "P(A)=0.15")
+    assert result["provisional"] and result["is_correct"]
+    result = provisional_grade("解答题", "P(A)=0.15", "不会")
+    assert result["provisional"] and not result["is_correct"]
+    assert provisional_grade("选择题", "B", "b")["provisional"]
+
+
+def test_rediagnosis():
+    with temp_database() as db_path:
+        _check_rediagnosis(db_path)
+
+
+def _check_rediagnosis(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO knowledge_nodes (node_id, node_name) VALUES (1, '条件概率')")
+    conn.execute("""
+        INSERT INTO questions (question_id, question_text, question_type, difficulty, answer, analysis, created_by)
+        VALUES (1, '题目1', '解答题', 0.5, '0.15', '', 1)
+    """)
+    conn.execute("INSERT INTO question_to_node_mapping (question_id, node_id) VALUES (1, 1)")
+    provisional = provisional_grade("解答题", "0.15", "不会")
+    cursor = conn.execute("""
+        INSERT INTO user_answers (user_id, question_id, user_answer, is_correct, diagnosis_json)
+        VALUES (7, 1, '不会', 0, ?)
+    """, (json.dumps(provisional, ensure_ascii=False),))
+    register_provisional(conn, cursor.lastrowid, 7, 1)
+    apply_answers(conn, 7, [(1, provisional)])
+    conn.commit()
+
+    final = {"is_correct": True, "reason": "复核正确", "scores": []}
+    breaker = CircuitBreaker("rediagnosis", clock=FakeClock())
+    calls = []
+
+    async def handler(question_id, user_answer):
+        calls.append((question_id, user_answer))
+        return await breaker.call(lambda: asyncio.sleep(0, final))
+
+    async def run():
+        queue = RediagnosisQueue(breaker, handler)
+        try:
+            breaker._open("测试")
+            assert await queue.run_once() == 0 and not calls  # 熔断期间不复核
+            breaker._close()
+            assert await queue.run_once() == 1
+            assert await queue.run_once() == 0
+        finally:
+            await shutdown_writer()
+            shutdown_executor()
+
+    asyncio.run(run())
+    assert calls == [(1, "不会")]
+    is_correct, diagnosis_json = conn.execute("SELECT is_correct, diagnosis_json FROM user_answers").fetchone()
+    assert is_correct == 1 and not json.loads(diagnosis_json).get("provisional")
+    assert conn.execute("SELECT COUNT(*) FROM provisional_answers").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM wrong_questions").fetchone()[0] == 0
+    score = conn.execute("SELECT mastery_score FROM user_node_mastery WHERE user_id = 7").fetchone()[0]
+    assert abs(score - (INITIAL_MASTERY + mastery_delta(final, 0.5))) < 1e-9
+    conn.close()
+
+
+if __name__ == "__main__":
+    print("🧪 测试熔断与初步诊断复核...")
+    print("=" * 40)
+    test_breaker()
+    test_provisional_grade()
+    test_rediagnosis()
+    print("✅ 熔断、初步诊断与复核修正正常")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接池测试
+连接池耗尽时，线程中的调用等待其他线程归还连接；事件循环线程上的调用立即失败，不阻塞事件循环；
+数据库线程池占满时，run_db 的调用排队等待而不是失败。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from db_fixture import temp_database
+
+from api.common import database
+from api.common.database import ConnectionPool, PoolTimeoutError, get_pool, run_db, shutdown_executor
+
+
+def test_exhausted_pool_on_event_loop_fails_fast():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "test.db"), size=1, timeout=5)
+        held = pool.acquire()
+
+        async def borrow():
+            start = time.perf_counter()
+            try:
+                pool.acquire()
+            except PoolTimeoutError:
+                return time.perf_counter() - start
+            raise AssertionError("事件循环线程上不应借到连接")
+
+        assert asyncio.run(borrow()) < 1
+
+        # 线程中的调用照常等待归还
+        threading.Timer(0.1, held.close).start()
+        conn = pool.acquire()
+        conn.close()
+        assert pool.stats()["in_use"] == 0
+        pool.close_all()
+
+
+def test_run_db_queues_when_executor_saturated():
+    release = threading.Event()
+
+    def hold(conn):
+        conn.execute("SELECT 1")
+        release.wait(5)
+
+    async def run():
+        try:
+            holders = [asyncio.ensure_future(run_db(hold)) for _ in range(database.DB_MAX_CONCURRENCY)]
+            await asyncio.sleep(0.1)
+            assert get_pool().stats()["in_use"] == database.DB_MAX_CONCURRENCY
+            waiting = asyncio.ensure_future(run_db(lambda conn: conn.execute("SELECT 1").fetchone()[0]))
+            await asyncio.sleep(0.1)
+            assert not waiting.done()
+            release.set()
+            assert await waiting == 1
+            await asyncio.gather(*holders)
+        finally:
+            release.set()
+            shutdown_executor()
+
+    with temp_database():
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("🧪 测试连接池...")
+    print("=" * 40)
+    test_exhausted_pool_on_event_loop_fails_fast()
+    test_run_db_queues_when_executor_saturated()
+    print("✅ 事件循环线程上连接池耗尽时立即失败，线程池占满时 run_db 排队等待")
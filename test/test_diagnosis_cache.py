@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+诊断缓存测试
+相同题目、归一化后相同的答案命中缓存；内存层清空后从数据库层命中；
+题目内容变化或被教师修改后不再命中。
+"""
+
+import asyncio
+
+from db_fixture import temp_database
+
+from api.common import diagnosis_cache, metrics
+from api.common.database import get_db_connection, shutdown_executor
+from api.common.write_queue import shutdown_writer
+
+RESULT = {"is_correct": True, "reason": "选项正确", "scores": []}
+
+
+def test_normalize_answer():
+    assert diagnosis_cache.normalize_answer(" Ｂ。") == "b"
+    assert diagnosis_cache.normalize_answer("x = 1 / 2") == "x=1/2"
+
+
+def test_two_tiers_and_invalidation():
+    metrics.reset()
+
+    async def run():
+        try:
+            assert await diagnosis_cache.lookup(1, "题干", "B", "b") is None
+            await diagnosis_cache.store(1, "题干", "B", "b", RESULT, 1500)
+
+            # 内存层命中
+            assert await diagnosis_cache.lookup(1, "题干", "B", " B ") == RESULT
+            # 换一个进程（清空内存层）后从数据库层命中
+            diagnosis_cache._memory = diagnosis_cache.MemoryTier()
+            assert await diagnosis_cache.lookup(1, "题干", "B", "B。") == RESULT
+            # 标准答案变化后不命中
+            assert await diagnosis_cache.lookup(1, "题干", "C", "b") is None
+
+            # 教师修改题目时清理
+            conn = get_db_connection()
+            diagnosis_cache.invalidate_question(conn, 1)
+            conn.commit()
+            conn.close()
+            assert await diagnosis_cache.lookup(1, "题干", "B", "b") is None
+        finally:
+            await shutdown_writer()
+            shutdown_executor()
+
+    with temp_database():
+        asyncio.run(run())
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["diagnosis_cache.hits{tier=memory}"] == 1
+    assert snapshot["counters"]["diagnosis_cache.hits{tier=db}"] == 1
+    assert snapshot["counters"]["diagnosis_cache.misses"] == 3
+    assert snapshot["timings"]["diagnosis_cache.saved_ms"]["total"] == 3000
+
+
+if __name__ == "__main__":
+    print("🧪 测试诊断缓存...")
+    print("=" * 40)
+    test_normalize_answer()
+    test_two_tiers_and_invalidation()
+    print("✅ 两级缓存命中与失效正常")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步诊断任务测试
+提交后立即返回任务ID，工作协程完成后结果可查询；失败原因被记录；
+SSE 事件流以 result 事件结束；重启后未完成的任务重新排队，已写入答题记录的任务按任务ID幂等键不重复写入。
+"""
+
+import asyncio
+
+from db_fixture import temp_database
+
+from api.common import idempotency, metrics
+from api.common.database import shutdown_executor
+from api.common.write_queue import shutdown_writer, submit_user_write, submit_write
+from api.student.diagnosis_jobs import DiagnosisJobPool, _insert_job, _start_job
+
+
+async def _handler(job_id, payload):
+    await asyncio.sleep(0.01)
+    if payload["answer"] == "boom":
+        raise ValueError("模拟诊断失败")
+    return {"is_correct": payload["answer"] == "A", "reason": "", "scores": []}
+
+
+async def _guarded_handler(job_id, payload, runs):
+    """与 diagnosis.py 相同：以任务ID为幂等键，结果与答题记录同一个写意图保存"""
+    async def diagnose():
+        runs.append(job_id)
+        result = {"is_correct": True, "reason": "", "scores": []}
+        await submit_user_write(payload["user_id"], idempotency.record, payload["user_id"], "diagnose_job_run",
+                                job_id, "hash", result)
+        return result
+    return await idempotency.run_once(payload["user_id"], "diagnose_job_run", job_id, "hash", diagnose)
+
+
+def test_jobs():
+    metrics.reset()
+
+    async def run():
+        pool = DiagnosisJobPool(_handler, workers=2, queue_size=10)
+        try:
+            ok_id = await pool.submit({"user_id": 1, "question_id": 1, "answer": "A"})
+            bad_id = await pool.submit({"user_id": 1, "question_id": 2, "answer": "boom"})
+            assert (await pool.get(ok_id))["status"] in ("queued", "running", "done")
+
+            events = [chunk async for chunk in pool.events(ok_id)]
+            assert events[-1].startswith("event: result")
+            job = await pool.get(ok_id)
+            assert job["status"] == "done" and job["result"]["is_correct"] is True
+
+            await pool._queue.join()
+            failed = await pool.get(bad_id)
+            assert failed["status"] == "failed" and "模拟诊断失败" in failed["error"]
+            assert await pool.get("missing") is None
+        finally:
+            await pool.close()
+
+        # 模拟上次进程退出时留下的未完成任务
+        await submit_write(_insert_job, "left-over", 1, 3, '{"user_id": 1, "question_id": 3, "answer": "A"}')
+        restarted = DiagnosisJobPool(_handler, workers=1, queue_size=10)
+        try:
+            await restarted.start()
+            await restarted._queue.join()
+            assert (await restarted.get("left-over"))["status"] == "done"
+        finally:
+            await restarted.close()
+
+        # 上次进程已写入答题记录但没来得及标记完成的任务：重新执行时不再诊断和写入
+        runs = []
+        await submit_write(_insert_job, "written", 1, 4, '{"user_id": 1, "question_id": 4, "answer": "A"}')
+        await submit_write(_start_job, "written")
+        await submit_user_write(1, idempotency.record, 1, "diagnose_job_run", "written", "hash",
+                                {"is_correct": True, "reason": "已保存", "scores": []})
+        guarded = DiagnosisJobPool(lambda job_id, payload: _guarded_handler(job_id, payload, runs),
+                                   workers=1, queue_size=10)
+        try:
+            await guarded.start()
+            await guarded._queue.join()
+            job = await guarded.get("written")
+            assert job["status"] == "done" and job["result"]["reason"] == "已保存" and runs == []
+        finally:
+            await guarded.close()
+            await shutdown_writer()
+            shutdown_executor()
+
+    with temp_database():
+        asyncio.run(run())
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["diagnosis.jobs.completed"] == 3
+    assert snapshot["counters"]["diagnosis.jobs.failed"] == 1
+    assert snapshot["timings"]["diagnosis.jobs.wait_ms"]["count"] == 4
+
+
+if __name__ == "__main__":
+    print("🧪 测试异步诊断任务...")
+    print("=" * 40)
+    test_jobs()
+    print("✅ 任务提交、查询、SSE 和重启恢复（不重复写入）正常")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+诊断写入路径测试
+诊断请求中的 user_id、question_id 都是字符串；经单写者队列保存诊断结果后，
+答题记录、维度评分和画像状态都应写入，且画像状态与重新计算的结果一致（check_profile 为空）。
+"""
+
+import asyncio
+import sqlite3
+
+from db_fixture import temp_database
+
+from api.common.database import shutdown_executor
+from api.common.profile_state import check_profile
+from api.common.write_queue import shutdown_writer, submit_user_write
+from api.student.diagnosis import DiagnosisRequest, _save_text_diagnosis
+
+RESULT = {"is_correct": True, "reason": "", "scores": [{"Knowledge Mastery": "知识掌握", "score": 0.8}]}
+
+
+def _setup(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO knowledge_nodes (node_id, node_name) VALUES (1, '随机事件'), (2, '条件概率')")
+    conn.execute("""
+        INSERT INTO questions (question_id, question_text, question_type, difficulty, answer, analysis, created_by)
+        VALUES (1, '题目1', '解答题', 0.5, '', '', 1)
+    """)
+    conn.execute("INSERT INTO question_to_node_mapping (question_id, node_id) VALUES (1, 1), (1, 2)")
+    conn.commit()
+    conn.close()
+
+
+def test_string_ids_reach_profile():
+    async def run():
+        request = DiagnosisRequest(user_id="7", question_id="1", answer="0.5")
+        try:
+            await submit_user_write(request.user_id, _save_text_diagnosis, request, RESULT)
+        finally:
+            await shutdown_writer()
+            shutdown_executor()
+
+    with temp_database() as db_path:
+        _setup(db_path)
+        asyncio.run(run())
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("""
+                SELECT node_id, interaction_count, correct_count FROM user_profile_state
+                WHERE user_id = 7 ORDER BY node_id
+            """).fetchall()
+            assert rows == [(1, 1, 1), (2, 1, 1)]
+            assert check_profile(conn, 7) == []
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    print("🧪 测试诊断写入路径...")
+    print("=" * 40)
+    test_string_ids_reach_profile()
+    print("✅ 字符串题目ID的诊断结果计入画像状态")
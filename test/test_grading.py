@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+客观题本地判分测试
+选择题按选项字母比较，填空题按数值/符号等价比较，无法确定时交给AI（返回None）。
+"""
+
+import os
+import sys
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.student.grading import grade
+
+
+def _verdict(question_type, key, answer, options=None):
+    result = grade(question_type, key, answer, options)
+    return None if result is None else result["is_correct"]
+
+
+def test_choice():
+    assert _verdict("选择题", "B", "B. 0.5") is True
+    assert _verdict("选择题", "B", " ｂ ") is True
+    assert _verdict("选择题", "A、C", "C,A") is True
+    assert _verdict("选择题", "A", "C") is False
+    assert _verdict("选择题", "B", "一半", '{"A": "0.3", "B": "一半"}') is True
+    assert _verdict("选择题", "B", "我觉得是第二个") is None
+
+
+def test_fill_in():
+    assert _verdict("填空题", "1/2", "0.5") is True
+    assert _verdict("填空题", "$\\frac{1}{3}$", "0.333") is True
+    assert _verdict("填空题", "1/3", "0.3") is False
+    assert _verdict("填空题", "0.25", "P(A)=1/4") is True
+    assert _verdict("填空题", "50%", "0.5") is True
+    assert _verdict("填空题", "\\sqrt{2}/2", "0.7071") is True
+    assert _verdict("填空题", "0.2; 0.3", "0.2，0.4") is False
+    assert _verdict("填空题", "相互独立", "独立") is None
+
+
+def test_result_shape():
+    result = grade("选择题", "A", "A")
+    assert set(result) == {"is_correct", "reason", "scores"}
+    assert [list(item)[0] for item in result["scores"]] == [
+        "Knowledge Mastery", "Logical Reasoning", "Calculation Accuracy", "Behavioral Performance"]
+    assert grade("解答题", "1", "1") is None
+
+
+if __name__ == "__main__":
+    print("🧪 测试客观题本地判分...")
+    print("=" * 40)
+    test_choice()
+    test_fill_in()
+    test_result_shape()
+    print("✅ 本地判分结果正确")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+幂等键测试
+同一个键的并发重复请求只执行一次处理函数并共享结果；完成后的重复请求从表中返回保存的结果；
+同一个键用于不同内容的请求时报冲突；处理失败不保存结果，重试会重新执行。
+"""
+
+import asyncio
+
+from db_fixture import temp_database
+
+from api.common import idempotency, metrics
+from api.common.database import shutdown_executor
+from api.common.write_queue import shutdown_writer, submit_user_write
+
+
+def test_run_once():
+    metrics.reset()
+    calls = []
+
+    def _save(conn, user_id, key, request_hash, result):
+        # 业务写入与幂等记录在同一个写意图中
+        idempotency.record(conn, user_id, "diagnose", key, request_hash, result)
+
+    async def handler(answer, fail=False):
+        calls.append(answer)
+        await asyncio.sleep(0.05)
+        if fail:
+            raise RuntimeError("诊断失败")
+        result = {"is_correct": answer == "0.5", "reason": "", "scores": []}
+        await submit_user_write(7, _save, 7, "k1", idempotency.fingerprint(1, answer), result)
+        return result
+
+    async def run():
+        request_hash = idempotency.fingerprint(1, "0.5")
+        try:
+            first, second = await asyncio.gather(
+                idempotency.run_once(7, "diagnose", "k1", request_hash, lambda: handler("0.5")),
+                idempotency.run_once(7, "diagnose", "k1", request_hash, lambda: handler("0.5")),
+            )
+            assert first == second and calls == ["0.5"]
+
+            replayed = await idempotency.run_once(7, "diagnose", "k1", request_hash, lambda: handler("0.5"))
+            assert replayed == first and calls == ["0.5"]
+
+            try:
+                await idempotency.run_once(7, "diagnose", "k1", idempotency.fingerprint(1, "0.6"),
+                                           lambda: handler("0.6"))
+                assert False, "同一个键用于不同内容应报冲突"
+            except idempotency.IdempotencyConflict:
+                pass
+
+            for _ in range(2):
+                try:
+                    await idempotency.run_once(7, "diagnose", "k2", request_hash, lambda: handler("x", fail=True))
+                except RuntimeError:
+                    pass
+            assert calls == ["0.5", "x", "x"]
+
+            # 不带键时每次都执行
+            await idempotency.run_once(7, "diagnose", None, request_hash, lambda: asyncio.sleep(0, {}))
+        finally:
+            await shutdown_writer()
+            shutdown_executor()
+
+    with temp_database():
+        asyncio.run(run())
+    counters = metrics.snapshot()["counters"]
+    assert counters["idempotency.coalesced{scope=diagnose}"] == 1
+    assert counters["idempotency.replayed{scope=diagnose}"] == 1
+
+
+if __name__ == "__main__":
+    print("🧪 测试幂等键...")
+    print("=" * 40)
+    test_run_once()
+    print("✅ 并发合并、结果回放与冲突检测正常")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM调度器测试
+名额满时按优先级放行；排队超限、超时时丢弃，总排队满时高优先级挤掉低优先级；
+学生令牌桶限制单个学生的调用频率；其他线程的事件循环同样可以排队和被放行。
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common import metrics
+from api.common.llm_scheduler import (BATCH, INTERACTIVE, RECOMMENDATION, TEACHER, LLMScheduler, LLMShed,
+                                      current_caller, llm_caller)
+
+WAITS = {INTERACTIVE: 5, RECOMMENDATION: 5, TEACHER: 5, BATCH: 5}
+LIMITS = {INTERACTIVE: 10, RECOMMENDATION: 10, TEACHER: 10, BATCH: 10}
+
+
+def test_priority_order():
+    scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS, max_wait_s=WAITS, user_rate_per_min=0)
+    order = []
+
+    async def call(priority, label):
+        await scheduler.acquire(priority)
+        order.append(label)
+        await asyncio.sleep(0.01)
+        scheduler.release()
+
+    async def run():
+        await scheduler.acquire(INTERACTIVE)  # 占住唯一的名额
+        tasks = [asyncio.create_task(call(priority, label)) for priority, label in
+                 ((BATCH, "batch"), (TEACHER, "teacher"), (RECOMMENDATION, "rec"), (INTERACTIVE, "diag"))]
+        await asyncio.sleep(0.01)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["diag", "rec", "teacher", "batch"]
+    assert scheduler.stats() == {"active": 0, "queued": {p: 0 for p in (INTERACTIVE, RECOMMENDATION, TEACHER, BATCH)}}
+
+
+def test_shedding():
+    metrics.reset()
+    scheduler = LLMScheduler(max_concurrency=1, queue_limit=2, queue_limits={**LIMITS, TEACHER: 1},
+                             max_wait_s={**WAITS, RECOMMENDATION: 0.05}, user_rate_per_min=0)
+
+    async def run():
+        await scheduler.acquire(INTERACTIVE)
+        batch = asyncio.create_task(scheduler.acquire(BATCH))
+        teacher = asyncio.create_task(scheduler.acquire(TEACHER))
+        await asyncio.sleep(0.01)
+        try:
+            await scheduler.acquire(TEACHER)
+            assert False, "teacher 排队已满应被丢弃"
+        except LLMShed as e:
+            assert e.reason == "queue_full"
+
+        # 总排队已满：交互请求挤掉最后排队的 batch 请求
+        interactive = asyncio.create_task(scheduler.acquire(INTERACTIVE))
+        try:
+            await batch
+            assert False, "batch 请求应被挤出队列"
+        except LLMShed as e:
+            assert e.reason == "evicted"
+
+        # 总排队已满且没有更低优先级的请求可挤
+        try:
+            await scheduler.acquire(BATCH)
+            assert False
+        except LLMShed as e:
+            assert e.reason == "queue_full"
+
+        scheduler.release()
+        await interactive
+        scheduler.release()
+        await teacher
+
+        # 排队超时
+        try:
+            await scheduler.acquire(RECOMMENDATION)
+            assert False
+        except LLMShed as e:
+            assert e.reason == "timeout"
+        scheduler.release()
+
+    asyncio.run(run())
+    counters = metrics.snapshot()["counters"]
+    assert counters["llm.sched.dropped{priority=batch,reason=evicted}"] == 1
+    assert counters["llm.sched.dropped{priority=recommendation,reason=timeout}"] == 1
+    assert scheduler.stats()["active"] == 0
+
+
+def test_user_bucket():
+    clock = [0.0]
+    scheduler = LLMScheduler(max_concurrency=10, max_wait_s={**WAITS, INTERACTIVE: 1},
+                             user_rate_per_min=60, user_burst=2, clock=lambda: clock[0])
+
+    async def run():
+        for _ in range(3):  # 突发2个，第3个等待1秒后放行
+            await scheduler.acquire(INTERACTIVE, user_id=7)
+        try:
+            await scheduler.acquire(INTERACTIVE, user_id=7)  # 需要等待2秒，超过最长等待
+            assert False
+        except LLMShed as e:
+            assert e.reason == "rate_limited"
+        await scheduler.acquire(INTERACTIVE, user_id=8)  # 其他学生不受影响
+        clock[0] += 10
+        await scheduler.acquire(INTERACTIVE, user_id=7)
+
+    asyncio.run(run())
+
+
+def test_cross_thread():
+    scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS, max_wait_s=WAITS, user_rate_per_min=0)
+    acquired = threading.Event()
+    done = []
+
+    def worker():
+        async def run():
+            await scheduler.acquire(BATCH)
+            done.append("batch")
+            scheduler.release()
+        asyncio.run(run())
+
+    async def run():
+        await scheduler.acquire(INTERACTIVE)
+        thread = threading.Thread(target=worker)
+        thread.start()
+        while not scheduler.stats()["queued"][BATCH]:
+            await asyncio.sleep(0.005)
+        scheduler.release()
+        await asyncio.to_thread(thread.join)
+        acquired.set()
+
+    asyncio.run(run())
+    assert acquired.is_set() and done == ["batch"]
+
+
+def test_caller_context():
+    assert current_caller() == (None, None)
+    with llm_caller(user_id=7, priority=BATCH):
+        assert current_caller() == (7, BATCH)
+    assert current_caller() == (None, None)
+
+
+if __name__ == "__main__":
+    print("🧪 测试LLM调度器...")
+    print("=" * 40)
+    test_priority_order()
+    test_shedding()
+    test_user_bucket()
+    test_cross_thread()
+    test_caller_context()
+    print("✅ 优先级放行、排队丢弃、学生令牌桶与跨线程放行正常")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+掌握度UPSERT测试
+新知识点从0.5起算，已有记录在原值上累加并截断到[0, 1]；答错时错题次数累加；
+每次作答只需一条查询加两条批量写入。
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common import sql_trace
+from api.common.migrations import migrate_path
+from api.common.sql_trace import TracedConnection
+from api.student.mastery import apply_answers, mastery_delta
+
+WRONG = {"is_correct": False, "reason": "", "scores": []}
+RIGHT = {"is_correct": True, "reason": "", "scores": [
+    {"Knowledge Mastery": "知识掌握", "score": 1.0},
+    {"Logical Reasoning": "解题逻辑", "score": 1.0},
+    {"Calculation Accuracy": "计算准确性", "score": 1.0},
+    {"Behavioral Performance": "行为表现", "score": 1.0},
+]}
+
+
+def test_upsert():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        migrate_path(db_path, verbose=False)
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO knowledge_nodes (node_id, node_name) VALUES (1, '随机事件'), (2, '条件概率')")
+        conn.execute("""
+            INSERT INTO questions (question_id, question_text, question_type, difficulty, answer, analysis, created_by)
+            VALUES (1, '题目1', '填空题', 1.0, '0.5', '', 1)
+        """)
+        conn.execute("INSERT INTO question_to_node_mapping (question_id, node_id) VALUES (1, 1), (1, 2)")
+        conn.execute("INSERT INTO user_node_mastery (user_id, node_id, mastery_score) VALUES (7, 1, 0.95)")
+
+        token, stats = sql_trace.start_request()
+        apply_answers(TracedConnection(conn), 7, [("1", RIGHT)])
+        sql_trace.end_request(token)
+        assert stats.count == 2  # 一次查询知识点 + 一次批量UPSERT
+
+        up = mastery_delta(RIGHT, 1.0)
+        scores = dict(conn.execute("SELECT node_id, mastery_score FROM user_node_mastery WHERE user_id = 7"))
+        assert scores[1] == 1.0
+        assert abs(scores[2] - (0.5 + up)) < 1e-9
+
+        apply_answers(conn, 7, [("1", WRONG), ("1", WRONG)])
+        wrong_count = conn.execute("SELECT wrong_count FROM wrong_questions WHERE user_id = 7 AND question_id = 1").fetchone()[0]
+        assert wrong_count == 2
+        down = mastery_delta(WRONG, 1.0)
+        assert abs(conn.execute("SELECT mastery_score FROM user_node_mastery WHERE user_id = 7 AND node_id = 2").fetchone()[0]
+                   - (0.5 + up + 2 * down)) < 1e-9
+        conn.close()
+
+
+if __name__ == "__main__":
+    print("🧪 测试掌握度UPSERT...")
+    print("=" * 40)
+    test_upsert()
+    print("✅ 掌握度与错题记录更新正确")
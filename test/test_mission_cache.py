@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学习任务包缓存测试
+首次请求当场生成并写入缓存，之后直接返回缓存；掌握度或知识图谱变化后缓存过期；
+诊断后连续触发的后台生成合并为一次补算；没有学习步骤的任务包不缓存；生成时的 debug 阶段耗时不写入缓存。
+"""
+
+import asyncio
+import sqlite3
+
+from db_fixture import temp_database
+
+from api.common import database, metrics
+from api.common.database import shutdown_executor
+from api.common.write_queue import shutdown_writer
+from api.student.recommendations.mission_cache import MissionCache
+
+
+def _execute(sql, params=()):
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def test_mission_cache():
+    metrics.reset()
+    builds = []
+
+    async def build(user_id):
+        builds.append(user_id)
+        await asyncio.sleep(0.05)
+        steps = [] if user_id == 9 else [{"type": "CONCEPT_LEARNING", "content": {"title": f"第{len(builds)}次"}}]
+        return {"mission_type": "NEW_KNOWLEDGE", "metadata": {"title": "任务"}, "payload": {"steps": steps},
+                "debug": {"total_ms": 50.0, "stages": {}}}
+
+    async def run():
+        cache = MissionCache(build)
+        try:
+            first = await cache.get(7)
+            assert first["cached"] is False and first["generated_at"]
+            second = await cache.get(7)
+            assert second["cached"] is True and second["payload"] == first["payload"]
+            # 阶段耗时只属于当场生成的那次请求
+            assert "debug" in first and "debug" not in second
+            assert builds == [7]
+
+            # 掌握度变化、知识图谱变化都会让缓存过期
+            _execute("INSERT INTO user_node_mastery (user_id, node_id, mastery_score) VALUES (7, 1, 0.5)")
+            assert (await cache.get(7))["cached"] is False
+            assert (await cache.get(7))["cached"] is True
+            _execute("INSERT INTO knowledge_nodes (node_id, node_name) VALUES (100, '新知识点')")
+            assert (await cache.get(7))["cached"] is False
+            assert len(builds) == 3
+
+            # 生成期间的多次诊断只补算一次；请求等待正在进行的生成
+            cache.schedule_refresh("7")
+            cache.schedule_refresh(7)
+            cache.schedule_refresh(7)
+            await asyncio.sleep(0.2)
+            assert len(builds) == 5
+            assert (await cache.get(7, refresh=True))["cached"] is False
+            assert len(builds) == 6
+
+            # 没有学习步骤的任务包不缓存
+            await cache.get(9)
+            await cache.get(9)
+            assert builds.count(9) == 2
+            await cache.close()
+        finally:
+            await shutdown_writer()
+            shutdown_executor()
+
+    with temp_database():
+        asyncio.run(run())
+    counters = metrics.snapshot()["counters"]
+    assert counters["mission_cache.hits"] == 2
+    assert counters["mission_cache.misses{reason=mastery}"] == 1
+    assert counters["mission_cache.misses{reason=catalog}"] == 1
+
+
+if __name__ == "__main__":
+    print("🧪 测试学习任务包缓存...")
+    print("=" * 40)
+    test_mission_cache()
+    print("✅ 任务包缓存命中、过期与后台补算正常")
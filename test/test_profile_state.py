@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学生画像增量状态测试
+迁移 0010 为已有答题记录重建画像状态；逐条写入时计数随窗口滚动，挤出和归档的记录同步减去；
+任何时候已存状态都应与从 user_answers 重新计算的结果一致（check_profile 为空）。
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common.answer_scores import save_scores
+from api.common.migrations import migrate_path
+from api.common.profile_state import (
+    PROFILE_WINDOW_SIZE,
+    check_profile,
+    drop_answers,
+    rebuild_profile,
+    record_answers,
+)
+
+
+def _result(is_correct, score):
+    return {"is_correct": is_correct, "scores": [{"Knowledge Mastery": "知识掌握", "score": score}]}
+
+
+def _setup(db_path):
+    migrate_path(db_path, target=9, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO knowledge_nodes (node_id, node_name) VALUES (1, '随机事件'), (2, '条件概率')")
+    conn.execute("""
+        INSERT INTO questions (question_id, question_text, question_type, difficulty, answer, analysis, created_by)
+        VALUES (1, '题目1', '解答题', 0.5, '', '', 1), (2, '题目2', '解答题', 0.5, '', '', 1)
+    """)
+    conn.execute("INSERT INTO question_to_node_mapping (question_id, node_id) VALUES (1, 1), (2, 1), (2, 2)")
+    conn.commit()
+    return conn
+
+
+def _answer(conn, user_id, question_id, result, incremental=True):
+    cursor = conn.execute("""
+        INSERT INTO user_answers (user_id, question_id, user_answer, is_correct)
+        VALUES (?, ?, '答案', ?)
+    """, (user_id, question_id, result["is_correct"]))
+    save_scores(conn, [(cursor.lastrowid, question_id, result)])
+    if incremental:
+        record_answers(conn, user_id, [(cursor.lastrowid, question_id, result["is_correct"])])
+    return cursor.lastrowid
+
+
+def test_migration_rebuilds_existing_answers():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        conn = _setup(db_path)
+        _answer(conn, 7, 1, _result(True, 0.8), incremental=False)
+        _answer(conn, 7, 2, _result(False, 0.4), incremental=False)
+        conn.commit()
+        conn.close()
+
+        migrate_path(db_path, verbose=False)
+        conn = sqlite3.connect(db_path)
+        assert check_profile(conn, 7) == []
+        rows = conn.execute("""
+            SELECT node_id, interaction_count, correct_count FROM user_profile_state
+            WHERE user_id = 7 ORDER BY last_answer_id DESC, node_id
+        """).fetchall()
+        assert rows == [(1, 2, 1), (2, 1, 0)]
+        conn.close()
+
+
+def test_window_rolls_incrementally():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        _setup(db_path).close()
+        migrate_path(db_path, verbose=False)
+        conn = sqlite3.connect(db_path)
+        # 题目2关联两个知识点，写入量超过窗口大小，最旧的记录被挤出
+        answer_ids = []
+        for i in range(PROFILE_WINDOW_SIZE):
+            answer_ids.append(_answer(conn, 7, 1 + i % 2, _result(i % 3 == 0, (i % 10) / 10)))
+            assert check_profile(conn, 7) == [], i
+        _answer(conn, 8, 1, _result(True, 1.0))
+        window = conn.execute("SELECT COUNT(*) FROM user_profile_window WHERE user_id = 7").fetchone()[0]
+        assert window == PROFILE_WINDOW_SIZE
+
+        # 归档最旧的记录，复核后重建，结果仍与重新计算一致
+        drop_answers(conn, answer_ids[:PROFILE_WINDOW_SIZE // 2])
+        conn.execute(f"DELETE FROM user_answers WHERE answer_id IN ({','.join('?' * (PROFILE_WINDOW_SIZE // 2))})",
+                     answer_ids[:PROFILE_WINDOW_SIZE // 2])
+        assert check_profile(conn, 7) == []
+        conn.execute("UPDATE user_answers SET is_correct = 1 WHERE answer_id = ?", (answer_ids[-1],))
+        assert check_profile(conn, 7) != []
+        rebuild_profile(conn, 7)
+        assert check_profile(conn, 7) == []
+        assert check_profile(conn, 8) == []
+        conn.close()
+
+
+def test_string_question_ids():
+    # 诊断请求里的题目ID、学生ID都是字符串
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        _setup(db_path).close()
+        migrate_path(db_path, verbose=False)
+        conn = sqlite3.connect(db_path)
+        _answer(conn, "7", "2", _result(True, 0.6))
+        _answer(conn, "7", "1", _result(False, 0.2))
+        rows = conn.execute("SELECT node_id, interaction_count FROM user_profile_state WHERE user_id = 7").fetchall()
+        assert sorted(rows) == [(1, 2), (2, 1)]
+        assert check_profile(conn, 7) == []
+        conn.close()
+
+
+if __name__ == "__main__":
+    print("🧪 测试学生画像增量状态...")
+    print("=" * 40)
+    test_migration_rebuilds_existing_answers()
+    test_window_rolls_incrementally()
+    test_string_question_ids()
+    print("✅ 画像状态增量维护与重建结果一致")
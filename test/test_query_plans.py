@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热点查询执行计划测试
+在全新数据库上执行全部迁移，然后对每条热点SQL运行 EXPLAIN QUERY PLAN，
+只要出现全表扫描（SCAN 且未使用索引）就判定失败。
+"""
+
+import os
+import sqlite3
+import sys
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common.migrations import migrate
+
+# (说明, SQL, 参数)
+HOT_QUERIES = [
+    ("学生画像 user_profile_state + user_profile_dimensions", """
+        SELECT s.node_id, kn.node_name, s.interaction_count, s.correct_count,
+               d.dimension, d.score_sum / d.score_count AS avg_score
+        FROM user_profile_state AS s
+        JOIN knowledge_nodes AS kn ON kn.node_id = s.node_id
+        LEFT JOIN user_profile_dimensions AS d ON d.user_id = s.user_id AND d.node_id = s.node_id
+        WHERE s.user_id = ?
+        ORDER BY s.last_answer_id DESC, d.dimension
+    """, (1,)),
+    ("画像窗口挤出最旧记录", """
+        SELECT answer_id, node_id, is_correct FROM user_profile_window
+        WHERE user_id = ?
+        ORDER BY answer_id DESC, node_id DESC
+        LIMIT -1 OFFSET ?
+    """, (1, 30)),
+    ("归档时按答题记录查画像窗口", """
+        SELECT user_id, answer_id, node_id, is_correct FROM user_profile_window
+        WHERE answer_id IN (?, ?)
+    """, (1, 2)),
+    ("重建画像 user_answers ORDER BY answer_id", """
+        SELECT ua.answer_id, qnm.node_id, CASE WHEN ua.is_correct THEN 1 ELSE 0 END
+        FROM user_answers AS ua
+        JOIN question_to_node_mapping AS qnm ON qnm.question_id = ua.question_id
+        JOIN knowledge_nodes AS kn ON kn.node_id = qnm.node_id
+        WHERE ua.user_id = ?
+        ORDER BY ua.answer_id DESC, qnm.node_id DESC
+        LIMIT ?
+    """, (1, 30)),
+    ("今日答题数", """
+        SELECT COUNT(*) as count
+        FROM user_answers
+        WHERE user_id = ? AND DATE(timestamp) = DATE('now')
+    """, (1,)),
+    ("学生最近答题", """
+        SELECT question_id, is_correct, timestamp
+        FROM user_answers
+        WHERE user_id = ?
+        ORDER BY timestamp DESC
+        LIMIT 10
+    """, (1,)),
+    ("按知识点取题 question_to_node_mapping.node_id", """
+        SELECT q.question_id, q.question_text, q.difficulty
+        FROM questions q
+        JOIN question_to_node_mapping qnm ON q.question_id = qnm.question_id
+        WHERE qnm.node_id = ?
+        ORDER BY q.difficulty ASC
+        LIMIT 3
+    """, (1,)),
+    ("按题目取知识点 question_to_node_mapping.question_id", """
+        SELECT qm.node_id, q.difficulty
+        FROM question_to_node_mapping qm
+        JOIN questions q ON qm.question_id = q.question_id
+        WHERE qm.question_id = ?
+    """, (1,)),
+    ("题目详情及知识点", """
+        SELECT q.question_text, q.question_type, q.answer, q.analysis, q.difficulty,
+               GROUP_CONCAT(kn.node_name) as knowledge_points
+        FROM questions q
+        LEFT JOIN question_to_node_mapping qm ON q.question_id = qm.question_id
+        LEFT JOIN knowledge_nodes kn ON qm.node_id = kn.node_id
+        WHERE q.question_id = ?
+        GROUP BY q.question_id
+    """, (1,)),
+    ("模块包含节点 knowledge_edges(source, relation)", """
+        SELECT target_node_id
+        FROM knowledge_edges
+        WHERE source_node_id = ? AND relation_type = '包含'
+    """, (1,)),
+    ("模块包含节点 JOIN knowledge_nodes", """
+        SELECT target_node_id as node_id
+        FROM knowledge_edges ke
+        JOIN knowledge_nodes kn ON ke.source_node_id = kn.node_id
+        WHERE kn.node_name = ? AND ke.relation_type = '包含'
+    """, ("概率论的基本概念",)),
+    ("前置节点详情 JOIN knowledge_nodes", """
+        SELECT kn.node_id, kn.node_name
+        FROM knowledge_nodes kn
+        JOIN knowledge_edges ke ON kn.node_id = ke.source_node_id
+        WHERE ke.target_node_id = ? AND ke.relation_type = '指向'
+    """, (1,)),
+    ("后续节点详情 JOIN knowledge_nodes", """
+        SELECT kn.node_id, kn.node_name
+        FROM knowledge_nodes kn
+        JOIN knowledge_edges ke ON kn.node_id = ke.target_node_id
+        WHERE ke.source_node_id = ? AND ke.relation_type = '指向'
+    """, (1,)),
+    ("前置节点 knowledge_edges(target, relation)", """
+        SELECT source_node_id
+        FROM knowledge_edges
+        WHERE target_node_id = ? AND relation_type = '指向'
+    """, (1,)),
+    ("全部前置关系 knowledge_edges.relation_type", """
+        SELECT source_node_id, target_node_id, relation_type
+        FROM knowledge_edges
+        WHERE relation_type = '指向'
+    """, ()),
+    ("错题集 wrong_questions(user_id, last_wrong_time)", """
+        SELECT wq.wrong_id, wq.question_id, q.question_text, wq.wrong_count, wq.last_wrong_time
+        FROM wrong_questions wq
+        JOIN questions q ON wq.question_id = q.question_id
+        WHERE wq.user_id = ?
+        ORDER BY wq.last_wrong_time DESC
+    """, (1,)),
+    ("按名称查知识点 knowledge_nodes.node_name", """
+        SELECT node_id FROM knowledge_nodes WHERE node_name = ?
+    """, ("随机事件",)),
+    ("答题日汇总 user_answer_daily_rollup(user_id, day)", """
+        SELECT COUNT(*) FROM (
+            SELECT DATE(timestamp) FROM user_answers WHERE user_id = ?
+            UNION
+            SELECT day FROM user_answer_daily_rollup WHERE user_id = ?
+        )
+    """, (1, 1)),
+    ("归档挑选旧记录 user_answers.timestamp", """
+        SELECT answer_id FROM user_answers
+        WHERE timestamp < ?
+        ORDER BY timestamp
+        LIMIT ?
+    """, ("2024-01-01", 500)),
+    ("用户掌握度", """
+        SELECT mastery_score FROM user_node_mastery
+        WHERE user_id = ? AND node_id = ?
+    """, (1, 1)),
+]
+
+
+def create_test_database():
+    """创建内存数据库并执行全部迁移"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    migrate(conn, verbose=False)
+    return conn
+
+
+def full_scans(conn, sql, params):
+    """返回执行计划中的全表扫描步骤（扫描子查询、CTE 的中间结果不算）"""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    intermediate = ["SCAN (subquery", "SCAN CONSTANT ROW"]
+    for row in plan:
+        if row["detail"].startswith(("MATERIALIZE ", "CO-ROUTINE ")):
+            intermediate.append("SCAN " + row["detail"].split(" ", 1)[1])
+    return [row["detail"] for row in plan
+            if row["detail"].startswith("SCAN") and "INDEX" not in row["detail"]
+            and not row["detail"].startswith(tuple(intermediate))]
+
+
+def test_hot_queries_use_indexes():
+    """每条热点查询都不应出现全表扫描"""
+    conn = create_test_database()
+    failures = []
+    for description, sql, params in HOT_QUERIES:
+        scans = full_scans(conn, sql, params)
+        if scans:
+            failures.append(f"{description}: {scans}")
+    conn.close()
+    assert not failures, "以下查询存在全表扫描:\n" + "\n".join(failures)
+
+
+def test_node_keys_are_integer():
+    """所有引用 knowledge_nodes.node_id 的列都应是 INTEGER，JOIN 时无需类型转换"""
+    conn = create_test_database()
+    columns = {
+        "knowledge_edges": ("source_node_id", "target_node_id"),
+        "question_to_node_mapping": ("node_id",),
+        "user_node_mastery": ("node_id",),
+    }
+    for table, names in columns.items():
+        types = {row["name"]: row["type"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name in names:
+            assert types[name] == "INTEGER", f"{table}.{name} 的类型是 {types[name]}"
+    conn.close()
+
+
+def test_migrations_are_idempotent():
+    """重复执行迁移不会报错，也不会重复插入数据"""
+    conn = create_test_database()
+    user_count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    assert migrate(conn, verbose=False) == []
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == user_count
+    conn.close()
+
+
+if __name__ == "__main__":
+    print("🧪 测试热点查询执行计划...")
+    print("=" * 40)
+    test_hot_queries_use_indexes()
+    print("✅ 所有热点查询均使用索引")
+    test_node_keys_are_integer()
+    print("✅ 知识点外键均为INTEGER")
+    test_migrations_are_idempotent()
+    print("✅ 迁移可重复执行")
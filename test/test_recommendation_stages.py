@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推荐流水线阶段测试
+并发的阶段总耗时取决于最慢的一个；超时或出错的阶段返回降级结果并记录状态；
+没有降级结果的阶段照常抛出异常；被取消的阶段记为 cancelled。
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common import metrics
+from api.student.recommendations import stages
+from api.student.recommendations.stages import StageTimer
+
+
+async def _sleep(seconds, result=None, error=None):
+    await asyncio.sleep(seconds)
+    if error:
+        raise error
+    return result
+
+
+def test_stages():
+    metrics.reset()
+
+    async def run():
+        timer = StageTimer()
+        with timer.measure("profile"):
+            pass
+        start = time.perf_counter()
+        strategy, suitability, gnn = await asyncio.gather(
+            timer.run("strategy", _sleep(0.1, ("理由", {"mission_type": "NEW_KNOWLEDGE"}))),
+            timer.run("suitability", _sleep(0.1, error=RuntimeError("AI失败")), fallback=None),
+            timer.run("gnn", _sleep(1, {1: 0.9}), fallback={}),
+        )
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.3, elapsed
+        assert strategy[1]["mission_type"] == "NEW_KNOWLEDGE" and suitability is None and gnn == {}
+
+        try:
+            await timer.run("frontier", _sleep(0, error=ValueError("数据库错误")))
+            assert False, "没有降级结果的阶段应抛出异常"
+        except ValueError:
+            pass
+
+        task = asyncio.ensure_future(timer.run("selection", _sleep(1)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return timer.debug()
+
+    # 超时在模块导入时从环境变量读取，同一进程中模块可能已被其他测试导入，这里直接替换
+    previous = stages.STAGE_TIMEOUTS["gnn"]
+    stages.STAGE_TIMEOUTS["gnn"] = 0.05
+    try:
+        debug = asyncio.run(run())
+    finally:
+        stages.STAGE_TIMEOUTS["gnn"] = previous
+    statuses = {name: stage["status"] for name, stage in debug["stages"].items()}
+    assert statuses == {"profile": "ok", "strategy": "ok", "suitability": "error", "gnn": "timeout",
+                        "frontier": "error", "selection": "cancelled"}
+    assert debug["total_ms"] >= debug["stages"]["strategy"]["ms"]
+    counters = metrics.snapshot()["counters"]
+    assert counters["recommendation.stage_fallback{stage=gnn,status=timeout}"] == 1
+
+
+if __name__ == "__main__":
+    print("🧪 测试推荐流水线阶段...")
+    print("=" * 40)
+    test_stages()
+    print("✅ 阶段并发、超时降级与耗时记录正常")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库线程池占满时的路由测试
+所有连接都被线程池中的慢查询占用时，登录用的 /users 和 /health 排队等待，慢查询结束后正常返回，
+而不是在事件循环线程上借连接失败（PoolTimeoutError）返回500或 unhealthy。
+"""
+
+import asyncio
+import threading
+
+from db_fixture import temp_database
+
+from api.common import database, system, users
+from api.common.database import get_pool, run_db, shutdown_executor
+
+
+def test_login_and_health_wait_for_saturated_pool():
+    release = threading.Event()
+
+    def hold(conn):
+        conn.execute("SELECT 1")
+        release.wait(5)
+
+    async def run():
+        try:
+            holders = [asyncio.ensure_future(run_db(hold)) for _ in range(database.DB_MAX_CONCURRENCY)]
+            await asyncio.sleep(0.1)
+            assert get_pool().stats()["in_use"] == database.DB_MAX_CONCURRENCY
+
+            health = asyncio.ensure_future(system.health_check())
+            login = asyncio.ensure_future(users.get_users())
+            await asyncio.sleep(0.1)
+            assert not health.done() and not login.done()
+
+            release.set()
+            assert (await health)["status"] == "healthy"
+            assert isinstance(await login, list)
+            await asyncio.gather(*holders)
+        finally:
+            release.set()
+            shutdown_executor()
+
+    with temp_database():
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("🧪 测试线程池占满时的路由...")
+    print("=" * 40)
+    test_login_and_health_wait_for_saturated_pool()
+    print("✅ 登录和健康检查在线程池占满时排队等待")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学生数据分片脚本测试
+shard_database.py 把目录库中已有的学生数据复制到各分片：有 user_id 的表按 user_id 分片，
+没有 user_id 列的 user_answer_scores 跟随对应答题记录分片；重复运行不产生重复数据。
+分片配置在模块导入时读取，因此脚本在子进程中以环境变量运行。
+"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common.answer_scores import save_scores
+from api.common.migrations import migrate_path
+
+SHARD_COUNT = 2
+RESULT = {"is_correct": True, "scores": [{"Knowledge Mastery": "知识掌握", "score": 0.8}]}
+
+
+def _setup(db_path):
+    migrate_path(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO knowledge_nodes (node_id, node_name) VALUES (1, '随机事件')")
+    conn.execute("""
+        INSERT INTO questions (question_id, question_text, question_type, difficulty, answer, analysis, created_by)
+        VALUES (1, '题目1', '解答题', 0.5, '', '', 1)
+    """)
+    conn.execute("INSERT INTO question_to_node_mapping (question_id, node_id) VALUES (1, 1)")
+    for user_id in (2, 3, 5):
+        cursor = conn.execute("""
+            INSERT INTO user_answers (user_id, question_id, user_answer, is_correct, diagnosis_json)
+            VALUES (?, 1, '答案', 1, ?)
+        """, (user_id, json.dumps(RESULT)))
+        save_scores(conn, [(cursor.lastrowid, 1, RESULT)])
+    conn.commit()
+    conn.close()
+
+
+def _run(db_path, shard_dir):
+    env = dict(os.environ, DB_PATH=db_path, DB_SHARD_COUNT=str(SHARD_COUNT), DB_SHARD_DIR=shard_dir)
+    result = subprocess.run([sys.executable, "shard_database.py"], cwd=backend_path, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def _scores_by_user(shard_path):
+    conn = sqlite3.connect(shard_path)
+    try:
+        return sorted(conn.execute("""
+            SELECT ua.user_id, s.dimension, s.score
+            FROM user_answer_scores AS s
+            JOIN user_answers AS ua ON ua.answer_id = s.answer_id
+        """).fetchall())
+    finally:
+        conn.close()
+
+
+def test_shard_scores_follow_answers():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        shard_dir = os.path.join(tmp, "shards")
+        _setup(db_path)
+        _run(db_path, shard_dir)
+        _run(db_path, shard_dir)  # 重复运行不产生重复数据
+
+        even = _scores_by_user(os.path.join(shard_dir, "shard_00.db"))
+        odd = _scores_by_user(os.path.join(shard_dir, "shard_01.db"))
+        assert even == [(2, "知识掌握", 0.8)]
+        assert odd == [(3, "知识掌握", 0.8), (5, "知识掌握", 0.8)]
+
+
+if __name__ == "__main__":
+    print("🧪 测试学生数据分片脚本...")
+    print("=" * 40)
+    test_shard_scores_follow_answers()
+    print("✅ 维度评分随答题记录分片正常")
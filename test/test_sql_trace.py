@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按请求SQL统计测试
+SSE 响应体在中间件返回响应之后才执行：流式发送期间的查询仍计入该请求，
+流结束时上报指标和N+1检查，并追加最后一个 sql 事件；客户端中途断开时同样上报。
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import sqlite3
+import sys
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common import metrics, sql_trace
+from api.common.sql_trace import TracedConnection
+
+
+def _request_context():
+    """模拟中间件：在请求上下文中开始统计，响应体的上下文在中间件结束统计前复制"""
+    token, stats = sql_trace.start_request()
+    context = contextvars.copy_context()
+    sql_trace.end_request(token)
+    return stats, context
+
+
+async def _events(conn, queries):
+    for i in range(queries):
+        conn.execute("SELECT ?", (i,))
+        yield f"event: status\ndata: {i}\n\n".encode("utf-8")
+
+
+def test_stream_report():
+    metrics.reset()
+    conn = TracedConnection(sqlite3.connect(":memory:"))
+
+    async def consume(stream, limit=None):
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk.decode("utf-8"))
+            if limit is not None and len(chunks) >= limit:
+                await stream.aclose()
+                break
+        return chunks
+
+    async def run():
+        stats, context = _request_context()
+        stream = sql_trace.report_after_stream(_events(conn, 12), stats, "/stream")
+        chunks = await asyncio.get_running_loop().create_task(consume(stream), context=context)
+        assert chunks[-1].startswith("event: sql\n")
+        summary = json.loads(chunks[-1].split("data: ", 1)[1])
+        assert summary["count"] == 12 and stats.count == 12
+
+        # 客户端断开：没有 sql 事件，但已执行的查询仍然上报
+        stats, context = _request_context()
+        stream = sql_trace.report_after_stream(_events(conn, 12), stats, "/stream")
+        chunks = await asyncio.get_running_loop().create_task(consume(stream, limit=3), context=context)
+        assert len(chunks) == 3 and stats.count == 3
+
+    asyncio.run(run())
+    snapshot = metrics.snapshot()
+    assert snapshot["timings"]["sql.request.statements{route=/stream}"]["count"] == 2
+    assert snapshot["counters"]["sql.n_plus_one{route=/stream}"] == 1
+
+
+if __name__ == "__main__":
+    print("🧪 测试按请求SQL统计...")
+    print("=" * 40)
+    test_stream_report()
+    print("✅ 流式响应的SQL统计在流结束时上报")
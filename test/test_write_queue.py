@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单写者队列测试
+并发提交的写意图应被合并成少量批次提交，单个写意图失败只回滚它自己。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# 添加backend路径
+backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from api.common import metrics
+from api.common.database import connect
+from api.common.migrations import migrate_path
+from api.common.write_queue import WriteQueue
+
+
+def _insert_answer(conn, question_id):
+    if question_id == 7:
+        raise ValueError("模拟写入失败")
+    conn.execute("""
+        INSERT INTO user_answers (user_id, question_id, user_answer, is_correct)
+        VALUES (?, ?, ?, ?)
+    """, (1, question_id, "A", 1))
+    return question_id
+
+
+def test_group_commit():
+    """200个并发写意图：失败的一个单独报错，其余全部落库，批次数远小于写意图数"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        migrate_path(db_path, verbose=False)
+        metrics.reset()
+
+        async def submit_all():
+            writer = WriteQueue(db_path, batch_size=64, batch_ms=5)
+            results = await asyncio.gather(
+                *[writer.submit(_insert_answer, i) for i in range(200)],
+                return_exceptions=True,
+            )
+            await writer.close()
+            return results
+
+        results = asyncio.run(submit_all())
+        failures = [r for r in results if isinstance(r, Exception)]
+        assert len(failures) == 1 and isinstance(failures[0], ValueError)
+        assert results[0] == 0 and results[199] == 199
+
+        conn = connect(db_path)
+        count = conn.execute("SELECT COUNT(*) FROM user_answers").fetchone()[0]
+        conn.close()
+        assert count == 199
+
+        snapshot = metrics.snapshot()
+        batches = snapshot["counters"]["db.write.batches"]
+        assert batches <= 200 // 64 + 1, f"批次数过多: {batches}"
+        assert snapshot["timings"]["db.write.commit_ms"]["count"] == batches
+
+
+if __name__ == "__main__":
+    print("🧪 测试单写者队列...")
+    print("=" * 40)
+    test_group_commit()
+    print("✅ 写意图按批次提交，失败互不影响")